@@ -0,0 +1,106 @@
+"""
+Concurrency/throughput comparison of the sync and async journey read paths.
+
+Point it at a running server with throttling disabled (benchmarks.settings),
+seeded journeys (e.g. benchmark_pagination --keep) and a user, once under
+uvicorn (ASGI) and once under gunicorn (WSGI) with the same worker count:
+
+    export DJANGO_SETTINGS_MODULE=benchmarks.settings
+    python manage.py migrate && python manage.py benchmark_pagination --journeys 20000 --keep
+    python manage.py createsuperuser --email admin@bench.test
+    uvicorn trainstation.asgi:application --workers 4
+    python benchmarks/load_test.py --email admin@bench.test --password ...
+
+Every scenario is run with each concurrency level for --duration seconds by
+a pool of client threads; throughput, p50/p95 latency and errors are
+printed per endpoint pair. Only the standard library is used.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+API = "/api/train_station"
+SCENARIOS = {
+    "search": ("/journeys/?limit=20", "/async/journeys/?limit=20"),
+    "detail": ("/journeys/{journey}/", "/async/journeys/{journey}/"),
+    "availability": ("/journeys/{journey}/", "/async/journeys/{journey}/availability/"),
+}
+
+
+def request(url, token=None, data=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    body = json.dumps(data).encode() if data is not None else None
+    with urllib.request.urlopen(urllib.request.Request(url, body, headers), timeout=30) as response:
+        return json.loads(response.read())
+
+
+def run(url, token, concurrency, duration):
+    timings, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        nonlocal errors
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                request(url, token)
+            except (urllib.error.URLError, OSError):
+                failed += 1
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            timings.extend(local)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "rps": len(timings) / elapsed,
+        "p50": statistics.median(timings) if timings else 0,
+        "p95": timings[int(len(timings) * 0.95) - 1] if timings else 0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", default="1,10,50,100", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    args = parser.parse_args()
+
+    base = args.base_url.rstrip("/")
+    token = request(f"{base}/api/user/token/", data={"email": args.email, "password": args.password})["access"]
+    journey = request(f"{base}{API}/journeys/?limit=1", token)["results"][0]["id"]
+
+    print(f"{'scenario':<14}{'clients':>8}  {'path':<6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    for name in args.scenario or SCENARIOS:
+        for concurrency in map(int, args.concurrency.split(",")):
+            for label, path in zip(("sync", "async"), SCENARIOS[name]):
+                url = base + API + path.format(journey=journey)
+                result = run(url, token, concurrency, args.duration)
+                print(
+                    f"{name:<14}{concurrency:>8}  {label:<6}{result['rps']:>9.1f}"
+                    f"{result['p50']:>9.1f}{result['p95']:>9.1f}{result['errors']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Settings for running the benchmark suite locally:
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py test benchmarks
+
+Uses a throwaway SQLite database unless BENCHMARK_DB=postgres is set (the
+test runner then creates test_<POSTGRES_DB>), and disables throttling so
+repeated requests measure the endpoints rather than the rate limiter.
+"""
+import os
+
+from trainstation.settings import *  # noqa: F401,F403
+from trainstation.settings import REST_FRAMEWORK
+
+SECRET_KEY = SECRET_KEY or "benchmarks"  # noqa: F405
+
+if os.environ.get("BENCHMARK_DB") != "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "benchmarks.sqlite3",  # noqa: F405
+        }
+    }
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_CLASSES": [],
+}
@@ -0,0 +1,252 @@
+"""
+Query-count, latency and response-size regression checks for every API endpoint.
+
+Each case is requested REPEAT times against a seeded data set; the first
+request's query count, the p50/p95 latency and the response size are
+compared with benchmarks/baselines.json. A case fails when it runs more
+queries than its baseline, when p95 exceeds LATENCY_TOLERANCE times the
+baseline (plus LATENCY_SLACK_MS to absorb noise on fast endpoints), or
+when the body grows by more than SIZE_TOLERANCE.
+
+Regenerate baselines after an intended change with:
+
+    BENCHMARK_UPDATE=1 DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py test benchmarks
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from station.factories import seed_network, seed_journeys, seed_orders
+from station.models import Journey, Order, Station, TrainType
+
+BASELINES = Path(__file__).with_name("baselines.json")
+REPEAT = int(os.environ.get("BENCHMARK_REPEAT", 20))
+LATENCY_TOLERANCE = float(os.environ.get("BENCHMARK_LATENCY_TOLERANCE", 3.0))
+LATENCY_SLACK_MS = 20.0
+SIZE_TOLERANCE = 1.25
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class EndpointBenchmarkTests(TestCase):
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            email="admin@bench.test", password="benchpassword"
+        )
+        cls.user = get_user_model().objects.create_user(
+            email="user@bench.test", password="benchpassword"
+        )
+        stations, routes, trains = seed_network(stations=60, routes=300, trains=30)
+        seed_journeys(3000, routes, trains, days=30)
+        journeys = list(Journey.objects.select_related("train").order_by("departure_time")[:200])
+        seed_orders(cls.user, journeys, orders=200, tickets_per_order=10)
+        seed_orders(cls.admin, journeys, orders=50, tickets_per_order=25)
+        cls.journey = journeys[0]
+        cls.free_journey = Journey.objects.exclude(tickets__isnull=False).select_related("train").first()
+        cls.station = stations[0]
+        cls.route = routes[0]
+        cls.train = trains[0]
+        cls.train_type = TrainType.objects.first()
+        cls.order = Order.objects.filter(user=cls.user).first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if os.environ.get("BENCHMARK_UPDATE"):
+            BASELINES.write_text(json.dumps(cls.results, indent=2, sort_keys=True) + "\n")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def measure(self, name, request, user=None, expected_status=200):
+        if user is not None:
+            self.client.force_authenticate(user)
+
+        timings = []
+        sizes = []
+        for iteration in range(REPEAT):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = request(iteration)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.assertEqual(response.status_code, expected_status, f"{name}: {response.content[:300]}")
+            sizes.append(len(response.content))
+            if iteration == 0:
+                query_count = len(queries)
+
+        result = {
+            "queries": query_count,
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "bytes": max(sizes),
+        }
+        self.results[name] = result
+        print(
+            f"\n{name:<28} queries {result['queries']:>3}  p50 {result['p50_ms']:>8.2f} ms  "
+            f"p95 {result['p95_ms']:>8.2f} ms  {result['bytes']:>7} B",
+            end="",
+        )
+
+        if os.environ.get("BENCHMARK_UPDATE"):
+            return
+        baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+        baseline = baselines.get(name)
+        if baseline is None:
+            self.fail(f"{name}: no baseline recorded, run with BENCHMARK_UPDATE=1")
+        self.assertLessEqual(result["queries"], baseline["queries"], f"{name}: query count regressed")
+        self.assertLessEqual(
+            result["p95_ms"],
+            baseline["p95_ms"] * LATENCY_TOLERANCE + LATENCY_SLACK_MS,
+            f"{name}: p95 latency regressed",
+        )
+        self.assertLessEqual(
+            result["bytes"], baseline["bytes"] * SIZE_TOLERANCE, f"{name}: response size regressed"
+        )
+
+    def get(self, url, params=None):
+        return lambda iteration: self.client.get(url, params or {})
+
+    # station/urls.py
+
+    def test_train_types(self):
+        self.measure("train-types list", self.get(reverse("trainstation:traintype-list")), self.user)
+        self.measure(
+            "train-types detail",
+            self.get(reverse("trainstation:traintype-detail", args=(self.train_type.id,))),
+            self.user,
+        )
+
+    def test_trains(self):
+        self.measure("trains list", self.get(reverse("trainstation:train-list")), self.user)
+        self.measure(
+            "trains detail", self.get(reverse("trainstation:train-detail", args=(self.train.id,))), self.user
+        )
+
+    def test_stations(self):
+        self.measure("stations list", self.get(reverse("trainstation:station-list")), self.user)
+        self.measure(
+            "stations detail",
+            self.get(reverse("trainstation:station-detail", args=(self.station.id,))),
+            self.user,
+        )
+
+    def test_routes(self):
+        self.measure("routes list", self.get(reverse("trainstation:route-list")), self.user)
+        self.measure(
+            "routes detail", self.get(reverse("trainstation:route-detail", args=(self.route.id,))), self.user
+        )
+
+    def test_journeys(self):
+        self.measure("journeys list", self.get(reverse("trainstation:journey-list")), self.user)
+        self.measure(
+            "journeys search",
+            self.get(reverse("trainstation:journey-list"), {
+                "source": self.journey.route.source_id,
+                "destination": self.journey.route.destination_id,
+                "departure_after": self.journey.departure_time.isoformat(),
+            }),
+            self.user,
+        )
+        self.measure(
+            "journeys detail",
+            self.get(reverse("trainstation:journey-detail", args=(self.journey.id,))),
+            self.user,
+        )
+        self.measure(
+            "journeys seat-map",
+            self.get(reverse("trainstation:journey-seat-map", args=(self.journey.id,))),
+            self.user,
+        )
+        self.measure(
+            "journeys cargos",
+            self.get(reverse("trainstation:journey-cargos", args=(self.journey.id,))),
+            self.user,
+        )
+        url = reverse("trainstation:journey-holds", args=(self.free_journey.id,))
+        self.measure(
+            "journeys holds create",
+            lambda iteration: self.client.post(
+                url, {"seats": [{"cargo": 1, "seat": iteration + 1}]}, format="json"
+            ),
+            self.user,
+            expected_status=201,
+        )
+
+    def test_connections(self):
+        self.measure(
+            "connections",
+            self.get(reverse("trainstation:connection-list"), {
+                "from": self.journey.route.source_id,
+                "to": Station.objects.exclude(pk=self.journey.route.source_id).last().id,
+                "depart_after": self.journey.departure_time.isoformat(),
+            }),
+            self.user,
+        )
+
+    def test_orders(self):
+        self.measure("orders list", self.get(reverse("trainstation:order-list")), self.user)
+        self.measure(
+            "orders detail",
+            self.get(reverse("trainstation:order-detail", args=(self.order.id,))),
+            self.user,
+        )
+        url = reverse("trainstation:order-list")
+        journey = self.free_journey
+        places = journey.train.places_in_cargo
+
+        def ticket(position):
+            # Skip cargo 1, which the holds benchmark uses.
+            position += places
+            return {"journey": journey.id, "cargo": position // places + 1, "seat": position % places + 1}
+
+        self.measure(
+            "orders create",
+            lambda iteration: self.client.post(
+                url, {"tickets": [ticket(iteration * 2), ticket(iteration * 2 + 1)]}, format="json"
+            ),
+            self.admin,
+            expected_status=201,
+        )
+
+    # user/urls.py
+
+    def test_user_endpoints(self):
+        self.measure(
+            "user register",
+            lambda iteration: self.client.post(
+                reverse("user:create"),
+                {"email": f"new{iteration}@bench.test", "password": "benchpassword"},
+            ),
+            expected_status=201,
+        )
+        self.measure(
+            "user token",
+            lambda iteration: self.client.post(
+                reverse("user:token_obtain_pair"),
+                {"email": "user@bench.test", "password": "benchpassword"},
+            ),
+        )
+        refresh = str(RefreshToken.for_user(self.user))
+        self.measure(
+            "user token refresh",
+            lambda iteration: self.client.post(reverse("user:token_refresh"), {"refresh": refresh}),
+        )
+        self.measure("user me", self.get(reverse("user:manage_user")), self.user)
@@ -0,0 +1,131 @@
+"""
+Occupancy analytics.
+
+DailyOccupancy holds one row per (day, route, train) with the journeys run,
+seats offered and sold (from the journeys' tickets_sold counters) and the
+same weighted by route distance. refresh_daily_occupancy rebuilds the rows
+from a given day on; without one it starts after the last final day, so a
+regular run only recomputes today and the future, whose sales still change.
+
+occupancy_report groups the summary rows by route, train, train type or day
+in one query: sums and load factor per group, and window functions over the
+grouped rows for the totals, each group's share of sold seats and its rank
+by load factor.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import CharField, Count, F, FloatField, Func, Max, Sum, Value, Window
+from django.db.models.functions import Cast, Concat, NullIf, Rank, TruncDate
+from django.utils import timezone
+
+from station.models import DailyOccupancy, Journey
+
+BATCH_SIZE = 2000
+
+# group_by -> (group key, label) expressions on DailyOccupancy
+GROUPS = {
+    "route": (F("route"), Concat("route__source__name", Value(" - "), "route__destination__name")),
+    "train": (F("train"), F("train__name")),
+    "train_type": (F("train__train_type"), F("train__train_type__name")),
+    "day": (F("day"), Value(None, output_field=CharField())),
+}
+
+TOTALS = ("journeys", "seats", "tickets_sold", "seat_km", "capacity_km")
+
+
+class WindowSum(Func):
+    """SUM() OVER a window; unlike Sum it may take aggregates, e.g. to total grouped rows."""
+    function = "SUM"
+    window_compatible = True
+
+
+def ratio(numerator, denominator):
+    """numerator / denominator as a float in SQL, null when the denominator is 0."""
+    return Cast(numerator, FloatField()) / NullIf(denominator, 0)
+
+
+def refresh_daily_occupancy(since=None, full=False):
+    """Recompute the summary from `since` (a date) on, or all of it; return the number of rows written."""
+    if since is None and not full:
+        last_final = DailyOccupancy.objects.filter(final=True).aggregate(day=Max("day"))["day"]
+        since = last_final + datetime.timedelta(days=1) if last_final else None
+
+    journeys = Journey.objects.order_by()
+    summary = DailyOccupancy.objects.all()
+    if since is not None:
+        start = timezone.make_aware(datetime.datetime.combine(since, datetime.time.min))
+        journeys = journeys.filter(departure_time__gte=start)
+        summary = summary.filter(day__gte=since)
+
+    capacity = F("train__cargo_num") * F("train__places_in_cargo")
+    rows = (
+        journeys.annotate(day=TruncDate("departure_time"))
+        .values("day", "route", "train")
+        .annotate(
+            journey_count=Count("pk"),
+            seats=Sum(capacity),
+            sold=Sum("tickets_sold"),
+            seat_km=Sum(F("tickets_sold") * F("route__distance")),
+            capacity_km=Sum(capacity * F("route__distance")),
+        )
+    )
+    today = timezone.localdate()
+    entries = [
+        DailyOccupancy(
+            day=row["day"],
+            route_id=row["route"],
+            train_id=row["train"],
+            journeys=row["journey_count"],
+            seats=row["seats"],
+            tickets_sold=row["sold"],
+            seat_km=row["seat_km"],
+            capacity_km=row["capacity_km"],
+            final=row["day"] < today,
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        summary.delete()
+        DailyOccupancy.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    return len(entries)
+
+
+def occupancy_report(group_by="route", route=None, train=None, train_type=None, date_from=None, date_to=None):
+    """Grouped occupancy rows, best load factor first, each carrying the totals of all rows."""
+    queryset = DailyOccupancy.objects.order_by()
+    if route is not None:
+        queryset = queryset.filter(route=route)
+    if train is not None:
+        queryset = queryset.filter(train=train)
+    if train_type is not None:
+        queryset = queryset.filter(train__train_type=train_type)
+    if date_from is not None:
+        queryset = queryset.filter(day__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(day__lte=date_to)
+
+    group, label = GROUPS[group_by]
+    # sums are named sum_<field>, as annotations may not shadow model fields
+    grouped = queryset.values(group=group, label=label).annotate(
+        **{f"sum_{field}": Sum(field) for field in TOTALS}
+    )
+    load_factor = ratio(F("sum_tickets_sold"), F("sum_seats"))
+    return grouped.annotate(
+        load_factor=load_factor,
+        seat_km_factor=ratio(F("sum_seat_km"), F("sum_capacity_km")),
+        # the total skips groups with nothing sold, so it is null rather than 0 when nothing was
+        share=Cast("sum_tickets_sold", FloatField()) / Window(
+            WindowSum(NullIf("sum_tickets_sold", 0), output_field=FloatField())
+        ),
+        rank=Window(Rank(), order_by=load_factor.desc(nulls_last=True)),
+        **{f"total_{field}": Window(WindowSum(f"sum_{field}")) for field in TOTALS},
+    ).order_by("rank", "group")
+
+
+def report_totals(rows):
+    """Totals of an evaluated occupancy_report, read off the window columns of its first row."""
+    totals = {field: rows[0][f"total_{field}"] if rows else 0 for field in TOTALS}
+    totals["load_factor"] = totals["tickets_sold"] / totals["seats"] if totals["seats"] else None
+    totals["seat_km_factor"] = totals["seat_km"] / totals["capacity_km"] if totals["capacity_km"] else None
+    return totals
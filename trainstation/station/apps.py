@@ -1,6 +1,40 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def check_shared_backends():
+    """
+    Refuse to start several workers on per-process state: cache versions,
+    seat maps and the token denylist would only change in the worker that
+    wrote them, and seat events would only reach its own streams.
+    """
+    if settings.WEB_CONCURRENCY <= 1:
+        return
+    from station.pubsub import LocalBroker
+
+    if settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} needs a cache shared between the workers, "
+            "e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache."
+        )
+    if import_string(settings.PUBSUB_BACKEND) is LocalBroker:
+        raise ImproperlyConfigured(
+            f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} needs PUBSUB_BACKEND=station.pubsub.PostgresBroker."
+        )
 
 
 class StationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "station"
+
+    def ready(self):
+        import station.signals  # noqa: F401
+
+        check_shared_backends()
@@ -0,0 +1,239 @@
+"""
+Async read path for journey search, journey detail and seat availability,
+and the server-sent event stream of seat changes.
+
+Plain Django async views, so under an ASGI server (uvicorn) a request
+waiting on the database does not pin a worker thread. Rows are fetched with
+the async ORM (aiterator, aget, aprefetch_related_objects) and handed to
+the regular serializers fully loaded, so serialization never touches the
+database. Authentication, permissions and throttling are the DRF ones of
+JourneyViewSet, run in a thread through sync_to_async. Responses match the
+sync endpoints, including the keyset cursors of the journey list.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, OuterRef, Prefetch, Subquery, aprefetch_related_objects
+from django.db.models.functions import Coalesce, Now
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.views import APIView
+
+from station.filters import JourneyFilter
+from station.models import Journey, SeatHold, Ticket
+from station.pagination import KeysetPagination, keyset_filter
+from station.pubsub import RESYNC, get_broker, journey_channel
+from station.seat_map import active_holds_prefetch
+from station.serializers import JourneyListSerializer, JourneyRetrieveSerializer
+
+# JourneyViewSet.keyset_ordering
+KEYSET_ORDERING = ("departure_time", "id")
+NOT_FOUND = "No Journey matches the given query."
+
+
+class StreamingUnavailable(APIException):
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "Event streams need an ASGI server; poll GET /journeys/{id}/ instead."
+    default_code = "streaming_unavailable"
+
+
+class ReadAccess(APIView):
+    """Stand-in view that only runs the default DRF authentication, permission and throttle checks."""
+
+
+def check_access(request):
+    """None when the request may read, else the rendered DRF error response."""
+    view = ReadAccess()
+    view.args, view.kwargs = (), {}
+    drf_request = view.initialize_request(request)
+    view.request = drf_request
+    view.headers = view.default_response_headers
+    try:
+        view.initial(drf_request)
+    except Exception as exc:
+        response = view.finalize_response(drf_request, view.handle_exception(exc))
+        return response.render()
+    return None
+
+
+def error_response(exc):
+    return JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+
+
+def journeys_with_holds():
+    active_holds = (
+        SeatHold.objects.filter(journey=OuterRef("pk"), expires_at__gt=Now())
+        .order_by()
+        .values("journey")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Journey.objects.select_related(
+        "route__source",
+        "route__destination",
+        "train__train_type",
+    ).annotate(seats_held=Coalesce(Subquery(active_holds), 0))
+
+
+class AsyncKeysetPagination(KeysetPagination):
+    """KeysetPagination with the page fetched through the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request, ordering):
+        self.request = request
+        self.ordering = ordering
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        if request.GET.get(self.count_query_param) in ("exact", "estimate"):
+            self.count = await queryset.acount()
+
+        values, reverse = self.decode_cursor(request, queryset.model)
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, values, reverse))
+
+        page = [journey async for journey in queryset[:self.page_size + 1].aiterator()]
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = values is not None, has_more
+        self.page = page
+        return page
+
+
+@require_GET
+async def journey_list(request):
+    """Same filters, ordering and cursors as GET /journeys/."""
+    denied = await sync_to_async(check_access)(request)
+    if denied is not None:
+        return denied
+    # DRF's Request only adds query_params on top of the Django request
+    request.query_params = request.GET
+
+    filterset = JourneyFilter(request.GET, queryset=journeys_with_holds())
+    if not filterset.is_valid():
+        return JsonResponse(filterset.errors, status=400)
+
+    paginator = AsyncKeysetPagination()
+    try:
+        page = await paginator.apaginate_queryset(filterset.qs, request, KEYSET_ORDERING)
+    except NotFound as exc:
+        return error_response(exc)
+    response = paginator.get_paginated_response(JourneyListSerializer(page, many=True).data)
+    return JsonResponse(response.data)
+
+
+@require_GET
+async def journey_detail(request, pk):
+    """Same body as GET /journeys/{id}/."""
+    denied = await sync_to_async(check_access)(request)
+    if denied is not None:
+        return denied
+
+    try:
+        journey = await Journey.objects.select_related(
+            "route__source",
+            "route__destination",
+            "train__train_type",
+        ).aget(pk=pk)
+    except Journey.DoesNotExist:
+        return error_response(NotFound(NOT_FOUND))
+    await aprefetch_related_objects(
+        [journey],
+        Prefetch("tickets", queryset=Ticket.objects.only("journey", "cargo", "seat")),
+        active_holds_prefetch(),
+    )
+    return JsonResponse(JourneyRetrieveSerializer(journey).data)
+
+
+@require_GET
+async def journey_availability(request, pk):
+    """Sold, held and free seats of a journey, from the counters, in one query."""
+    denied = await sync_to_async(check_access)(request)
+    if denied is not None:
+        return denied
+
+    try:
+        journey = await journeys_with_holds().aget(pk=pk)
+    except Journey.DoesNotExist:
+        return error_response(NotFound(NOT_FOUND))
+    return JsonResponse(availability(journey))
+
+
+def availability(journey):
+    return {
+        "journey": journey.pk,
+        "capacity": journey.train.capacity,
+        "tickets_sold": journey.tickets_sold,
+        "seats_held": journey.seats_held,
+        "tickets_available": journey.tickets_available,
+    }
+
+
+async def availability_snapshot(journey_id):
+    journey = await journeys_with_holds().aget(pk=journey_id)
+    seats = Ticket.objects.filter(journey_id=journey_id).order_by().values_list("cargo", "seat")
+    taken_seats = [{"cargo": cargo, "seat": seat} async for cargo, seat in seats]
+    return {**availability(journey), "taken_seats": taken_seats}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def availability_events(journey_id, subscription):
+    """
+    A "snapshot" event (availability and all taken seats), then a "delta"
+    event with the sold and released seats of every committed change. The
+    subscription is taken before the snapshot is read, so no change falls
+    in between; a "snapshot" is sent again whenever the broker asks to resync.
+    """
+    try:
+        message = RESYNC
+        while True:
+            if message == RESYNC:
+                try:
+                    snapshot = await availability_snapshot(journey_id)
+                except Journey.DoesNotExist:
+                    return
+                yield sse_event("snapshot", snapshot)
+            elif message is not None:
+                yield sse_event("delta", message)
+            try:
+                message = await asyncio.wait_for(subscription.get(), settings.SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                message = None
+                yield ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+@require_GET
+async def availability_stream(request, pk):
+    """Server-sent events with the seat availability of a journey, replacing polling of GET /journeys/{id}/."""
+    if not isinstance(request, ASGIRequest):
+        # a WSGI server reads an async iterator to the end before sending anything,
+        # so an endless stream would never reach the client and hold the worker forever
+        return error_response(StreamingUnavailable())
+    denied = await sync_to_async(check_access)(request)
+    if denied is not None:
+        return denied
+
+    if not await Journey.objects.filter(pk=pk).aexists():
+        return error_response(NotFound(NOT_FOUND))
+    subscription = get_broker().subscribe(journey_channel(pk))
+    return StreamingHttpResponse(
+        availability_events(pk, subscription),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,141 @@
+"""
+Ranked name autocomplete for stations and trains.
+
+Prefix matches come first (shortest names first), then fuzzy matches by
+trigram similarity. On PostgreSQL both run against pg_trgm GIN indexes on
+UPPER(name) (see migration 0011); other databases use an in-memory
+sorted list and trigram index per model, rebuilt when the model version
+changes. Results are cached per model version, query and limit.
+"""
+import hashlib
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.functions import Length, Upper
+
+from station.cache import get_versions
+
+# pg_trgm's default similarity threshold
+SIMILARITY_THRESHOLD = 0.3
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(text):
+    """Trigrams the way pg_trgm makes them: per word, lowercased, padded with spaces."""
+    grams = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._version = None
+        self._sorted = []
+        self._keys = []
+        self._names = {}
+        self._grams = {}
+        self._gram_counts = {}
+
+    def build(self, version=None):
+        rows = self.model.objects.order_by().values_list("pk", "name")
+        names = {pk: name for pk, name in rows}
+        grams = defaultdict(set)
+        gram_counts = {}
+        for pk, name in names.items():
+            name_grams = trigrams(name)
+            gram_counts[pk] = len(name_grams)
+            for gram in name_grams:
+                grams[gram].add(pk)
+        self._sorted = sorted((name.casefold(), pk) for pk, name in names.items())
+        self._keys = [key for key, _ in self._sorted]
+        self._names = names
+        self._grams = dict(grams)
+        self._gram_counts = gram_counts
+        self._version = version
+
+    def ensure_fresh(self, version):
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.build(version)
+
+    def search(self, query, limit):
+        folded = query.casefold()
+        prefix = []
+        for key, pk in self._sorted[bisect_left(self._keys, folded):]:
+            if not key.startswith(folded):
+                break
+            prefix.append(pk)
+        prefix.sort(key=lambda pk: (len(self._names[pk]), self._names[pk]))
+        results = prefix[:limit]
+
+        if len(results) < limit:
+            query_grams = trigrams(query)
+            shared = Counter(pk for gram in query_grams for pk in self._grams.get(gram, ()))
+            seen = set(results)
+            fuzzy = []
+            for pk, common in shared.items():
+                if pk in seen:
+                    continue
+                similarity = common / (len(query_grams) + self._gram_counts[pk] - common)
+                if similarity >= SIMILARITY_THRESHOLD:
+                    fuzzy.append((-similarity, self._names[pk], pk))
+            results += [pk for _, _, pk in sorted(fuzzy)[:limit - len(results)]]
+
+        return [(pk, self._names[pk]) for pk in results]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _memory_search(model, version, query, limit):
+    with _indexes_lock:
+        index = _indexes.setdefault(model, NameIndex(model))
+    index.ensure_fresh(version)
+    return index.search(query, limit)
+
+
+def _postgres_search(model, query, limit):
+    names = model.objects.alias(upper_name=Upper("name"))
+    upper = query.upper()
+    results = list(
+        names.filter(upper_name__startswith=upper)
+        .order_by(Length("name"), "name")
+        .values_list("pk", "name")[:limit]
+    )
+    if len(results) < limit:
+        results += list(
+            names.filter(upper_name__trigram_similar=upper)
+            .exclude(pk__in=[pk for pk, _ in results])
+            .annotate(similarity=TrigramSimilarity(Upper("name"), upper))
+            .order_by("-similarity", "name")
+            .values_list("pk", "name")[:limit - len(results)]
+        )
+    return results
+
+
+def complete_names(model, query, limit):
+    """[(pk, name)] of at most `limit` best matches for `query`."""
+    version = get_versions([model])[model]
+    digest = hashlib.md5(query.casefold().encode()).hexdigest()
+    key = f"autocomplete:{model._meta.label_lower}:{version}:{limit}:{digest}"
+    results = cache.get(key)
+    if results is None:
+        if connection.vendor == "postgresql":
+            results = _postgres_search(model, query, limit)
+        else:
+            results = _memory_search(model, version, query, limit)
+        cache.set(key, results, settings.RESPONSE_CACHE_TIMEOUT)
+    return results
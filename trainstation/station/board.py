@@ -0,0 +1,78 @@
+"""
+Materialized departure/arrival boards.
+
+BoardEntry rows copy everything a board shows (times, the other end of the
+route, train, capacity and sold seats), so serving a board is one range scan
+of the (station, kind, time) index. Rows are rebuilt for the affected
+journeys whenever a journey, route, station or train is written, and their
+sold-seat counts follow seats_changed.
+"""
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Subquery
+
+from station.models import BoardEntry, Journey
+
+BATCH_SIZE = 2000
+
+JOURNEY_FIELDS = (
+    "pk",
+    "departure_time",
+    "arrival_time",
+    "route__source_id",
+    "route__destination_id",
+    "route__source__name",
+    "route__destination__name",
+    "train__name",
+    "train__cargo_num",
+    "train__places_in_cargo",
+    "tickets_sold",
+)
+
+
+def build_entries(journeys, entry_model=BoardEntry):
+    """Yield unsaved board rows for a Journey queryset (historical models work too)."""
+    for row in journeys.order_by().values(*JOURNEY_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        common = {
+            "journey_id": row["pk"],
+            "train_name": row["train__name"],
+            "capacity": row["train__cargo_num"] * row["train__places_in_cargo"],
+            "tickets_sold": row["tickets_sold"],
+        }
+        yield entry_model(
+            station_id=row["route__source_id"],
+            kind=BoardEntry.DEPARTURE,
+            time=row["departure_time"],
+            other_station_name=row["route__destination__name"],
+            **common,
+        )
+        yield entry_model(
+            station_id=row["route__destination_id"],
+            kind=BoardEntry.ARRIVAL,
+            time=row["arrival_time"],
+            other_station_name=row["route__source__name"],
+            **common,
+        )
+
+
+def refresh_board(journeys):
+    """Rebuild the board rows of a Journey queryset."""
+    with transaction.atomic():
+        BoardEntry.objects.filter(journey__in=journeys.values("pk")).delete()
+        entries = build_entries(journeys)
+        while batch := list(islice(entries, BATCH_SIZE)):
+            BoardEntry.objects.bulk_create(batch)
+
+
+def update_board_availability(journey_id):
+    BoardEntry.objects.filter(journey_id=journey_id).update(
+        tickets_sold=Subquery(Journey.objects.filter(pk=journey_id).values("tickets_sold")[:1])
+    )
+
+
+def get_board(station_id, kind, since, limit):
+    return list(
+        BoardEntry.objects.filter(station_id=station_id, kind=kind, time__gte=since)
+        .order_by("time", "journey")[:limit]
+    )
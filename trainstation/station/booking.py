@@ -0,0 +1,194 @@
+import random
+import time
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction, connection, IntegrityError, OperationalError
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from station.cache import bump_version
+from station.models import Journey, Ticket, Order, SeatHold
+from station.signals import seats_changed
+
+# serialization_failure, deadlock_detected
+RETRYABLE_PGCODES = {"40001", "40P01"}
+
+HOLD_EXPIRY_KEY = "seat-hold-expiry:{}"
+
+
+class SeatConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are already taken."
+    default_code = "seat_conflict"
+
+    def __init__(self, seats):
+        super().__init__()
+        # Assigned after __init__ so seat numbers stay integers in the response.
+        self.detail = {
+            "detail": self.detail,
+            "conflicts": [
+                {"journey": journey_id, "cargo": cargo, "seat": seat}
+                for journey_id, cargo, seat in sorted(seats)
+            ],
+        }
+
+
+def find_taken_seats(seats):
+    """Return the subset of (journey_id, cargo, seat) triples already sold, in one query."""
+    if not seats:
+        return set()
+    return set(
+        Ticket.objects.filter(seats_condition(seats))
+        .order_by()
+        .values_list("journey_id", "cargo", "seat")
+    )
+
+
+def seats_condition(seats):
+    return reduce(
+        or_,
+        (Q(journey_id=journey_id, cargo=cargo, seat=seat) for journey_id, cargo, seat in seats),
+    )
+
+
+def find_held_seats(seats, user):
+    """Return the subset of (journey_id, cargo, seat) triples under an active hold of another user."""
+    if not seats:
+        return set()
+    return set(
+        SeatHold.objects.filter(seats_condition(seats), expires_at__gt=timezone.now())
+        .exclude(user=user)
+        .order_by()
+        .values_list("journey_id", "cargo", "seat")
+    )
+
+
+def create_tickets(order, tickets_data):
+    """
+    Insert validated tickets of an order with a single INSERT.
+
+    bulk_create() skips Ticket.save() and model signals, so sold-seat counters
+    are shifted here once per journey and seats_changed is sent on commit.
+    """
+    tickets = Ticket.objects.bulk_create(
+        [Ticket(order=order, **ticket_data) for ticket_data in tickets_data]
+    )
+
+    sold = defaultdict(list)
+    for ticket in tickets:
+        sold[ticket.journey_id].append((ticket.cargo, ticket.seat))
+
+    for journey_id, seats in sold.items():
+        Journey.adjust_tickets_sold(journey_id, len(seats))
+        transaction.on_commit(
+            lambda journey_id=journey_id, seats=seats: seats_changed.send(
+                sender=Ticket, journey_id=journey_id, sold=seats, released=[]
+            )
+        )
+    return tickets
+
+
+def lock_journeys(journey_ids):
+    """Take row locks on the journeys in a fixed order so concurrent bookings queue instead of deadlocking."""
+    return list(
+        Journey.objects.select_for_update()
+        .filter(pk__in=journey_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def is_retryable(error):
+    cause = error.__cause__
+    if getattr(cause, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    return "database is locked" in str(error)
+
+
+def reserve_seats(tickets_data, **order_data):
+    """
+    Create an order with its tickets while holding locks on the booked journeys.
+
+    Seats sold in the meantime or held by another user are reported as a
+    SeatConflict (409) listing exactly the lost seats, holds of the buyer
+    are consumed; serialization failures and deadlocks are retried
+    with jittered exponential backoff when we own the transaction.
+    """
+    seats = {
+        (ticket_data["journey"].pk, ticket_data["cargo"], ticket_data["seat"])
+        for ticket_data in tickets_data
+    }
+    journey_ids = {journey_id for journey_id, _, _ in seats}
+    attempts = 1 if connection.in_atomic_block else settings.BOOKING_MAX_ATTEMPTS
+
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                lock_journeys(journey_ids)
+                taken = find_taken_seats(seats) | find_held_seats(seats, order_data["user"])
+                if taken:
+                    raise SeatConflict(taken)
+                SeatHold.objects.filter(seats_condition(seats)).delete()
+                order = Order.objects.create(**order_data)
+                create_tickets(order, tickets_data)
+                return order
+        except IntegrityError:
+            # Someone inserted without taking the journey lock (admin, shell, ...).
+            taken = find_taken_seats(seats)
+            if taken:
+                raise SeatConflict(taken)
+            raise
+        except OperationalError as error:
+            if attempt == attempts or not is_retryable(error):
+                raise
+            delay = settings.BOOKING_RETRY_BACKOFF * 2 ** (attempt - 1)
+            time.sleep(delay + random.uniform(0, delay))
+
+
+def hold_seats(journey, seats, user):
+    """
+    Hold (cargo, seat) pairs of a journey for the user until SEAT_HOLD_TTL passes.
+
+    Expired holds on the requested seats are cleared first; holds the user
+    already owns are extended.
+    """
+    triples = {(journey.pk, cargo, seat) for cargo, seat in seats}
+    expires_at = timezone.now() + settings.SEAT_HOLD_TTL
+
+    with transaction.atomic():
+        lock_journeys([journey.pk])
+        taken = find_taken_seats(triples) | find_held_seats(triples, user)
+        if taken:
+            raise SeatConflict(taken)
+        SeatHold.objects.filter(seats_condition(triples)).delete()
+        transaction.on_commit(lambda: bump_version(SeatHold))
+        return SeatHold.objects.bulk_create([
+            SeatHold(journey=journey, user=user, cargo=cargo, seat=seat, expires_at=expires_at)
+            for _, cargo, seat in sorted(triples)
+        ])
+
+
+def hold_expiry_window(version):
+    """
+    Return (last, next): the timestamps of the latest hold expiry that has
+    passed and of the next one to come, None where there is none. A passing
+    expiry frees seats without any write, so responses counting active holds
+    depend on these too. Cached per SeatHold version until `next` passes.
+    """
+    key = HOLD_EXPIRY_KEY.format(version)
+    now = timezone.now()
+    window = cache.get(key)
+    if window is None or (window[1] is not None and window[1] <= now.timestamp()):
+        bounds = SeatHold.objects.aggregate(
+            last=Max("expires_at", filter=Q(expires_at__lte=now)),
+            next=Min("expires_at", filter=Q(expires_at__gt=now)),
+        )
+        window = tuple(bound and bound.timestamp() for bound in (bounds["last"], bounds["next"]))
+        cache.set(key, window, settings.SEAT_HOLD_TTL.total_seconds())
+    return window
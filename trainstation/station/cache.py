@@ -0,0 +1,161 @@
+"""
+Versioned response cache and conditional GET for read-mostly endpoints.
+
+Every model has a version stored in the cache: the time (ns) of its last
+change, bumped by post_save/post_delete receivers. Cached responses are
+keyed on the versions of all models they are built from, so a write makes
+the old entries unreachable instead of having to find and delete them,
+and they simply age out. ETags are derived from the same versions. Works
+with any Django cache backend; use a shared one (e.g. Redis) when running
+several processes.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+VERSION_KEY = "model-version:{}"
+STATS_KEY = "response-cache:{}:{}"
+
+
+def _version_key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def get_versions(models):
+    """Return {model: version}; models without a version yet start at the current time."""
+    keys = {_version_key(model): model for model in models}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    for key, version in missing.items():
+        if not cache.add(key, version, None):
+            missing[key] = cache.get(key, version)
+    found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump_version(model):
+    cache.set(_version_key(model), time.time_ns(), None)
+
+
+def record(basename, outcome):
+    key = STATS_KEY.format(basename, outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_stats(basenames):
+    keys = {STATS_KEY.format(basename, outcome): (basename, outcome)
+            for basename in basenames for outcome in ("hits", "misses")}
+    counters = cache.get_many(keys)
+    stats = {}
+    for basename in basenames:
+        hits = counters.get(STATS_KEY.format(basename, "hits"), 0)
+        misses = counters.get(STATS_KEY.format(basename, "misses"), 0)
+        stats[basename] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def request_fingerprint(request, *parts):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = "|".join([request.path, params, request.accepted_renderer.format, *map(str, parts)])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+class VersionedViewMixin:
+    """Versions of `cache_models` (the models a response is built from), read once per request."""
+    cache_models = ()
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def get_cache_versions(self):
+        if not hasattr(self, "_cache_versions"):
+            models = self.get_cache_models()
+            versions = get_versions(models)
+            self._cache_versions = [versions[model] for model in models]
+        return self._cache_versions
+
+    def get_fingerprint_parts(self):
+        """Everything besides the request the response depends on."""
+        return self.get_cache_versions()
+
+
+class ConditionalGetMixin(VersionedViewMixin):
+    """
+    ETag/Last-Modified for list/retrieve derived from model versions, so
+    If-None-Match/If-Modified-Since are answered with 304 before the
+    queryset is touched. Set `etag_per_user` for user-scoped responses.
+    """
+    etag_per_user = False
+
+    def get_etag(self, request):
+        user = request.user.pk if self.etag_per_user else ""
+        return quote_etag(request_fingerprint(request, user, *self.get_fingerprint_parts()))
+
+    def get_last_modified(self):
+        return max(self.get_cache_versions()) // 10 ** 9
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = self.get_last_modified()
+        headers = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+
+class CachedResponseMixin(VersionedViewMixin):
+    """
+    Cache list/retrieve response data of a viewset, keyed on host, path,
+    sorted query parameters (so the page cursor too) and the versions of
+    `cache_models`. Permission checks still run on every request.
+    """
+
+    def response_cache_key(self, request):
+        fingerprint = request_fingerprint(request, request.get_host(), *self.get_fingerprint_parts())
+        return f"response:{self.basename}:{fingerprint}"
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = self.response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record(self.basename, "hits")
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        record(self.basename, "misses")
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,176 @@
+"""
+Multi-leg connection search over the journey timetable.
+
+Every Journey is an elementary connection between the source and the
+destination of its route. The timetable keeps all of them in memory,
+sorted by departure, and answers earliest-arrival queries with the
+Connection Scan Algorithm: one linear pass starting at the requested
+departure time, which stays in the millisecond range for hundreds of
+thousands of journeys.
+
+The table is loaded once per process and then kept current by update() and
+remove() from the journey signals. Writes made by other processes are picked
+up by a reload after CONNECTIONS_TIMETABLE_MAX_AGE or invalidate(); that
+reload runs in a background thread, one at a time, while searches keep using
+the current table, and signal updates that arrive during it are replayed on
+the new table.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+
+from station.models import Journey
+
+logger = logging.getLogger(__name__)
+
+Connection = namedtuple(
+    "Connection", ["departure", "arrival", "source_id", "destination_id", "journey_id"]
+)
+
+
+class Timetable:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # held by whoever is loading the table, so only one load runs at a time
+        self._build_lock = threading.Lock()
+        self._connections = []
+        self._departures = []
+        self._by_journey = {}
+        self._built_at = None
+        self._stale = False
+        # updates received while a load is running, applied again to its result
+        self._replay = None
+
+    def _is_stale(self):
+        max_age = settings.CONNECTIONS_TIMETABLE_MAX_AGE
+        return self._stale or bool(max_age and time.monotonic() - self._built_at > max_age)
+
+    def build(self):
+        with self._lock:
+            self._replay = []
+        try:
+            rows = Journey.objects.values_list(
+                "pk", "departure_time", "arrival_time", "route__source_id", "route__destination_id"
+            ).order_by()
+            connections = sorted(
+                Connection(departure.timestamp(), arrival.timestamp(), source_id, destination_id, pk)
+                for pk, departure, arrival, source_id, destination_id in rows.iterator(chunk_size=5000)
+            )
+            with self._lock:
+                self._connections = connections
+                self._departures = [connection.departure for connection in connections]
+                self._by_journey = {connection.journey_id: connection for connection in connections}
+                self._built_at = time.monotonic()
+                self._stale = False
+                for apply, args in self._replay:
+                    apply(*args)
+        finally:
+            with self._lock:
+                self._replay = None
+
+    def refresh_in_background(self):
+        """Start reloading the table in a thread, unless a load is already running."""
+        if not self._build_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Reloading the connection timetable failed")
+            finally:
+                connections.close_all()
+                self._build_lock.release()
+
+        threading.Thread(target=run, name="timetable-build", daemon=True).start()
+        return True
+
+    def invalidate(self):
+        """Reload the table in the background on the next search."""
+        with self._lock:
+            self._stale = True
+
+    def _record(self, apply, *args):
+        if self._replay is not None:
+            self._replay.append((apply, args))
+        if self._built_at is not None:
+            apply(*args)
+
+    def _insert(self, connection):
+        self._remove(connection.journey_id)
+        index = bisect_left(self._connections, connection)
+        self._connections.insert(index, connection)
+        self._departures.insert(index, connection.departure)
+        self._by_journey[connection.journey_id] = connection
+
+    def _remove(self, journey_id):
+        connection = self._by_journey.pop(journey_id, None)
+        if connection is None:
+            return
+        index = bisect_left(self._connections, connection)
+        del self._connections[index]
+        del self._departures[index]
+
+    def update(self, journey_id, departure, arrival, source_id, destination_id):
+        """Insert or move a single journey without rebuilding the whole timetable."""
+        connection = Connection(departure.timestamp(), arrival.timestamp(), source_id, destination_id, journey_id)
+        with self._lock:
+            self._record(self._insert, connection)
+
+    def remove(self, journey_id):
+        with self._lock:
+            self._record(self._remove, journey_id)
+
+    def search(self, source_id, destination_id, depart_after, min_transfer=0):
+        """
+        Return the legs (Connection tuples) of the earliest-arriving itinerary
+        from source to destination leaving at or after depart_after, or an
+        empty list. min_transfer is the minimum change time in seconds.
+        """
+        if source_id == destination_id:
+            return []
+        if self._built_at is None:
+            # nothing to serve yet: load it here, once for all waiting requests
+            with self._build_lock:
+                if self._built_at is None:
+                    self.build()
+        elif self._is_stale():
+            self.refresh_in_background()
+        with self._lock:
+            connections = self._connections
+            start = bisect_left(self._departures, depart_after.timestamp())
+            earliest = {source_id: depart_after.timestamp()}
+            reached_by = {}
+
+            for connection in islice(connections, start, None):
+                best = earliest.get(destination_id)
+                if best is not None and connection.departure >= best:
+                    break
+                ready = earliest.get(connection.source_id)
+                if ready is None:
+                    continue
+                if connection.source_id != source_id:
+                    ready += min_transfer
+                if connection.departure < ready:
+                    continue
+                arrival = earliest.get(connection.destination_id)
+                if arrival is None or connection.arrival < arrival:
+                    earliest[connection.destination_id] = connection.arrival
+                    reached_by[connection.destination_id] = connection
+
+        legs = []
+        station_id = destination_id
+        while station_id in reached_by:
+            leg = reached_by[station_id]
+            legs.append(leg)
+            station_id = leg.source_id
+        return legs[::-1]
+
+
+timetable = Timetable()
@@ -0,0 +1,119 @@
+"""
+Streaming exports for analytics.
+
+Rows come from values() projections read with iterator(), which uses a
+server-side cursor on PostgreSQL, and are encoded as they arrive, so memory
+use does not grow with the size of the export. Under ASGI the body is an
+async generator over aiterator(): Django reads a sync streaming body there
+into a list before sending any of it.
+"""
+import csv
+import datetime
+from io import StringIO
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows are flushed to the client in pieces of about this many characters
+BUFFER_SIZE = 64 * 1024
+
+JOURNEY_FIELDS = (
+    "id",
+    "route_id",
+    "route__source__name",
+    "route__destination__name",
+    "train_id",
+    "train__name",
+    "departure_time",
+    "arrival_time",
+    "tickets_sold",
+)
+TICKET_FIELDS = (
+    "id",
+    "order_id",
+    "order__user_id",
+    "order__created_at",
+    "journey_id",
+    "journey__departure_time",
+    "cargo",
+    "seat",
+)
+ORDER_FIELDS = ("id", "user_id", "created_at", "ticket_count")
+
+
+def _csv_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_encoder(fields):
+    """(header line, row -> line) for csv."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    return line(fields), lambda row: line([_csv_value(row[field]) for field in fields])
+
+
+def ndjson_encoder(fields):
+    """(header line, row -> line) for ndjson, which has no header."""
+    encoder = DjangoJSONEncoder()
+    return "", lambda row: encoder.encode({field: row[field] for field in fields}) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_encoder, "text/csv"),
+    "ndjson": (ndjson_encoder, "application/x-ndjson"),
+}
+
+
+def buffered(header, encode, rows):
+    chunk = [header]
+    size = len(header)
+    for row in rows:
+        line = encode(row)
+        chunk.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+async def abuffered(header, encode, rows):
+    """buffered() over an async iterator of rows."""
+    chunk = [header]
+    size = len(header)
+    async for row in rows:
+        line = encode(row)
+        chunk.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def stream_export(request, queryset, fields, output, name):
+    """Stream queryset.values(*fields) as csv or ndjson (see FORMATS)."""
+    make_encoder, content_type = FORMATS[output]
+    header, encode = make_encoder(fields)
+    rows = queryset.values(*fields)
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        content = abuffered(header, encode, rows.aiterator(chunk_size=settings.EXPORT_CHUNK_SIZE))
+    else:
+        content = buffered(header, encode, rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE))
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{name}.{output}"'
+    return response
@@ -0,0 +1,114 @@
+"""
+Bulk data factories used by benchmarks and load tests.
+
+Everything is inserted with bulk_create in batches, so seeding hundreds of
+thousands of rows takes seconds rather than the hours individual saves need.
+"""
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from station.models import TrainType, Train, Station, Route, Journey, Order, Ticket
+
+BATCH_SIZE = 5000
+
+
+def seed_network(stations=50, routes=200, trains=20, seed=0):
+    """Create stations scattered over Ukraine, random routes between them and a train fleet."""
+    rng = random.Random(seed)
+    train_type, _ = TrainType.objects.get_or_create(name="Intercity")
+
+    station_objs = Station.objects.bulk_create(
+        [
+            Station(
+                name=f"Station {seed}-{index}",
+                latitude=rng.uniform(44.4, 52.4),
+                longitude=rng.uniform(22.1, 40.2),
+            )
+            for index in range(stations)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    pairs = set()
+    while len(pairs) < min(routes, stations * (stations - 1)):
+        source, destination = rng.sample(station_objs, 2)
+        pairs.add((source, destination))
+    route_objs = Route.objects.bulk_create(
+        [
+            Route(source=source, destination=destination, distance=rng.randint(20, 1200))
+            for source, destination in pairs
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    train_objs = Train.objects.bulk_create(
+        [
+            Train(
+                name=f"Train {seed}-{index}",
+                cargo_num=rng.randint(5, 15),
+                places_in_cargo=rng.choice([36, 54, 80]),
+                train_type=train_type,
+            )
+            for index in range(trains)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return station_objs, route_objs, train_objs
+
+
+def seed_journeys(count, routes, trains, days=365, seed=0, start=None):
+    """Create `count` journeys spread uniformly over the next `days` days."""
+    rng = random.Random(seed)
+    start = start or timezone.now().replace(minute=0, second=0, microsecond=0)
+    created = 0
+    taken = set()
+    while created < count:
+        batch = []
+        while len(batch) < min(BATCH_SIZE, count - created):
+            route = rng.choice(routes)
+            departure = start + timedelta(minutes=rng.randrange(days * 24 * 60))
+            train = rng.choice(trains)
+            # a train departs at most once at a given time
+            if (train.pk, departure) in taken:
+                continue
+            taken.add((train.pk, departure))
+            batch.append(
+                Journey(
+                    route=route,
+                    train=train,
+                    departure_time=departure,
+                    arrival_time=departure + timedelta(minutes=route.distance),
+                )
+            )
+        Journey.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def seed_orders(user, journeys, orders, tickets_per_order, seed=0):
+    """Create orders of consecutive seats on the given journeys and keep sold counters in sync."""
+    rng = random.Random(seed)
+    order_objs = Order.objects.bulk_create([Order(user=user) for _ in range(orders)])
+    next_seat = dict(
+        Journey.objects.filter(pk__in=[journey.pk for journey in journeys]).values_list("pk", "tickets_sold")
+    )
+    tickets = []
+    for order in order_objs:
+        journey = rng.choice(journeys)
+        for _ in range(tickets_per_order):
+            position = next_seat[journey.pk]
+            if position >= journey.train.capacity:
+                break
+            next_seat[journey.pk] = position + 1
+            tickets.append(
+                Ticket(
+                    order=order,
+                    journey=journey,
+                    cargo=position // journey.train.places_in_cargo + 1,
+                    seat=position % journey.train.places_in_cargo + 1,
+                )
+            )
+    Ticket.objects.bulk_create(tickets, batch_size=BATCH_SIZE)
+    for journey_id, sold in next_seat.items():
+        Journey.objects.filter(pk=journey_id).update(tickets_sold=sold)
+    return order_objs
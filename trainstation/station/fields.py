@@ -0,0 +1,105 @@
+from rest_framework import serializers
+
+
+class PrefetchedRelatedFieldMixin:
+    """
+    Related field that can be primed with every value of a batch, so items
+    of a list serializer resolve their objects from memory instead of
+    running one query each. Values missing from the batch fall back to the
+    regular per-item lookup, which also produces the usual error messages.
+    """
+
+    _prefetched = None
+
+    def get_lookup_field(self):
+        return getattr(self, "slug_field", "pk")
+
+    def prime(self, values):
+        lookup_field = self.get_lookup_field()
+        values = {
+            value for value in values
+            if isinstance(value, (int, str)) and not isinstance(value, bool)
+        }
+        try:
+            objects = self.get_queryset().filter(**{f"{lookup_field}__in": values})
+            self._prefetched = {}
+            ambiguous = set()
+            for obj in objects:
+                key = str(getattr(obj, lookup_field))
+                if key in self._prefetched:
+                    ambiguous.add(key)
+                self._prefetched[key] = obj
+        except (TypeError, ValueError):
+            self._prefetched = None
+            return
+        # non-unique slugs go through the regular lookup and its error
+        for key in ambiguous:
+            del self._prefetched[key]
+
+    def to_internal_value(self, data):
+        if self._prefetched is not None and isinstance(data, (int, str)) and not isinstance(data, bool):
+            obj = self._prefetched.get(str(data))
+            if obj is not None:
+                return obj
+        return super().to_internal_value(data)
+
+
+class PrefetchedPrimaryKeyRelatedField(PrefetchedRelatedFieldMixin, serializers.PrimaryKeyRelatedField):
+    pass
+
+
+class PrefetchedSlugRelatedField(PrefetchedRelatedFieldMixin, serializers.SlugRelatedField):
+    pass
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    List serializer that resolves related objects of all items with one query
+    per field, and saves with a single bulk_create/bulk_update.
+
+    For updates, pass the instances and items carrying their "id". The child
+    may define get_model_attrs(validated_data) to map fields to model
+    attributes (e.g. write-only aliases).
+    """
+
+    def to_internal_value(self, data):
+        self._matched, self._matched_pks = [], set()
+        self._instances = {str(instance.pk): instance for instance in self.instance or ()}
+        if isinstance(data, list):
+            for field in self.child.fields.values():
+                if isinstance(field, PrefetchedRelatedFieldMixin) and not field.read_only:
+                    field.prime(
+                        item.get(field.field_name) for item in data if isinstance(item, dict)
+                    )
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            instance = self._instances.get(str(data.get("id")) if isinstance(data, dict) else None)
+            if instance is None:
+                raise serializers.ValidationError({"id": ["Not found."]})
+            if instance.pk in self._matched_pks:
+                raise serializers.ValidationError({"id": ["Repeated in this request."]})
+            self._matched.append(instance)
+            self._matched_pks.add(instance.pk)
+            self.child.instance = instance
+        return super().run_child_validation(data)
+
+    def get_model_attrs(self, validated_data):
+        get_attrs = getattr(self.child, "get_model_attrs", dict)
+        return get_attrs(validated_data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**self.get_model_attrs(item)) for item in validated_data])
+
+    def update(self, instances, validated_data):
+        # validation matched every item to its instance, in order
+        fields = set()
+        for instance, attrs in zip(self._matched, validated_data):
+            for attr, value in self.get_model_attrs(attrs).items():
+                setattr(instance, attr, value)
+                fields.add(attr)
+        if fields:
+            self.child.Meta.model.objects.bulk_update(self._matched, fields)
+        return self._matched
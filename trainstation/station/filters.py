@@ -28,9 +28,17 @@ class RouteFilter(django_filters.FilterSet):
 
 class JourneyFilter(django_filters.FilterSet):
     id = django_filters.NumberFilter(field_name='id', label="Journey ID")
-    route = django_filters.CharFilter(field_name='route__name', lookup_expr="icontains", label="Route Name")
+    route = django_filters.NumberFilter(field_name='route', label="Route ID")
+    source = django_filters.NumberFilter(field_name='route__source', label="Source Station ID")
+    destination = django_filters.NumberFilter(field_name='route__destination', label="Destination Station ID")
+    departure_after = django_filters.IsoDateTimeFilter(field_name='departure_time',
+                                                       lookup_expr='gte',
+                                                       label="Departure Time From")
+    departure_before = django_filters.IsoDateTimeFilter(field_name='departure_time',
+                                                        lookup_expr='lte',
+                                                        label="Departure Time To")
     train = django_filters.CharFilter(field_name='train__name', lookup_expr="icontains", label="Train Name")
 
     class Meta:
         model = Journey
-        fields = ['id', 'route', 'train']
+        fields = ['id', 'route', 'source', 'destination', 'departure_after', 'departure_before', 'train']
@@ -0,0 +1,92 @@
+"""
+Nearest-station search without PostGIS.
+
+Stations are bucketed into an in-memory grid of CELL_DEGREES cells. A query
+only looks at the cells its radius can reach, drops points outside the
+bounding box with plain comparisons and refines the rest with the haversine
+distance. The grid is rebuilt when the Station version (see station.cache)
+changes, so writes from any process are picked up on the next lookup.
+"""
+import math
+import threading
+from collections import defaultdict, namedtuple
+
+from station.cache import get_versions
+from station.models import Station
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+CELL_DEGREES = 0.25
+
+NearbyStation = namedtuple("NearbyStation", ["id", "name", "latitude", "longitude", "distance"])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell(degrees):
+    return math.floor(degrees / CELL_DEGREES)
+
+
+def _lon_cell(longitude):
+    # 180 and -180 are the same meridian; cells past it wrap around
+    return _cell((longitude + 180) % 360 - 180)
+
+
+class StationIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._version = None
+
+    def build(self, stations=None, version=None):
+        """Index (id, name, latitude, longitude) rows, all stations by default."""
+        if stations is None:
+            stations = Station.objects.order_by().values_list("pk", "name", "latitude", "longitude")
+        cells = defaultdict(list)
+        for pk, name, latitude, longitude in stations:
+            cells[_cell(latitude), _lon_cell(longitude)].append((latitude, longitude, pk, name))
+        self._cells = dict(cells)
+        self._version = version
+
+    def ensure_fresh(self):
+        version = get_versions([Station])[Station]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.build(version=version)
+
+    def nearby(self, latitude, longitude, radius_km, limit):
+        """Stations within radius_km of the point, closest first."""
+        cells = self._cells
+        lat_span = radius_km / KM_PER_DEGREE
+        min_lat, max_lat = latitude - lat_span, latitude + lat_span
+        cos_lat = math.cos(math.radians(min(abs(latitude) + lat_span, 90)))
+        if cos_lat < 1e-6 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+            lon_cells = range(_cell(-180), _cell(180))
+        else:
+            lon_span = radius_km / (KM_PER_DEGREE * cos_lat)
+            lon_cells = range(_cell(longitude - lon_span), _cell(longitude + lon_span) + 1)
+
+        found = []
+        for lat_cell in range(_cell(min_lat), _cell(max_lat) + 1):
+            for lon_cell in lon_cells:
+                wrapped = _lon_cell(lon_cell * CELL_DEGREES)
+                for point_lat, point_lon, pk, name in cells.get((lat_cell, wrapped), ()):
+                    if not min_lat <= point_lat <= max_lat:
+                        continue
+                    distance = haversine_km(latitude, longitude, point_lat, point_lon)
+                    if distance <= radius_km:
+                        found.append(NearbyStation(pk, name, point_lat, point_lon, distance))
+
+        found.sort(key=lambda station: (station.distance, station.id))
+        return found[:limit]
+
+
+station_index = StationIndex()
@@ -0,0 +1,265 @@
+"""
+Timetable import: stations, routes and journeys from CSV files or a GTFS subset.
+
+Station, route and train names are resolved through in-memory maps loaded
+once per file instead of a query per row, rows are upserted in batches with
+bulk_create(update_conflicts=True) and every file is imported in a single
+transaction, so a bad row leaves the database untouched.
+
+CSV columns:
+    stations: name, latitude, longitude
+    routes:   source, destination, distance
+    journeys: source, destination, train, departure_time, arrival_time (ISO 8601)
+
+GTFS: stops.txt becomes stations; every pair of consecutive stops of a trip in
+stop_times.txt becomes a route and a journey run by the train named after the
+trip (trip_short_name, else trip_id). Times are taken on the given service
+date in the current time zone, and stop_times.txt must list each trip's stops
+together, as GTFS exporters do.
+"""
+import csv
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from itertools import groupby, islice
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from station.board import refresh_board
+from station.cache import bump_version
+from station.connections import timetable
+from station.geo import haversine_km
+from station.models import Station, Route, Journey, Train
+
+
+class TimetableImportError(ValueError):
+    pass
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        for row in csv.DictReader(file):
+            yield row
+
+
+def read_csv_lines(path):
+    """(line number, row) of every row of a CSV file."""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def upsert(model, objects, unique_fields, update_fields):
+    # a row may appear twice in one batch, but one INSERT ... ON CONFLICT can't touch it twice
+    attnames = [model._meta.get_field(field).attname for field in unique_fields]
+    unique = {tuple(getattr(obj, attname) for attname in attnames): obj for obj in objects}
+    model.objects.bulk_create(
+        list(unique.values()),
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+
+
+def _field(row, line, name, parse=str):
+    value = (row.get(name) or "").strip()
+    if not value:
+        raise TimetableImportError(f"Row {line}: {name} is required.")
+    try:
+        return parse(value)
+    except ValueError:
+        raise TimetableImportError(f"Row {line}: invalid {name} {value!r}.")
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _lookup(mapping, key, line, what):
+    try:
+        return mapping[key]
+    except KeyError:
+        raise TimetableImportError(f"Row {line}: unknown {what} {key!r}.")
+
+
+def import_stations(rows, batch_size=1000):
+    count = 0
+    with transaction.atomic():
+        for batch in batched(enumerate(rows, start=2), batch_size):
+            upsert(
+                Station,
+                [
+                    Station(
+                        name=_field(row, line, "name"),
+                        latitude=_field(row, line, "latitude", float),
+                        longitude=_field(row, line, "longitude", float),
+                    )
+                    for line, row in batch
+                ],
+                unique_fields=["name"],
+                update_fields=["latitude", "longitude"],
+            )
+            count += len(batch)
+        transaction.on_commit(lambda: bump_version(Station))
+    return count
+
+
+def import_routes(rows, batch_size=1000):
+    count = 0
+    with transaction.atomic():
+        stations = dict(Station.objects.values_list("name", "id"))
+        for batch in batched(enumerate(rows, start=2), batch_size):
+            upsert(
+                Route,
+                [
+                    Route(
+                        source_id=_lookup(stations, _field(row, line, "source"), line, "station"),
+                        destination_id=_lookup(stations, _field(row, line, "destination"), line, "station"),
+                        distance=_field(row, line, "distance", int),
+                    )
+                    for line, row in batch
+                ],
+                unique_fields=["source", "destination"],
+                update_fields=["distance"],
+            )
+            count += len(batch)
+        transaction.on_commit(lambda: bump_version(Route))
+    return count
+
+
+def import_journeys(rows, batch_size=1000, new_trains=None):
+    """
+    Upsert journeys by (train, departure_time). Unknown trains are an error
+    unless `new_trains` gives (cargo_num, places_in_cargo) to create them with.
+    """
+    count = 0
+    with transaction.atomic():
+        stations = dict(Station.objects.values_list("name", "id"))
+        routes = {
+            (source, destination): route_id
+            for route_id, source, destination in Route.objects.values_list("id", "source", "destination")
+        }
+        # train names are not unique; the oldest train of a name runs its journeys
+        trains = {}
+        for train_id, name in Train.objects.order_by("id").values_list("id", "name"):
+            trains.setdefault(name, train_id)
+
+        for batch in batched(enumerate(rows, start=2), batch_size):
+            if new_trains:
+                missing = {_field(row, line, "train") for line, row in batch} - trains.keys()
+                for train in Train.objects.bulk_create([
+                    Train(name=name, cargo_num=new_trains[0], places_in_cargo=new_trains[1])
+                    for name in sorted(missing)
+                ]):
+                    trains[train.name] = train.pk
+
+            journeys = []
+            for line, row in batch:
+                source = _lookup(stations, _field(row, line, "source"), line, "station")
+                destination = _lookup(stations, _field(row, line, "destination"), line, "station")
+                journeys.append(Journey(
+                    route_id=_lookup(routes, (source, destination), line, "route"),
+                    train_id=_lookup(trains, _field(row, line, "train"), line, "train"),
+                    departure_time=_field(row, line, "departure_time", _datetime),
+                    arrival_time=_field(row, line, "arrival_time", _datetime),
+                ))
+            upsert(
+                Journey,
+                journeys,
+                unique_fields=["train", "departure_time"],
+                update_fields=["route", "arrival_time"],
+            )
+            refresh_board(Journey.objects.filter(
+                pk__in=[journey.pk for journey in journeys if journey.pk is not None]
+            ))
+            count += len(batch)
+
+        def refresh():
+            bump_version(Journey)
+            bump_version(Train)
+            timetable.invalidate()
+
+        transaction.on_commit(refresh)
+    return count
+
+
+def gtfs_stops(directory):
+    for row in read_csv(Path(directory) / "stops.txt"):
+        yield {"name": row.get("stop_name"), "latitude": row.get("stop_lat"), "longitude": row.get("stop_lon")}
+
+
+def _gtfs_time(service_day, value):
+    hours, minutes, seconds = map(int, value.strip().split(":"))
+    return service_day + timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+@contextmanager
+def _gtfs_row(path, line):
+    """Turn a missing column or malformed value of a GTFS row into a TimetableImportError naming it."""
+    try:
+        yield
+    except TimetableImportError:
+        raise
+    except KeyError as error:
+        raise TimetableImportError(f"{path}:{line}: missing column {error.args[0]!r}.")
+    except (ValueError, TypeError, AttributeError) as error:
+        # short rows leave None in the last columns
+        raise TimetableImportError(f"{path}:{line}: invalid value ({error}).")
+
+
+def gtfs_legs(directory, service_date):
+    """Yield one row per consecutive pair of stops, usable by both import_routes and import_journeys."""
+    directory = Path(directory)
+    stops_path = directory / "stops.txt"
+    trips_path = directory / "trips.txt"
+    stop_times_path = directory / "stop_times.txt"
+    stops = {}
+    for line, row in read_csv_lines(stops_path):
+        with _gtfs_row(stops_path, line):
+            stops[row["stop_id"]] = (row["stop_name"], float(row["stop_lat"]), float(row["stop_lon"]))
+    trains = {}
+    for line, row in read_csv_lines(trips_path):
+        with _gtfs_row(trips_path, line):
+            trains[row["trip_id"]] = (row.get("trip_short_name") or "").strip() or row["trip_id"]
+    service_day = timezone.make_aware(datetime.combine(service_date, dt_time()))
+
+    def trip_of(numbered_row):
+        line, row = numbered_row
+        with _gtfs_row(stop_times_path, line):
+            return row["trip_id"]
+
+    for trip_id, stop_times in groupby(read_csv_lines(stop_times_path), key=trip_of):
+        calls = []
+        for line, row in stop_times:
+            with _gtfs_row(stop_times_path, line):
+                calls.append((int(row["stop_sequence"]), line, row))
+        calls.sort(key=lambda call: call[0])
+        for (_, line, departure), (_, next_line, arrival) in zip(calls, calls[1:]):
+            with _gtfs_row(stop_times_path, line):
+                source, source_lat, source_lon = _lookup(stops, departure["stop_id"], trip_id, "stop")
+                departure_time = _gtfs_time(service_day, departure["departure_time"])
+            with _gtfs_row(stop_times_path, next_line):
+                destination, destination_lat, destination_lon = _lookup(stops, arrival["stop_id"], trip_id, "stop")
+                arrival_time = _gtfs_time(service_day, arrival["arrival_time"])
+            yield {
+                "source": source,
+                "destination": destination,
+                "distance": str(max(1, round(haversine_km(source_lat, source_lon, destination_lat, destination_lon)))),
+                "train": trains.get(trip_id, trip_id),
+                "departure_time": departure_time.isoformat(),
+                "arrival_time": arrival_time.isoformat(),
+            }
@@ -0,0 +1,64 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from station.factories import seed_network, seed_journeys
+from station.filters import JourneyFilter
+from station.models import Journey
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed journeys and time the origin/destination/departure-window search, "
+        "printing the query plan. Data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=1_000_000)
+        parser.add_argument("--stations", type=int, default=300)
+        parser.add_argument("--routes", type=int, default=3000)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--keep", action="store_true")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            stations, routes, trains = seed_network(options["stations"], options["routes"])
+            seed_journeys(options["journeys"], routes, trains)
+            self.stdout.write(
+                f"Seeded {options['journeys']} journeys in {time.perf_counter() - started:.1f}s"
+            )
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE station_route, station_journey")
+
+            route = routes[len(routes) // 2]
+            first = Journey.objects.filter(route=route).order_by("departure_time").first()
+            window_start = first.departure_time if first else None
+            params = {
+                "source": route.source_id,
+                "destination": route.destination_id,
+                "departure_after": window_start.isoformat() if window_start else "",
+                "departure_before": (window_start + timedelta(days=7)).isoformat() if window_start else "",
+            }
+            queryset = JourneyFilter(params, queryset=Journey.objects.all()).qs.order_by("departure_time")[:10]
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(f"Search {params}")
+            self.stdout.write(
+                f"p50 {statistics.median(timings):.3f} ms, "
+                f"max {max(timings):.3f} ms over {len(timings)} runs"
+            )
+            explain_options = {"analyze": True} if connection.vendor == "postgresql" else {}
+            self.stdout.write(queryset.explain(**explain_options))
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
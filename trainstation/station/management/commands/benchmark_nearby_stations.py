@@ -0,0 +1,66 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from station.factories import BATCH_SIZE
+from station.geo import StationIndex
+from station.models import Station
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed stations and time nearest-station lookups on the grid index. "
+        "Data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=1000)
+        parser.add_argument("--radius", type=float, default=10, help="Search radius in km")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--keep", action="store_true")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with transaction.atomic():
+            started = time.perf_counter()
+            # scattered over Ukraine, like station.factories.seed_network
+            Station.objects.bulk_create(
+                [
+                    Station(
+                        name=f"Nearby {index}",
+                        latitude=rng.uniform(44.4, 52.4),
+                        longitude=rng.uniform(22.1, 40.2),
+                    )
+                    for index in range(options["stations"])
+                ],
+                batch_size=BATCH_SIZE,
+            )
+            self.stdout.write(f"Seeded {options['stations']} stations in {time.perf_counter() - started:.1f}s")
+
+            index = StationIndex()
+            started = time.perf_counter()
+            index.build()
+            self.stdout.write(f"Built index in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            timings, found = [], 0
+            for _ in range(options["queries"]):
+                latitude, longitude = rng.uniform(44.4, 52.4), rng.uniform(22.1, 40.2)
+                started = time.perf_counter()
+                found += len(index.nearby(latitude, longitude, options["radius"], options["limit"]))
+                timings.append((time.perf_counter() - started) * 1000)
+
+            timings.sort()
+            self.stdout.write(
+                f"Lookup within {options['radius']} km: "
+                f"p50 {statistics.median(timings):.3f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.3f} ms, "
+                f"max {timings[-1]:.3f} ms over {len(timings)} queries, "
+                f"{found / len(timings):.1f} stations per query"
+            )
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from station.factories import seed_network, seed_journeys
+from station.models import Journey
+from station.pagination import keyset_filter
+
+ORDERING = ("departure_time", "id")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare LIMIT/OFFSET with keyset pagination on the journey list, "
+        "for the first and a deep page. Data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=200_000)
+        parser.add_argument("--page", type=int, default=10_000)
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--keep", action="store_true")
+
+    def measure(self, fetch, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fetch()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        with transaction.atomic():
+            stations, routes, trains = seed_network()
+            seed_journeys(options["journeys"], routes, trains)
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE station_journey")
+
+            queryset = Journey.objects.order_by(*ORDERING)
+            for page in (1, options["page"]):
+                offset = (page - 1) * page_size
+                boundary = queryset.values_list(*ORDERING)[offset - 1] if offset else None
+
+                def offset_page():
+                    queryset.count()
+                    list(queryset[offset:offset + page_size])
+
+                def keyset_page():
+                    rows = queryset
+                    if boundary:
+                        rows = rows.filter(keyset_filter(ORDERING, boundary))
+                    list(rows[:page_size])
+
+                self.stdout.write(
+                    f"page {page}: offset {self.measure(offset_page, options['repeat']):.3f} ms, "
+                    f"keyset {self.measure(keyset_page, options['repeat']):.3f} ms (p50)"
+                )
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
@@ -0,0 +1,91 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from station.importers import (
+    TimetableImportError,
+    gtfs_legs,
+    gtfs_stops,
+    import_journeys,
+    import_routes,
+    import_stations,
+    read_csv,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import stations, routes and journeys from CSV files or a GTFS feed "
+        "(stops.txt, trips.txt, stop_times.txt). Existing rows are updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", help="CSV with name, latitude, longitude")
+        parser.add_argument("--routes", help="CSV with source, destination, distance")
+        parser.add_argument(
+            "--journeys",
+            help="CSV with source, destination, train, departure_time, arrival_time",
+        )
+        parser.add_argument("--gtfs", help="Directory of an unpacked GTFS feed")
+        parser.add_argument(
+            "--service-date",
+            type=date.fromisoformat,
+            help="Day the GTFS stop times are scheduled on (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--cargo-num",
+            type=int,
+            default=10,
+            help="Cargos of trains created for unknown GTFS trips",
+        )
+        parser.add_argument(
+            "--places-in-cargo",
+            type=int,
+            default=54,
+            help="Places per cargo of trains created for unknown GTFS trips",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        steps = []
+
+        if options["gtfs"]:
+            if not options["service_date"]:
+                raise CommandError("--service-date is required with --gtfs.")
+            directory, service_date = options["gtfs"], options["service_date"]
+            new_trains = (options["cargo_num"], options["places_in_cargo"])
+            steps += [
+                ("stops.txt", lambda: import_stations(gtfs_stops(directory), batch_size)),
+                ("stop_times.txt (routes)", lambda: import_routes(gtfs_legs(directory, service_date), batch_size)),
+                (
+                    "stop_times.txt (journeys)",
+                    lambda: import_journeys(gtfs_legs(directory, service_date), batch_size, new_trains),
+                ),
+            ]
+
+        for name, importer in (
+            ("stations", import_stations),
+            ("routes", import_routes),
+            ("journeys", import_journeys),
+        ):
+            path = options[name]
+            if path:
+                steps.append((path, lambda path=path, importer=importer: importer(read_csv(path), batch_size)))
+
+        if not steps:
+            raise CommandError("Nothing to import: pass --stations, --routes, --journeys or --gtfs.")
+
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                rows = step()
+            except (TimetableImportError, OSError) as error:
+                raise CommandError(f"{name}: {error}")
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name}: {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Timetable imported."))
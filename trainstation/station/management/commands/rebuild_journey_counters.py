@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F
+
+from station.models import Journey
+
+
+class Command(BaseCommand):
+    help = "Recount sold tickets per journey and repair drifted counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted counters, exit with an error if any are found.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = (
+            Journey.objects.annotate(actual_sold=Count("tickets"))
+            .exclude(tickets_sold=F("actual_sold"))
+            .values_list("pk", "tickets_sold", "actual_sold")
+        )
+        batch_size = options["batch_size"]
+        drift_count = 0
+        to_fix = []
+
+        for journey_id, stored, actual in drifted.iterator(chunk_size=batch_size):
+            self.stdout.write(f"Journey {journey_id}: stored {stored}, actual {actual}")
+            drift_count += 1
+            if options["check"]:
+                continue
+            to_fix.append(Journey(pk=journey_id, tickets_sold=actual))
+            if len(to_fix) >= batch_size:
+                self._save(to_fix)
+                to_fix = []
+
+        if options["check"]:
+            if drift_count:
+                raise CommandError(f"{drift_count} journey counter(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS("All journey counters are in sync."))
+            return
+
+        self._save(to_fix)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {drift_count} journey counter(s)."))
+
+    @staticmethod
+    def _save(journeys):
+        with transaction.atomic():
+            Journey.objects.bulk_update(journeys, ["tickets_sold"])
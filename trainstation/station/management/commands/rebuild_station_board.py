@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from station.board import refresh_board
+from station.models import BoardEntry, Journey
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed station boards from all journeys."
+
+    def handle(self, *args, **options):
+        refresh_board(Journey.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {BoardEntry.objects.count()} board entries."))
@@ -0,0 +1,28 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from station.analytics import refresh_daily_occupancy
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the daily occupancy summary behind /analytics/occupancy/: by default "
+        "every day after the last final one, i.e. today and later departures. Past days "
+        "are final and skipped, so refunds or journey deletions on them only show up "
+        "after a run with --since or --full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Recompute from this day (YYYY-MM-DD) on, e.g. after fixing old data.")
+        parser.add_argument("--full", action="store_true", help="Rebuild the whole summary.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must be a date as YYYY-MM-DD.")
+        written = refresh_daily_occupancy(since, full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily occupancy row(s)."))
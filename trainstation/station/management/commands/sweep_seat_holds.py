@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from station.cache import bump_version
+from station.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = "Delete expired seat holds in small batches, optionally forever every N seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Keep running and sweep every N seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = self.sweep(options["batch_size"])
+            self.stdout.write(f"Deleted {deleted} expired seat hold(s).")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
+
+    @staticmethod
+    def sweep(batch_size):
+        """Each batch is its own short DELETE by primary key, so no long table locks are held."""
+        deleted = 0
+        while True:
+            batch = list(
+                SeatHold.objects.filter(expires_at__lte=timezone.now())
+                .order_by("expires_at")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                if deleted:
+                    bump_version(SeatHold)
+                return deleted
+            deleted += SeatHold.objects.filter(pk__in=batch).delete()[0]
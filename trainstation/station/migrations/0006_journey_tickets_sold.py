@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_tickets_sold(apps, schema_editor):
+    Journey = apps.get_model("station", "Journey")
+    Ticket = apps.get_model("station", "Ticket")
+    sold = (
+        Ticket.objects.filter(journey=OuterRef("pk"))
+        .order_by()
+        .values("journey")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Journey.objects.filter(pk__in=Ticket.objects.values("journey")).update(
+        tickets_sold=Subquery(sold)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0005_alter_traintype_options_alter_train_train_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_tickets_sold, migrations.RunPython.noop),
+    ]
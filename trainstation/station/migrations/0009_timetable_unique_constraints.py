@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:54
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def duplicated(queryset, *fields):
+    """Yield the pks of each group of rows sharing `fields`, lowest first."""
+    groups = queryset.order_by().values(*fields).annotate(rows=Count("pk")).filter(rows__gt=1)
+    for group in groups:
+        values = {field: group[field] for field in fields}
+        yield list(queryset.filter(**values).order_by("pk").values_list("pk", flat=True))
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Nothing kept duplicate station names, routes or train departures out
+    before these constraints. Stations and routes are merged into the one
+    with the lowest id; duplicate journeys carry tickets, so they are
+    reported and left to be resolved by hand.
+    """
+    Station = apps.get_model("station", "Station")
+    Route = apps.get_model("station", "Route")
+    Journey = apps.get_model("station", "Journey")
+    if schema_editor.connection.vendor == "postgresql":
+        # check the repointed foreign keys now rather than at commit, as
+        # ALTER TABLE refuses tables with pending trigger events
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    for keep, *others in duplicated(Station.objects.all(), "name"):
+        Route.objects.filter(source__in=others).update(source=keep)
+        Route.objects.filter(destination__in=others).update(destination=keep)
+        Station.objects.filter(pk__in=others).delete()
+
+    for keep, *others in duplicated(Route.objects.all(), "source", "destination"):
+        Journey.objects.filter(route__in=others).update(route=keep)
+        Route.objects.filter(pk__in=others).delete()
+
+    clashes = list(duplicated(Journey.objects.all(), "train", "departure_time"))
+    if clashes:
+        raise RuntimeError(
+            "Journeys sharing a train and departure time must be merged or moved before "
+            "migrating: " + "; ".join(", ".join(map(str, pks)) for pks in clashes)
+        )
+
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0008_journey_search_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="route",
+            name="route_source_destination_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="journey",
+            constraint=models.UniqueConstraint(
+                fields=("train", "departure_time"),
+                name="journey_train_departure_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="route",
+            constraint=models.UniqueConstraint(
+                fields=("source", "destination"), name="route_source_destination_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="station",
+            constraint=models.UniqueConstraint(
+                fields=("name",), name="station_name_unique"
+            ),
+        ),
+    ]
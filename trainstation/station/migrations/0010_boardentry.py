@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:04
+
+import django.db.models.deletion
+from itertools import islice
+
+from django.db import migrations, models
+
+from station.board import BATCH_SIZE, build_entries
+
+
+def backfill_board(apps, schema_editor):
+    Journey = apps.get_model("station", "Journey")
+    BoardEntry = apps.get_model("station", "BoardEntry")
+    entries = build_entries(Journey.objects.all(), entry_model=BoardEntry)
+    while batch := list(islice(entries, BATCH_SIZE)):
+        BoardEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0009_timetable_unique_constraints"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BoardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("departure", "Departure"), ("arrival", "Arrival")],
+                        max_length=9,
+                    ),
+                ),
+                ("time", models.DateTimeField()),
+                ("other_station_name", models.CharField(max_length=100)),
+                ("train_name", models.CharField(max_length=100)),
+                ("capacity", models.PositiveIntegerField()),
+                ("tickets_sold", models.PositiveIntegerField(default=0)),
+                (
+                    "journey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="board_entries",
+                        to="station.journey",
+                    ),
+                ),
+                (
+                    "station",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="board_entries",
+                        to="station.station",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["time", "journey"],
+                "indexes": [
+                    models.Index(
+                        fields=["station", "kind", "time", "journey"],
+                        name="board_station_kind_time_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("journey", "kind"), name="board_journey_kind_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_board, migrations.RunPython.noop),
+    ]
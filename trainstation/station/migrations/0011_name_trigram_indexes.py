@@ -0,0 +1,35 @@
+from django.db import migrations
+
+TABLES = ("station_station", "station_train")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm GIN indexes on UPPER(name) serve autocomplete prefix/fuzzy
+    # matching and the icontains name filters; other databases use the
+    # in-memory index in station.autocomplete
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_name_trgm_idx '
+            f'ON {table} USING gin (UPPER("name") gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in TABLES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0010_boardentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
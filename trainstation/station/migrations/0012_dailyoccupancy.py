@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0011_name_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("journeys", models.PositiveIntegerField()),
+                ("seats", models.PositiveIntegerField()),
+                ("tickets_sold", models.PositiveIntegerField()),
+                ("seat_km", models.PositiveBigIntegerField()),
+                ("capacity_km", models.PositiveBigIntegerField()),
+                ("final", models.BooleanField(default=False)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_occupancy",
+                        to="station.route",
+                    ),
+                ),
+                (
+                    "train",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_occupancy",
+                        to="station.train",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "daily occupancy",
+                "ordering": ["day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "route", "train"),
+                        name="occupancy_day_route_train_unique",
+                    )
+                ],
+            },
+        ),
+    ]
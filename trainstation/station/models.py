@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from rest_framework.exceptions import ValidationError
 
 
@@ -23,6 +25,10 @@ class Train(models.Model):
     def __str__(self):
         return f"{self.name}, (Cargo:{self.cargo_num}, places:{self.places_in_cargo})"
 
+    @property
+    def capacity(self):
+        return self.cargo_num * self.places_in_cargo
+
 
 class Station(models.Model):
     name = models.CharField(max_length=100)
@@ -32,6 +38,11 @@ class Station(models.Model):
     def __str__(self):
         return f"{self.name}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["name"], name="station_name_unique"),
+        ]
+
 
 class Route(models.Model):
     source = models.ForeignKey(Station, on_delete=models.CASCADE, related_name="routes_from")
@@ -44,13 +55,98 @@ class Route(models.Model):
     def route_full_name(self):
         return f"{self.source.name} - {self.destination.name}"
 
+    class Meta:
+        # the unique constraint's index also serves origin/destination lookups
+        constraints = [
+            models.UniqueConstraint(fields=["source", "destination"], name="route_source_destination_unique"),
+        ]
+
 class Journey(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="journeys")
     train = models.ForeignKey(Train, on_delete=models.CASCADE, related_name="journeys")
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+
+    @property
+    def tickets_available(self):
+        # seats_held is annotated by querysets that honor temporary holds
+        return self.train.capacity - self.tickets_sold - getattr(self, "seats_held", 0)
 
+    @staticmethod
+    def adjust_tickets_sold(journey_id, delta):
+        """Shift the sold-seat counter in the database without reading the row."""
+        Journey.objects.filter(pk=journey_id).update(
+            tickets_sold=Greatest(F("tickets_sold") + delta, 0)
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["route", "departure_time"], name="journey_route_departure_idx"),
+            models.Index(fields=["departure_time"], name="journey_departure_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["train", "departure_time"], name="journey_train_departure_unique"),
+        ]
+
+
+class BoardEntry(models.Model):
+    """
+    Materialized row of a station board: one departure row at the route's
+    source and one arrival row at its destination per journey, kept in
+    sync by station.board so a board is read without joins.
+    """
+    DEPARTURE = "departure"
+    ARRIVAL = "arrival"
+    KIND_CHOICES = [(DEPARTURE, "Departure"), (ARRIVAL, "Arrival")]
+
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name="board_entries")
+    journey = models.ForeignKey(Journey, on_delete=models.CASCADE, related_name="board_entries")
+    kind = models.CharField(max_length=9, choices=KIND_CHOICES)
+    time = models.DateTimeField()
+    # destination of a departure, origin of an arrival
+    other_station_name = models.CharField(max_length=100)
+    train_name = models.CharField(max_length=100)
+    capacity = models.PositiveIntegerField()
+    tickets_sold = models.PositiveIntegerField(default=0)
+
+    @property
+    def tickets_available(self):
+        return self.capacity - self.tickets_sold
+
+    class Meta:
+        ordering = ["time", "journey"]
+        indexes = [
+            models.Index(fields=["station", "kind", "time", "journey"], name="board_station_kind_time_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["journey", "kind"], name="board_journey_kind_unique"),
+        ]
+
+
+class DailyOccupancy(models.Model):
+    """
+    Daily rollup of the journeys of one train on one route, maintained by
+    station.analytics so occupancy reports never scan journeys. Rows of days
+    that had already passed when they were summarized are final.
+    """
+    day = models.DateField()
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="daily_occupancy")
+    train = models.ForeignKey(Train, on_delete=models.CASCADE, related_name="daily_occupancy")
+    journeys = models.PositiveIntegerField()
+    seats = models.PositiveIntegerField()
+    tickets_sold = models.PositiveIntegerField()
+    # passenger-km sold and offered
+    seat_km = models.PositiveBigIntegerField()
+    capacity_km = models.PositiveBigIntegerField()
+    final = models.BooleanField(default=False)
 
+    class Meta:
+        ordering = ["day"]
+        verbose_name_plural = "daily occupancy"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "route", "train"], name="occupancy_day_route_train_unique"),
+        ]
 
 
 class Crew(models.Model):
@@ -111,3 +207,19 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("journey", "cargo", "seat")
         ordering = ["cargo", "seat"]
+
+
+class SeatHold(models.Model):
+    journey = models.ForeignKey(Journey, on_delete=models.CASCADE, related_name="holds")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="seat_holds")
+    cargo = models.PositiveIntegerField()
+    seat = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.journey_id}: {self.cargo}/{self.seat} until {self.expires_at}"
+
+    class Meta:
+        unique_together = ("journey", "cargo", "seat")
+        ordering = ["cargo", "seat"]
@@ -0,0 +1,188 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Build the "rows strictly after `values`" condition for a multi-column
+    ordering, e.g. ("departure_time", "id") gives
+    departure_time >= v1 AND (departure_time > v1 OR (departure_time = v1 AND id > v2)).
+    """
+    conditions = []
+    bound = None
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        descending = field.startswith("-") != reverse
+        lookup = f"{name}__lt" if descending else f"{name}__gt"
+        equal = {prefix.lstrip("-"): value for prefix, value in zip(ordering[:index], values)}
+        conditions.append(Q(**equal, **{lookup: values[index]}))
+        if index == 0:
+            # Redundant, but gives the planner a plain range on the leading index column.
+            bound = Q(**{f"{lookup}e": values[0]})
+    return bound & reduce(or_, conditions)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination: every page is an indexed range scan that
+    starts right after the last row of the previous page, so deep pages cost
+    the same as the first one, unlike LIMIT/OFFSET. The cursor carries the
+    ordering values of the boundary row.
+
+    Views choose the key with `keyset_ordering`; the last field must be
+    unique. Totals are only computed on request: ?count=exact runs COUNT(*),
+    ?count=estimate reads the planner row estimate on PostgreSQL.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "limit"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering = ("id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, "keyset_ordering", self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request, model):
+        """(values of self.ordering as the model's fields take them, reverse) from the cursor, or (None, False)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = list(cursor["v"]), bool(cursor.get("r"))
+            if len(values) != len(self.ordering) or None in values:
+                raise ValueError("cursor values do not match the ordering")
+            # a tampered cursor must not reach the query with values of the wrong type
+            fields = [model._meta.get_field(field.lstrip("-")) for field in self.ordering]
+            return [field.to_python(value) for field, value in zip(fields, values)], reverse
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        cursor = json.dumps({"v": values, "r": int(reverse)}, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        values, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, values, reverse))
+
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = values is not None, has_more
+        self.page = page
+        return page
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            return queryset.count()
+        if mode == "estimate":
+            if connection.vendor != "postgresql":
+                return queryset.count()
+            plan = json.loads(queryset.order_by().explain(format="json"))
+            return int(plan["Plan"]["Plan Rows"])
+        return None
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response["count"] = self.count
+        response["next"] = self.get_next_link()
+        response["previous"] = self.get_previous_link()
+        response["results"] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "description": "Only present with ?count=exact|estimate"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Include a total: exact or estimate.",
+                "schema": {"type": "string", "enum": ["exact", "estimate"]},
+            },
+        ]
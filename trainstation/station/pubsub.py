@@ -0,0 +1,168 @@
+"""
+In-process publish/subscribe for server-sent events.
+
+Subscribers are asyncio queues owned by the event loop that serves their
+stream; publishers may run in any thread (signal receivers of sync views)
+and hand messages over with call_soon_threadsafe. The backend is chosen by
+settings.PUBSUB_BACKEND:
+
+    LocalBroker     messages only reach streams of the publishing process
+    PostgresBroker  messages go through NOTIFY, and one LISTEN connection
+                    per process fans them out to its local streams, so any
+                    worker's write reaches every worker's streams
+
+A subscriber that falls QUEUE_SIZE messages behind, or may have missed
+messages while the LISTEN connection was down, gets RESYNC instead and is
+expected to reload its state.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+RESYNC = "resync"
+QUEUE_SIZE = 1000
+
+
+def journey_channel(journey_id):
+    return f"journey:{journey_id}"
+
+
+class Subscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, message):
+        """Queue a message from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # the stream's loop is already closed
+            self.close()
+
+    def _put(self, message):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        """Subscribe the running event loop to a channel."""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def dispatch(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def dispatch_all(self, message):
+        with self._lock:
+            subscriptions = [subscription for group in self._subscriptions.values() for subscription in group]
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def publish(self, channel, message):
+        self.dispatch(channel, message)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    NOTIFY on publish (delivered when the publishing transaction commits),
+    LISTEN on a dedicated connection in a daemon thread started by the first
+    subscription of the process. Payloads are limited to 8000 bytes.
+    """
+    pg_channel = "station_pubsub"
+    poll_timeout = 5
+    retry_delay = 1
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, name="pubsub-listener", daemon=True)
+                self._listener.start()
+        return subscription
+
+    def publish(self, channel, message):
+        payload = json.dumps({"channel": channel, "message": message}, separators=(",", ":"))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.pg_channel, payload])
+
+    def listen(self):
+        while True:
+            listener = connections.create_connection("default")
+            try:
+                listener.ensure_connection()
+                listener.set_autocommit(True)
+                raw = listener.connection
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.pg_channel}")
+                # anything published while we were not listening is lost
+                self.dispatch_all(RESYNC)
+                while True:
+                    readable, _, _ = select.select([raw], [], [], self.poll_timeout)
+                    if not readable:
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        payload = json.loads(raw.notifies.pop(0).payload)
+                        self.dispatch(payload["channel"], payload["message"])
+            except Exception:
+                logger.exception("Pub/sub listener failed, reconnecting")
+            finally:
+                listener.close()
+            time.sleep(self.retry_delay)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.PUBSUB_BACKEND)()
+    return _broker
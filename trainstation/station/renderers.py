@@ -0,0 +1,15 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class OctetStreamRenderer(BaseRenderer):
+    """Pass raw bytes through untouched; anything else (e.g. errors) is rendered as JSON."""
+
+    media_type = "application/octet-stream"
+    format = "bin"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+        return JSONRenderer().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,103 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from station.models import SeatHold
+
+SEAT_MAP_CACHE_KEY = "journey-seat-map:{}"
+SEAT_MAP_TIMEOUT = 60 * 60
+CARGO_COUNTS_CACHE_KEY = "journey-cargo-counts:{}"
+
+
+def pack_seats(seats, cargo_num, places_in_cargo):
+    """
+    Pack taken (cargo, seat) pairs into one bitset per cargo.
+
+    Each cargo takes ceil(places_in_cargo / 8) bytes, seat 1 being the most
+    significant bit of the first byte.
+    """
+    row_size = (places_in_cargo + 7) // 8
+    bitmap = bytearray(row_size * cargo_num)
+    for cargo, seat in seats:
+        if 1 <= cargo <= cargo_num and 1 <= seat <= places_in_cargo:
+            position = seat - 1
+            bitmap[(cargo - 1) * row_size + position // 8] |= 0x80 >> (position % 8)
+    return bytes(bitmap)
+
+
+def split_cargos(bitmap, cargo_num, places_in_cargo):
+    row_size = (places_in_cargo + 7) // 8
+    return [bitmap[index * row_size:(index + 1) * row_size] for index in range(cargo_num)]
+
+
+def get_seat_map(journey):
+    """Return the packed seat map of a journey, built with a single query and cached."""
+    train = journey.train
+    key = SEAT_MAP_CACHE_KEY.format(journey.pk)
+    cached = cache.get(key)
+    if cached and cached[:2] == (train.cargo_num, train.places_in_cargo):
+        return cached[2]
+
+    seats = journey.tickets.order_by().values_list("cargo", "seat")
+    bitmap = pack_seats(seats, train.cargo_num, train.places_in_cargo)
+    cache.set(key, (train.cargo_num, train.places_in_cargo, bitmap), SEAT_MAP_TIMEOUT)
+    return bitmap
+
+
+def invalidate_seat_map(journey_id):
+    cache.delete(SEAT_MAP_CACHE_KEY.format(journey_id))
+
+
+def active_holds_prefetch():
+    """Prefetch a journey's unexpired holds into `active_holds`, for counting them per cargo."""
+    return Prefetch(
+        "holds",
+        queryset=SeatHold.objects.filter(expires_at__gt=Now()).only("journey", "cargo"),
+        to_attr="active_holds",
+    )
+
+
+def summarize_cargos(taken, cargo_num, places_in_cargo):
+    """Free seats of every cargo from a {cargo: sold or held seats} mapping."""
+    return [
+        {"cargo": cargo, "places": places_in_cargo, "free": max(places_in_cargo - taken.get(cargo, 0), 0)}
+        for cargo in range(1, cargo_num + 1)
+    ]
+
+
+def get_cargo_counts(journey, holds_state):
+    """
+    Return {cargo: seats sold or under an active hold} of a journey from
+    one query, tickets and active holds each grouped by cargo, cached apart
+    from the seat map. Holds come and go without a ticket write, so the
+    entry is only reused for the same `holds_state` (anything that changes
+    with them, e.g. the SeatHold version and hold_expiry_window). Counts do
+    not depend on the train's layout, so a resized train needs no
+    invalidation.
+    """
+    key = CARGO_COUNTS_CACHE_KEY.format(journey.pk)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == holds_state:
+        return cached[1]
+
+    sold = journey.tickets.order_by().values("cargo").annotate(taken=Count("pk")).values_list("cargo", "taken")
+    held = (
+        journey.holds.filter(expires_at__gt=timezone.now())
+        .order_by()
+        .values("cargo")
+        .annotate(taken=Count("pk"))
+        .values_list("cargo", "taken")
+    )
+    taken = Counter()
+    for cargo, count in sold.union(held, all=True):
+        taken[cargo] += count
+    taken = dict(taken)
+    cache.set(key, (holds_state, taken), SEAT_MAP_TIMEOUT)
+    return taken
+
+
+def invalidate_cargo_counts(journey_id):
+    cache.delete(CARGO_COUNTS_CACHE_KEY.format(journey_id))
@@ -1,8 +1,14 @@
-from django.db import transaction
+from collections import Counter
+
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, ErrorDetail
+from rest_framework.settings import api_settings
 
-from station.models import TrainType, Train, Station, Route, Journey, Ticket, Order
+from station.analytics import GROUPS
+from station.booking import reserve_seats, hold_seats
+from station.fields import BulkListSerializer, PrefetchedPrimaryKeyRelatedField, PrefetchedSlugRelatedField
+from station.models import TrainType, Train, Station, Route, Journey, Ticket, Order, BoardEntry
+from station.seat_map import summarize_cargos
 
 
 class TrainTypeSerializer(serializers.ModelSerializer):
@@ -28,6 +34,15 @@ class TrainSerializer(serializers.ModelSerializer):
         return train
 
 
+class TrainBulkSerializer(TrainSerializer):
+    train_type = PrefetchedPrimaryKeyRelatedField(
+        queryset=TrainType.objects.all(), write_only=True
+    )
+
+    class Meta(TrainSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
 class StationSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -35,6 +50,51 @@ class StationSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "latitude", "longitude")
 
 
+class BoardQuerySerializer(serializers.Serializer):
+    KINDS = {"departures": BoardEntry.DEPARTURE, "arrivals": BoardEntry.ARRIVAL}
+
+    kind = serializers.ChoiceField(choices=list(KINDS), default="departures")
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=50)
+
+
+class BoardEntrySerializer(serializers.ModelSerializer):
+    other_station = serializers.CharField(
+        source="other_station_name",
+        help_text="Destination of a departure, origin of an arrival",
+    )
+    train = serializers.CharField(source="train_name")
+    tickets_available = serializers.IntegerField()
+
+    class Meta:
+        model = BoardEntry
+        fields = ("journey", "time", "other_station", "train", "tickets_available")
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0, max_value=1000, default=10, help_text="Radius in km")
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class NearbyStationSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    distance = serializers.FloatField(help_text="Distance in km")
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=10)
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
 class RouteSerializer(serializers.ModelSerializer):
     source = serializers.SlugRelatedField(
         queryset=Station.objects.all(),
@@ -83,19 +143,91 @@ class JourneyListSerializer(serializers.ModelSerializer):
         return f"{obj.route.source.name} - {obj.route.destination.name}"
 
     def get_tickets_available(self, obj):
-        total_seats = obj.train.cargo_num * obj.train.places_in_cargo
-        taken_seats = obj.tickets.count()
-        return total_seats - taken_seats
+        return obj.tickets_available
+
+
+class JourneyBulkListSerializer(BulkListSerializer):
+    """
+    Check (train, departure_time) clashes of the whole batch with one query,
+    instead of a UniqueTogetherValidator query per item.
+    """
+    unique_error = "The fields train, departure_time must make a unique set."
+
+    def to_internal_value(self, data):
+        journeys = super().to_internal_value(data)
+        instances = self._matched or [None] * len(journeys)
+
+        keys = []
+        for journey, instance in zip(journeys, instances):
+            train = journey["train"] if "train" in journey else instance.train
+            departure_time = journey["departure_time"] if "departure_time" in journey else instance.departure_time
+            keys.append((train.pk, departure_time))
+        taken = set(
+            Journey.objects.filter(
+                train__in={train for train, _ in keys},
+                departure_time__in={departure_time for _, departure_time in keys},
+            )
+            .exclude(pk__in=[instance.pk for instance in self._matched])
+            .values_list("train", "departure_time")
+        )
+
+        errors = []
+        for key in keys:
+            if key in taken:
+                errors.append({
+                    api_settings.NON_FIELD_ERRORS_KEY: [ErrorDetail(self.unique_error, code="unique")]
+                })
+            else:
+                errors.append({})
+            taken.add(key)
+
+        if any(errors):
+            raise ValidationError(errors)
+        return journeys
+
+
+class JourneyBulkSerializer(JourneyListSerializer):
+    train = PrefetchedSlugRelatedField(
+        queryset=Train.objects.all(),
+        slug_field="name",
+    )
+    route_write = PrefetchedPrimaryKeyRelatedField(
+        queryset=Route.objects.select_related("source", "destination"),
+        write_only=True,
+    )
+
+    class Meta(JourneyListSerializer.Meta):
+        list_serializer_class = JourneyBulkListSerializer
+        validators = []
+
+    def get_model_attrs(self, validated_data):
+        attrs = dict(validated_data)
+        if "route_write" in attrs:
+            attrs["route"] = attrs.pop("route_write")
+        return attrs
+
+
+class CargoSerializer(serializers.Serializer):
+    cargo = serializers.IntegerField()
+    places = serializers.IntegerField()
+    free = serializers.IntegerField()
 
 
 class JourneyRetrieveSerializer(serializers.ModelSerializer):
     route = RouteSerializer(read_only=True)
     train = TrainSerializer(read_only=True)
+    cargos = serializers.SerializerMethodField(read_only=True)
     taken_seats = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Journey
-        fields = ("id", "route", "train", "departure_time", "arrival_time", "taken_seats")
+        fields = ("id", "route", "train", "departure_time", "arrival_time", "cargos", "taken_seats")
+
+    def get_cargos(self, obj):
+        # counted from the prefetched tickets, which taken_seats needs anyway, and active_holds_prefetch
+        taken = Counter(ticket.cargo for ticket in obj.tickets.all())
+        taken.update(hold.cargo for hold in obj.active_holds)
+        return summarize_cargos(taken, obj.train.cargo_num, obj.train.places_in_cargo)
 
     def get_taken_seats(self, obj):
         return [
@@ -104,7 +236,56 @@ class JourneyRetrieveSerializer(serializers.ModelSerializer):
         ]
 
 
+class JourneyCargosSerializer(serializers.Serializer):
+    journey = serializers.IntegerField()
+    cargos = CargoSerializer(many=True)
+
+
+class JourneySeatMapSerializer(serializers.Serializer):
+    journey = serializers.IntegerField()
+    cargo_num = serializers.IntegerField()
+    places_in_cargo = serializers.IntegerField()
+    cargos = serializers.ListField(
+        child=serializers.CharField(),
+        help_text="Base64-encoded occupancy bitset of every cargo",
+    )
+
+
+class TicketBulkListSerializer(BulkListSerializer):
+    """
+    Validate a batch of tickets as a whole: journeys (with trains) are resolved
+    in one query and repeated seats are rejected in memory. Seats sold by
+    other orders are checked under lock by reserve_seats().
+    """
+    unique_error = "The fields journey, cargo, seat must make a unique set."
+
+    def to_internal_value(self, data):
+        tickets = super().to_internal_value(data)
+
+        errors = []
+        seen = set()
+        for ticket in tickets:
+            seat = (ticket["journey"].pk, ticket["cargo"], ticket["seat"])
+            if seat in seen:
+                errors.append({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        ErrorDetail(self.unique_error, code="unique")
+                    ]
+                })
+            else:
+                errors.append({})
+            seen.add(seat)
+
+        if any(errors):
+            raise ValidationError(errors)
+        return tickets
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    journey = PrefetchedPrimaryKeyRelatedField(
+        queryset=Journey.objects.select_related("train")
+    )
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -118,6 +299,8 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "cargo", "seat", "journey")
+        list_serializer_class = TicketBulkListSerializer
+        validators = []
 
 class TicketListSerializer(TicketSerializer):
     journey = JourneySerializer(read_only=True)
@@ -138,12 +321,8 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        tickets_data = validated_data.pop("tickets")
+        return reserve_seats(tickets_data, **validated_data)
 
 
 class OrderListSerializer(OrderSerializer):
@@ -154,5 +333,117 @@ class OrderDetailSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
 
 
+class SeatSerializer(serializers.Serializer):
+    cargo = serializers.IntegerField(min_value=1)
+    seat = serializers.IntegerField(min_value=1)
 
 
+class SeatHoldSerializer(serializers.Serializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def validate_seats(self, seats):
+        train = self.context["journey"].train
+        errors = []
+        for seat in seats:
+            try:
+                Ticket.validate_ticket(seat["cargo"], seat["seat"], train, ValidationError)
+                errors.append({})
+            except ValidationError as error:
+                errors.append(error.detail)
+        if any(errors):
+            raise ValidationError(errors)
+        return seats
+
+    def create(self, validated_data):
+        holds = hold_seats(
+            self.context["journey"],
+            [(seat["cargo"], seat["seat"]) for seat in validated_data["seats"]],
+            validated_data["user"],
+        )
+        return {
+            "seats": [{"cargo": hold.cargo, "seat": hold.seat} for hold in holds],
+            "expires_at": holds[0].expires_at,
+        }
+
+
+class ConnectionQuerySerializer(serializers.Serializer):
+    depart_after = serializers.DateTimeField(required=False)
+    min_transfer = serializers.IntegerField(
+        min_value=0, default=10, help_text="Minimum change time in minutes"
+    )
+
+    def get_fields(self):
+        # "from" is a keyword, so the station fields cannot be declared as attributes
+        fields = super().get_fields()
+        fields["from"] = serializers.PrimaryKeyRelatedField(queryset=Station.objects.all())
+        fields["to"] = serializers.PrimaryKeyRelatedField(queryset=Station.objects.all())
+        return fields
+
+
+class ConnectionLegSerializer(serializers.ModelSerializer):
+    journey = serializers.IntegerField(source="id")
+    source = serializers.CharField(source="route.source.name")
+    destination = serializers.CharField(source="route.destination.name")
+    train = serializers.CharField(source="train.name")
+
+    class Meta:
+        model = Journey
+        fields = ("journey", "source", "destination", "train", "departure_time", "arrival_time")
+
+
+class ConnectionSerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    transfers = serializers.IntegerField()
+    legs = ConnectionLegSerializer(many=True)
+
+
+class OccupancyQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=list(GROUPS), default="route")
+    route = serializers.PrimaryKeyRelatedField(queryset=Route.objects.all(), required=False)
+    train = serializers.PrimaryKeyRelatedField(queryset=Train.objects.all(), required=False)
+    train_type = serializers.PrimaryKeyRelatedField(queryset=TrainType.objects.all(), required=False)
+
+    def get_fields(self):
+        # "from" is a keyword, so the day range cannot be declared as attributes
+        fields = super().get_fields()
+        fields["from"] = serializers.DateField(required=False)
+        fields["to"] = serializers.DateField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        if "from" in attrs and "to" in attrs and attrs["from"] > attrs["to"]:
+            raise ValidationError({"to": "Must not be before from."})
+        return attrs
+
+
+class OccupancyTotalsSerializer(serializers.Serializer):
+    journeys = serializers.IntegerField()
+    seats = serializers.IntegerField()
+    tickets_sold = serializers.IntegerField()
+    seat_km = serializers.IntegerField()
+    capacity_km = serializers.IntegerField()
+    load_factor = serializers.FloatField(allow_null=True)
+    seat_km_factor = serializers.FloatField(allow_null=True)
+
+
+class OccupancyGroupSerializer(serializers.Serializer):
+    # route, train or train type id, or the day
+    group = serializers.ReadOnlyField()
+    label = serializers.CharField(allow_null=True)
+    journeys = serializers.IntegerField(source="sum_journeys")
+    seats = serializers.IntegerField(source="sum_seats")
+    tickets_sold = serializers.IntegerField(source="sum_tickets_sold")
+    seat_km = serializers.IntegerField(source="sum_seat_km")
+    capacity_km = serializers.IntegerField(source="sum_capacity_km")
+    load_factor = serializers.FloatField(allow_null=True)
+    seat_km_factor = serializers.FloatField(allow_null=True)
+    share = serializers.FloatField(allow_null=True, help_text="Share of all tickets sold")
+    rank = serializers.IntegerField(help_text="Rank by load factor")
+
+
+class OccupancyReportSerializer(serializers.Serializer):
+    group_by = serializers.CharField()
+    totals = OccupancyTotalsSerializer()
+    groups = OccupancyGroupSerializer(many=True)
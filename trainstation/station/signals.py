@@ -0,0 +1,157 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver, Signal
+
+from station.board import refresh_board, update_board_availability
+from station.cache import bump_version
+from station.connections import timetable
+from station.models import Journey, Ticket, Route, TrainType, Train, Station, Order
+from station.pubsub import get_broker, journey_channel
+from station.seat_map import invalidate_seat_map, invalidate_cargo_counts
+
+# Sent after commit whenever tickets of a journey are sold or released,
+# including bulk inserts that bypass post_save.
+# Arguments: journey_id, sold and released lists of (cargo, seat) pairs.
+seats_changed = Signal()
+
+
+def send_seats_changed(journey_id, sold=(), released=()):
+    transaction.on_commit(
+        partial(seats_changed.send, sender=Ticket, journey_id=journey_id, sold=list(sold), released=list(released))
+    )
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_seat(sender, instance, **kwargs):
+    # the stored seat, so post_save can tell a moved ticket from an unchanged one
+    instance._previous_seat = None
+    if not instance._state.adding:
+        instance._previous_seat = (
+            Ticket.objects.filter(pk=instance.pk).values_list("journey_id", "cargo", "seat").first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def increment_tickets_sold(sender, instance, created, **kwargs):
+    current = (instance.journey_id, instance.cargo, instance.seat)
+    previous = getattr(instance, "_previous_seat", None)
+    if created or previous is None:
+        Journey.adjust_tickets_sold(instance.journey_id, 1)
+        send_seats_changed(instance.journey_id, sold=[current[1:]])
+    elif previous != current:
+        previous_journey = previous[0]
+        if previous_journey != instance.journey_id:
+            Journey.adjust_tickets_sold(previous_journey, -1)
+            Journey.adjust_tickets_sold(instance.journey_id, 1)
+            send_seats_changed(previous_journey, released=[previous[1:]])
+            send_seats_changed(instance.journey_id, sold=[current[1:]])
+        else:
+            send_seats_changed(instance.journey_id, sold=[current[1:]], released=[previous[1:]])
+
+
+@receiver(post_delete, sender=Ticket)
+def decrement_tickets_sold(sender, instance, **kwargs):
+    Journey.adjust_tickets_sold(instance.journey_id, -1)
+    send_seats_changed(instance.journey_id, released=[(instance.cargo, instance.seat)])
+
+
+@receiver(seats_changed)
+def drop_seat_map(sender, journey_id, **kwargs):
+    invalidate_seat_map(journey_id)
+
+
+@receiver(seats_changed)
+def drop_cargo_counts(sender, journey_id, **kwargs):
+    invalidate_cargo_counts(journey_id)
+
+
+@receiver(seats_changed)
+def update_board_tickets_sold(sender, journey_id, **kwargs):
+    update_board_availability(journey_id)
+
+
+@receiver(seats_changed)
+def bump_ticket_version(sender, **kwargs):
+    # covers bulk ticket writes that skip post_save; already sent after commit
+    bump_version(Ticket)
+
+
+# keeps a delta well under the 8000 byte NOTIFY payload limit
+SEATS_PER_DELTA = 250
+
+
+@receiver(seats_changed)
+def publish_seat_delta(sender, journey_id, sold, released, **kwargs):
+    broker = get_broker()
+    for start in range(0, max(len(sold), len(released)), SEATS_PER_DELTA):
+        broker.publish(journey_channel(journey_id), {
+            "sold": [{"cargo": cargo, "seat": seat} for cargo, seat in sold[start:start + SEATS_PER_DELTA]],
+            "released": [
+                {"cargo": cargo, "seat": seat} for cargo, seat in released[start:start + SEATS_PER_DELTA]
+            ],
+        })
+
+
+@receiver(post_save, sender=Journey)
+def update_timetable(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: timetable.update(
+            instance.pk,
+            instance.departure_time,
+            instance.arrival_time,
+            instance.route.source_id,
+            instance.route.destination_id,
+        )
+    )
+
+
+@receiver(post_delete, sender=Journey)
+def remove_from_timetable(sender, instance, **kwargs):
+    journey_id = instance.pk
+    transaction.on_commit(lambda: timetable.remove(journey_id))
+
+
+@receiver(post_save, sender=Route)
+def rebuild_timetable(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(timetable.invalidate)
+
+
+@receiver(post_save, sender=Journey)
+def refresh_journey_board(sender, instance, **kwargs):
+    refresh_board(Journey.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Route)
+def refresh_route_board(sender, instance, created, **kwargs):
+    if not created:
+        refresh_board(Journey.objects.filter(route=instance))
+
+
+@receiver(post_save, sender=Station)
+def refresh_station_board(sender, instance, created, **kwargs):
+    if not created:
+        refresh_board(Journey.objects.filter(Q(route__source=instance) | Q(route__destination=instance)))
+
+
+@receiver(post_save, sender=Train)
+def refresh_train_board(sender, instance, created, **kwargs):
+    if not created:
+        refresh_board(Journey.objects.filter(train=instance))
+
+
+# Models whose cached responses and ETags change by bumping their version on write.
+# Tickets are versioned through seats_changed, seat holds where they are written.
+VERSIONED_MODELS = (TrainType, Train, Station, Route, Journey, Order)
+
+
+def bump_model_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_model_version, sender=model, dispatch_uid=f"version-save-{model.__name__}")
+    post_delete.connect(bump_model_version, sender=model, dispatch_uid=f"version-delete-{model.__name__}")
@@ -0,0 +1,148 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.analytics import refresh_daily_occupancy
+from station.models import Station, Route, Train, TrainType, Journey, DailyOccupancy
+
+OCCUPANCY_URL = reverse("trainstation:analytics-occupancy")
+
+
+class OccupancyAnalyticsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        kyiv = Station.objects.create(name="Kyiv", latitude=50.45, longitude=30.52)
+        lviv = Station.objects.create(name="Lviv", latitude=49.84, longitude=24.03)
+        odesa = Station.objects.create(name="Odesa", latitude=46.48, longitude=30.72)
+        self.to_lviv = Route.objects.create(source=kyiv, destination=lviv, distance=540)
+        self.to_odesa = Route.objects.create(source=kyiv, destination=odesa, distance=480)
+        self.express = TrainType.objects.create(name="Express")
+        self.intercity = Train.objects.create(
+            name="Intercity", cargo_num=2, places_in_cargo=10, train_type=self.express
+        )
+        self.regional = Train.objects.create(name="Regional", cargo_num=1, places_in_cargo=10)
+        today = timezone.localdate()
+        self.past_day = today - timedelta(days=2)
+        self.future_day = today + timedelta(days=2)
+        self.past = self.journey(self.to_lviv, self.intercity, self.past_day, sold=10)
+        self.journey(self.to_lviv, self.intercity, self.future_day, sold=5)
+        self.journey(self.to_odesa, self.regional, self.future_day, sold=9)
+
+    def journey(self, route, train, day, sold):
+        departure = timezone.make_aware(datetime.combine(day, time(12)))
+        journey = Journey.objects.create(
+            route=route,
+            train=train,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=5),
+        )
+        Journey.objects.filter(pk=journey.pk).update(tickets_sold=sold)
+        return journey
+
+    def get(self, params=None):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(OCCUPANCY_URL, params)
+
+    def test_refresh_summarizes_days(self):
+        self.assertEqual(refresh_daily_occupancy(), 3)
+
+        past = DailyOccupancy.objects.get(day=self.past_day)
+        self.assertEqual(
+            (past.route, past.train, past.journeys, past.seats, past.tickets_sold, past.seat_km, past.capacity_km),
+            (self.to_lviv, self.intercity, 1, 20, 10, 5400, 10800),
+        )
+        self.assertTrue(past.final)
+        self.assertFalse(DailyOccupancy.objects.filter(day=self.future_day, final=True).exists())
+
+    def test_refresh_skips_final_days(self):
+        refresh_daily_occupancy()
+        Journey.objects.filter(pk=self.past.pk).update(tickets_sold=0)
+
+        self.assertEqual(refresh_daily_occupancy(), 2)
+        self.assertEqual(DailyOccupancy.objects.get(day=self.past_day).tickets_sold, 10)
+
+        refresh_daily_occupancy(since=self.past_day)
+        self.assertEqual(DailyOccupancy.objects.get(day=self.past_day).tickets_sold, 0)
+
+    def test_command_full_rebuild(self):
+        refresh_daily_occupancy()
+        Journey.objects.filter(pk=self.past.pk).delete()
+        out = StringIO()
+
+        call_command("refresh_occupancy_summary", "--full", stdout=out)
+
+        self.assertIn("Wrote 2 daily occupancy row(s).", out.getvalue())
+        self.assertFalse(DailyOccupancy.objects.filter(day=self.past_day).exists())
+
+    def test_occupancy_by_route_in_one_query(self):
+        refresh_daily_occupancy()
+
+        with self.assertNumQueries(1):
+            res = self.get()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["group_by"], "route")
+        self.assertEqual(res.data["totals"]["journeys"], 3)
+        self.assertEqual(res.data["totals"]["seats"], 50)
+        self.assertEqual(res.data["totals"]["tickets_sold"], 24)
+        self.assertAlmostEqual(res.data["totals"]["load_factor"], 0.48)
+        odesa, lviv = res.data["groups"]
+        self.assertEqual((odesa["group"], odesa["label"], odesa["rank"]), (self.to_odesa.id, "Kyiv - Odesa", 1))
+        self.assertAlmostEqual(odesa["load_factor"], 0.9)
+        self.assertAlmostEqual(odesa["share"], 9 / 24)
+        self.assertEqual((lviv["group"], lviv["rank"], lviv["seats"], lviv["seat_km"]), (self.to_lviv.id, 2, 40, 8100))
+        self.assertAlmostEqual(lviv["load_factor"], 15 / 40)
+
+    def test_occupancy_by_train_type(self):
+        refresh_daily_occupancy()
+
+        res = self.get({"group_by": "train_type"})
+
+        groups = {group["label"]: group["tickets_sold"] for group in res.data["groups"]}
+        self.assertEqual(groups, {"Express": 15, None: 9})
+
+    def test_occupancy_by_day_filtered(self):
+        refresh_daily_occupancy()
+
+        res = self.get({"group_by": "day", "from": self.future_day, "train": self.intercity.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["groups"]), 1)
+        self.assertEqual(res.data["groups"][0]["group"], self.future_day)
+        self.assertEqual(res.data["totals"]["tickets_sold"], 5)
+
+    def test_empty_report(self):
+        res = self.get()
+
+        self.assertEqual(res.data["groups"], [])
+        self.assertEqual(res.data["totals"]["seats"], 0)
+        self.assertIsNone(res.data["totals"]["load_factor"])
+
+    def test_invalid_range(self):
+        res = self.get({"from": self.future_day, "to": self.past_day})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("to", res.data)
+
+    def test_admin_only(self):
+        user = get_user_model().objects.create_user(email="user@test.com", password="testpassword")
+        self.client.force_authenticate(user)
+
+        res = self.client.get(OCCUPANCY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from station.models import Train, Order, Ticket, SeatHold
+from station.tests.test_journey_api import sample_journey, forged_cursor, TAMPERED_CURSORS
+
+JOURNEY_URL = reverse("trainstation:journey-list")
+ASYNC_JOURNEY_URL = reverse("trainstation:async-journey-list")
+
+
+def detail_url(journey_id):
+    return reverse("trainstation:journey-detail", args=[journey_id])
+
+
+def async_detail_url(journey_id):
+    return reverse("trainstation:async-journey-detail", args=[journey_id])
+
+
+def async_availability_url(journey_id):
+    return reverse("trainstation:async-journey-availability", args=[journey_id])
+
+
+class AsyncJourneyApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        start = datetime(2030, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        self.journeys = [
+            sample_journey(
+                train=Train.objects.create(name=f"Intercity {index}", cargo_num=2, places_in_cargo=10),
+                departure_time=start + timedelta(hours=index),
+                arrival_time=start + timedelta(hours=index + 5),
+            )
+            for index in range(3)
+        ]
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(order=order, journey=self.journeys[0], cargo=1, seat=1)
+        Ticket.objects.create(order=order, journey=self.journeys[0], cargo=2, seat=7)
+
+    def get(self, url, **params):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(url, params)
+
+    def test_list_matches_sync_endpoint(self):
+        sync = self.get(JOURNEY_URL, limit=2, train="Intercity")
+        res = self.get(ASYNC_JOURNEY_URL, limit=2, train="Intercity")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["results"], sync.json()["results"])
+        self.assertEqual(res.json()["results"][0]["tickets_available"], 18)
+
+    def test_list_cursor_walks_all_pages(self):
+        first = self.get(ASYNC_JOURNEY_URL, limit=2).json()
+        second = self.client.get(first["next"]).json()
+
+        ids = [journey["id"] for journey in first["results"] + second["results"]]
+        self.assertEqual(ids, [journey.id for journey in self.journeys])
+        self.assertIsNone(second["next"])
+        self.assertIsNotNone(second["previous"])
+
+    def test_list_rejects_tampered_cursor(self):
+        for values in TAMPERED_CURSORS:
+            with self.subTest(values=values):
+                res = self.get(ASYNC_JOURNEY_URL, cursor=forged_cursor(values))
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_rejects_invalid_filter(self):
+        res = self.get(ASYNC_JOURNEY_URL, departure_after="tomorrow")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_matches_sync_endpoint(self):
+        journey = self.journeys[0]
+
+        sync = self.get(detail_url(journey.id))
+        with self.assertNumQueries(3):
+            res = self.get(async_detail_url(journey.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync.json())
+
+    def test_detail_unknown_journey(self):
+        res = self.get(async_detail_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_availability_counts_sold_and_held_seats(self):
+        journey = self.journeys[0]
+        SeatHold.objects.create(
+            journey=journey, user=self.user, cargo=1, seat=2,
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        res = self.get(async_availability_url(journey.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            "journey": journey.id,
+            "capacity": 20,
+            "tickets_sold": 2,
+            "seats_held": 1,
+            "tickets_available": 17,
+        })
+
+    def test_anonymous_rejected(self):
+        res = APIClient().get(ASYNC_JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_jwt_authenticated(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+        res = client.get(async_availability_url(self.journeys[1].id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["tickets_available"], 20)
+
+    def test_write_methods_not_allowed(self):
+        res = self.client.post(ASYNC_JOURNEY_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
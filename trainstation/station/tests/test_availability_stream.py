@@ -0,0 +1,250 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, TransactionTestCase, AsyncClient, Client, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from station.apps import check_shared_backends
+from station.async_views import availability_events
+from station.models import Order, Ticket
+from station.pubsub import LocalBroker, PostgresBroker, RESYNC, QUEUE_SIZE, get_broker, journey_channel
+from station.tests.test_journey_api import sample_journey
+
+
+def stream_url(journey_id):
+    return reverse("trainstation:journey-availability-stream", args=[journey_id])
+
+
+def parse_event(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+class LocalBrokerTests(TestCase):
+
+    async def test_publish_from_another_thread(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe("journey:1")
+        other = broker.subscribe("journey:2")
+
+        thread = threading.Thread(target=broker.publish, args=("journey:1", {"sold": []}))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), {"sold": []})
+        self.assertTrue(other.queue.empty())
+
+    async def test_unsubscribed_gets_nothing(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe("journey:1")
+        subscription.close()
+
+        broker.publish("journey:1", {"sold": []})
+        await asyncio.sleep(0)
+
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_slow_subscriber_is_asked_to_resync(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe("journey:1")
+
+        for index in range(QUEUE_SIZE + 1):
+            broker.publish("journey:1", index)
+        await asyncio.sleep(0)
+
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertEqual(await subscription.get(), RESYNC)
+
+
+class StopListening(BaseException):
+    """Escapes PostgresBroker.listen, which retries on any Exception."""
+
+
+class FakeListenConnection:
+    """Stands in for the raw psycopg connection: each poll() delivers the next batch of payloads."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.notifies = []
+        self.cursor = mock.MagicMock()
+
+    def poll(self):
+        self.notifies.extend(SimpleNamespace(payload=payload) for payload in self.batches.pop(0))
+
+
+class PostgresBrokerTests(TestCase):
+
+    def test_publish_notifies(self):
+        broker = PostgresBroker()
+
+        with mock.patch("station.pubsub.connection") as db:
+            broker.publish("journey:1", {"sold": [{"cargo": 1, "seat": 2}]})
+
+        cursor = db.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with(
+            "SELECT pg_notify(%s, %s)",
+            ["station_pubsub", '{"channel":"journey:1","message":{"sold":[{"cargo":1,"seat":2}]}}'],
+        )
+
+    async def test_listen_dispatches_notifications(self):
+        broker = PostgresBroker()
+        # LocalBroker.subscribe, so no listener thread starts
+        subscription = LocalBroker.subscribe(broker, "journey:1")
+        other = LocalBroker.subscribe(broker, "journey:2")
+        raw = FakeListenConnection(['{"channel":"journey:1","message":{"sold":[]}}'])
+        listener = mock.Mock(connection=raw)
+
+        with (
+            mock.patch("station.pubsub.connections.create_connection", return_value=listener),
+            mock.patch("station.pubsub.select.select", side_effect=[([raw], [], []), OSError("gone")]),
+            mock.patch("station.pubsub.time.sleep", side_effect=StopListening),
+            self.assertLogs("station.pubsub", "ERROR"),
+            self.assertRaises(StopListening),
+        ):
+            broker.listen()
+        await asyncio.sleep(0)
+
+        raw.cursor.return_value.__enter__.return_value.execute.assert_called_once_with("LISTEN station_pubsub")
+        listener.set_autocommit.assert_called_once_with(True)
+        listener.close.assert_called_once_with()
+        self.assertEqual(await subscription.get(), RESYNC)
+        self.assertEqual(await subscription.get(), {"sold": []})
+        self.assertEqual(await other.get(), RESYNC)
+        self.assertTrue(other.queue.empty())
+
+    async def test_first_subscription_starts_listener(self):
+        broker = PostgresBroker()
+
+        with mock.patch("station.pubsub.threading.Thread") as thread:
+            broker.subscribe("journey:1")
+            broker.subscribe("journey:2")
+
+        thread.assert_called_once_with(target=broker.listen, name="pubsub-listener", daemon=True)
+        thread.return_value.start.assert_called_once_with()
+
+
+class SharedBackendsTests(TestCase):
+    REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://cache"}}
+
+    def test_one_worker_may_use_process_local_backends(self):
+        with override_settings(WEB_CONCURRENCY=1):
+            check_shared_backends()
+
+    def test_several_workers_need_shared_cache_and_broker(self):
+        with override_settings(WEB_CONCURRENCY=4), self.assertRaisesMessage(ImproperlyConfigured, "cache"):
+            check_shared_backends()
+        with (
+            override_settings(WEB_CONCURRENCY=4, CACHES=self.REDIS),
+            self.assertRaisesMessage(ImproperlyConfigured, "PUBSUB_BACKEND"),
+        ):
+            check_shared_backends()
+        with override_settings(WEB_CONCURRENCY=4, CACHES=self.REDIS, PUBSUB_BACKEND="station.pubsub.PostgresBroker"):
+            check_shared_backends()
+
+
+@skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY needs PostgreSQL")
+class PostgresBrokerLiveTests(TransactionTestCase):
+
+    async def test_notification_reaches_subscriber(self):
+        broker = PostgresBroker()
+        subscription = broker.subscribe("journey:1")
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 5), RESYNC)
+
+        await sync_to_async(broker.publish)("journey:1", {"sold": []})
+
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 5), {"sold": []})
+
+
+class AvailabilityStreamTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpassword"
+        )
+        self.client = AsyncClient()
+        self.headers = {"authorization": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+        self.journey = sample_journey()
+        self.order = Order.objects.create(user=self.user)
+        Ticket.objects.create(order=self.order, journey=self.journey, cargo=1, seat=1)
+
+    def sell(self, cargo, seat):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Ticket.objects.create(order=self.order, journey=self.journey, cargo=cargo, seat=seat)
+
+    def release(self, ticket):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+
+    def test_ticket_changes_publish_deltas(self):
+        with mock.patch.object(get_broker(), "publish") as publish:
+            ticket = self.sell(2, 3)
+            self.release(ticket)
+
+        channel = journey_channel(self.journey.id)
+        self.assertEqual(publish.call_args_list, [
+            mock.call(channel, {"sold": [{"cargo": 2, "seat": 3}], "released": []}),
+            mock.call(channel, {"sold": [], "released": [{"cargo": 2, "seat": 3}]}),
+        ])
+
+    async def test_stream_sends_snapshot_then_deltas(self):
+        response = await self.client.get(stream_url(self.journey.id), headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+
+        event, data = parse_event(await anext(events))
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(data["taken_seats"], [{"cargo": 1, "seat": 1}])
+        self.assertEqual(data["tickets_available"], 19)
+
+        ticket = await sync_to_async(self.sell)(2, 3)
+        self.assertEqual(
+            parse_event(await asyncio.wait_for(anext(events), 1)),
+            ("delta", {"sold": [{"cargo": 2, "seat": 3}], "released": []}),
+        )
+
+        await sync_to_async(self.release)(ticket)
+        self.assertEqual(
+            parse_event(await asyncio.wait_for(anext(events), 1)),
+            ("delta", {"sold": [], "released": [{"cargo": 2, "seat": 3}]}),
+        )
+
+    async def test_closing_stream_unsubscribes(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe(journey_channel(self.journey.id))
+        events = availability_events(self.journey.id, subscription)
+
+        event, _ = parse_event((await anext(events)).encode())
+        await events.aclose()
+
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(broker._subscriptions, {})
+
+    async def test_unknown_journey(self):
+        response = await self.client.get(stream_url(0), headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_anonymous_rejected(self):
+        response = await AsyncClient().get(stream_url(self.journey.id))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_wsgi_gets_not_implemented(self):
+        response = Client().get(stream_url(self.journey.id), headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        self.assertEqual(response.json()["detail"].split(";")[0], "Event streams need an ASGI server")
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Train, TrainType, Station, Route
+
+TRAIN_URL = reverse("trainstation:train-list")
+ROUTE_URL = reverse("trainstation:route-list")
+STATS_URL = reverse("trainstation:cache-stats-list")
+
+
+class CatalogResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="adminpass"
+        )
+        self.client.force_authenticate(self.admin)
+        self.train_type = TrainType.objects.create(name="Intercity")
+        Train.objects.create(name="Express", cargo_num=2, places_in_cargo=10, train_type=self.train_type)
+
+    def get(self, url):
+        # refill the user's throttle bucket without dropping cached responses
+        cache.delete(f"throttle_user_{self.admin.pk}")
+        return self.client.get(url)
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.get(TRAIN_URL)
+        with self.assertNumQueries(0):
+            second = self.get(TRAIN_URL)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.get(TRAIN_URL)
+        res = self.get(TRAIN_URL + "?name=Exp")
+
+        self.assertEqual(res["X-Cache"], "MISS")
+
+    def test_write_invalidates_cached_list(self):
+        self.get(TRAIN_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TRAIN_URL, {
+                "name": "Regional",
+                "cargo_num": 3,
+                "places_in_cargo": 20,
+                "train_type": self.train_type.id,
+            })
+
+        res = self.get(TRAIN_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_dependency_write_invalidates_cached_list(self):
+        kyiv = Station.objects.create(name="Kyiv", latitude=50.4, longitude=30.5)
+        lviv = Station.objects.create(name="Lviv", latitude=49.8, longitude=24.0)
+        Route.objects.create(source=kyiv, destination=lviv, distance=540)
+        self.get(ROUTE_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Station.objects.filter(pk=kyiv.pk).get().save()
+        res = self.get(ROUTE_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+
+    def test_stats_count_hits_and_misses(self):
+        self.get(TRAIN_URL)
+        self.get(TRAIN_URL)
+
+        res = self.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["train"], {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+
+    def test_stats_require_admin(self):
+        user = get_user_model().objects.create_user(email="user@test.com", password="password123")
+        self.client.force_authenticate(user)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
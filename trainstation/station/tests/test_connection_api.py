@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.connections import timetable
+from station.models import Train, Station, Route, Journey
+
+CONNECTION_URL = reverse("trainstation:connection-list")
+
+
+def at(hour, minute=0):
+    return datetime(2030, 1, 1, hour, minute, tzinfo=timezone.utc)
+
+
+class ConnectionSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.kyiv = Station.objects.create(name="Kyiv", latitude=50.45, longitude=30.52)
+        self.vinnytsia = Station.objects.create(name="Vinnytsia", latitude=49.23, longitude=28.47)
+        self.lviv = Station.objects.create(name="Lviv", latitude=49.84, longitude=24.03)
+        self.train = Train.objects.create(name="Intercity", cargo_num=2, places_in_cargo=10)
+        self.first_leg = self.journey(self.kyiv, self.vinnytsia, at(8), at(10))
+        self.tight_leg = self.journey(self.vinnytsia, self.lviv, at(10, 5), at(14))
+        self.second_leg = self.journey(self.vinnytsia, self.lviv, at(10, 30), at(15))
+        timetable.build()
+
+    def journey(self, source, destination, departure, arrival):
+        route, _ = Route.objects.get_or_create(source=source, destination=destination, distance=100)
+        return Journey.objects.create(
+            route=route, train=self.train, departure_time=departure, arrival_time=arrival
+        )
+
+    def search(self, **params):
+        defaults = {"from": self.kyiv.id, "to": self.lviv.id, "depart_after": "2030-01-01T07:00:00Z"}
+        defaults.update(params)
+        return self.client.get(CONNECTION_URL, defaults)
+
+    def test_connection_with_transfer_respects_min_transfer(self):
+        res = self.search()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        itinerary = res.data[0]
+        self.assertEqual(itinerary["transfers"], 1)
+        self.assertEqual(
+            [leg["journey"] for leg in itinerary["legs"]],
+            [self.first_leg.id, self.second_leg.id],
+        )
+
+    def test_zero_min_transfer_takes_tight_connection(self):
+        legs = timetable.search(self.kyiv.id, self.lviv.id, at(7))
+
+        self.assertEqual([leg.journey_id for leg in legs], [self.first_leg.id, self.tight_leg.id])
+
+    def test_no_connection_after_last_departure(self):
+        res = self.search(depart_after="2030-01-01T09:00:00Z")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_timetable_updated_incrementally(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            direct = self.journey(self.kyiv, self.lviv, at(8, 30), at(13))
+
+        self.assertEqual(
+            [leg.journey_id for leg in timetable.search(self.kyiv.id, self.lviv.id, at(7))],
+            [direct.id],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            direct.delete()
+
+        self.assertEqual(
+            [leg.journey_id for leg in timetable.search(self.kyiv.id, self.lviv.id, at(7))],
+            [self.first_leg.id, self.tight_leg.id],
+        )
+
+    def test_stale_timetable_served_while_reloading(self):
+        Journey.objects.filter(pk=self.tight_leg.pk).delete()
+        timetable.invalidate()
+
+        with mock.patch.object(timetable, "refresh_in_background") as refresh, self.assertNumQueries(0):
+            legs = timetable.search(self.kyiv.id, self.lviv.id, at(7))
+
+        refresh.assert_called_once_with()
+        self.assertEqual([leg.journey_id for leg in legs], [self.first_leg.id, self.tight_leg.id])
+
+    def test_updates_during_reload_are_replayed(self):
+        rows = list(Journey.objects.values_list(
+            "pk", "departure_time", "arrival_time", "route__source_id", "route__destination_id"
+        ))
+
+        def removed_while_loading(chunk_size):
+            timetable.remove(self.tight_leg.id)
+            yield from rows
+
+        with mock.patch.object(Journey.objects, "values_list") as values_list:
+            values_list.return_value.order_by.return_value.iterator = removed_while_loading
+            timetable.build()
+
+        self.assertEqual(
+            [leg.journey_id for leg in timetable.search(self.kyiv.id, self.lviv.id, at(7))],
+            [self.first_leg.id, self.second_leg.id],
+        )
@@ -0,0 +1,114 @@
+import csv
+import json
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, AsyncClient
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from station.models import Order, Ticket
+from station.tests.test_journey_api import sample_journey
+
+JOURNEY_EXPORT_URL = reverse("trainstation:export-journeys")
+TICKET_EXPORT_URL = reverse("trainstation:export-tickets")
+ORDER_EXPORT_URL = reverse("trainstation:export-orders")
+
+
+def read(response):
+    return b"".join(response.streaming_content).decode()
+
+
+async def aread(response):
+    return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+
+class ExportApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.later = sample_journey(
+            departure_time=datetime(2030, 2, 1, 8, 0, tzinfo=dt_timezone.utc),
+            arrival_time=datetime(2030, 2, 1, 13, 0, tzinfo=dt_timezone.utc),
+        )
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(order=order, journey=self.journey, cargo=1, seat=1)
+        Ticket.objects.create(order=order, journey=self.journey, cargo=1, seat=2)
+        Ticket.objects.create(order=order, journey=self.later, cargo=2, seat=3)
+
+    def get(self, url, params=None):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(url, params)
+
+    def test_journeys_as_ndjson(self):
+        res = self.get(JOURNEY_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in read(res).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.journey.id, self.later.id])
+        self.assertEqual(rows[0]["tickets_sold"], 2)
+        self.assertEqual(rows[0]["route__source__name"], "Kyiv")
+
+    def test_tickets_as_csv(self):
+        res = self.get(TICKET_EXPORT_URL, {"output": "csv"})
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertIn('filename="tickets.csv"', res["Content-Disposition"])
+        rows = list(csv.DictReader(StringIO(read(res))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2]["seat"], "3")
+        self.assertEqual(rows[0]["journey__departure_time"], "2030-01-01T08:00:00+00:00")
+
+    def test_journey_filters_apply(self):
+        res = self.get(TICKET_EXPORT_URL, {"departure_after": "2030-01-15T00:00:00Z"})
+
+        rows = [json.loads(line) for line in read(res).splitlines()]
+        self.assertEqual([row["journey_id"] for row in rows], [self.later.id])
+
+    def test_orders_count_tickets(self):
+        res = self.get(ORDER_EXPORT_URL, {"departure_before": "2030-01-15T00:00:00Z"})
+
+        rows = [json.loads(line) for line in read(res).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["ticket_count"], 2)
+
+    def test_wsgi_streams_sync_iterator(self):
+        res = self.get(JOURNEY_EXPORT_URL)
+
+        self.assertFalse(res.is_async)
+
+    async def test_asgi_streams_async_iterator(self):
+        # a sync iterator would be read into memory whole by the ASGI handler
+        headers = {"authorization": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+        res = await AsyncClient().get(TICKET_EXPORT_URL, {"output": "csv"}, headers=headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.is_async)
+        rows = list(csv.DictReader(StringIO(await aread(res))))
+        self.assertEqual([row["seat"] for row in rows], ["1", "2", "3"])
+
+    def test_invalid_output(self):
+        res = self.get(JOURNEY_EXPORT_URL, {"output": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        user = get_user_model().objects.create_user(email="user@test.com", password="password123")
+        self.client.force_authenticate(user)
+
+        res = self.client.get(JOURNEY_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,190 @@
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from station.models import Station, Route, Journey, Train, BoardEntry
+
+STATIONS = """name,latitude,longitude
+Kyiv,50.45,30.52
+Lviv,49.84,24.03
+"""
+ROUTES = """source,destination,distance
+Kyiv,Lviv,540
+"""
+JOURNEYS = """source,destination,train,departure_time,arrival_time
+Kyiv,Lviv,Intercity,2030-01-01T08:00:00Z,2030-01-01T13:00:00Z
+Kyiv,Lviv,Intercity,2030-01-02T08:00:00Z,2030-01-02T13:00:00Z
+"""
+
+
+class ImportTimetableTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        Train.objects.create(name="Intercity", cargo_num=2, places_in_cargo=10)
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def import_csv(self, **files):
+        out = StringIO()
+        call_command(
+            "import_timetable",
+            *[f"--{kind}={self.write(f'{kind}.csv', content)}" for kind, content in files.items()],
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_import_csv(self):
+        output = self.import_csv(stations=STATIONS, routes=ROUTES, journeys=JOURNEYS)
+
+        self.assertEqual(Station.objects.count(), 2)
+        route = Route.objects.get()
+        self.assertEqual(route.source.name, "Kyiv")
+        self.assertEqual(Journey.objects.filter(route=route).count(), 2)
+        self.assertEqual(BoardEntry.objects.filter(station=route.source).count(), 2)
+        self.assertIn("rows/s", output)
+
+    def test_reimport_updates_instead_of_duplicating(self):
+        self.import_csv(stations=STATIONS, routes=ROUTES, journeys=JOURNEYS)
+
+        self.import_csv(
+            stations=STATIONS.replace("50.45", "50.5"),
+            routes=ROUTES.replace("540", "545"),
+            journeys=JOURNEYS.replace("13:00", "14:00"),
+        )
+
+        self.assertEqual(Station.objects.get(name="Kyiv").latitude, 50.5)
+        self.assertEqual(Route.objects.get().distance, 545)
+        self.assertEqual(Journey.objects.count(), 2)
+        self.assertEqual(
+            Journey.objects.earliest("departure_time").arrival_time,
+            datetime(2030, 1, 1, 14, 0, tzinfo=dt_timezone.utc),
+        )
+
+    def test_unknown_name_rolls_back_the_file(self):
+        self.import_csv(stations=STATIONS)
+
+        with self.assertRaisesMessage(CommandError, "unknown station 'Odesa'"):
+            self.import_csv(routes=ROUTES + "Kyiv,Odesa,475\n")
+
+        self.assertFalse(Route.objects.exists())
+
+    def test_import_gtfs(self):
+        self.write("stops.txt", "stop_id,stop_name,stop_lat,stop_lon\n"
+                                "K,Kyiv,50.45,30.52\nV,Vinnytsia,49.23,28.47\nL,Lviv,49.84,24.03\n")
+        self.write("trips.txt", "route_id,service_id,trip_id,trip_short_name\nR1,daily,T1,IC 743\n")
+        self.write("stop_times.txt", "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+                                     "T1,08:00:00,08:00:00,K,1\n"
+                                     "T1,10:30:00,10:35:00,V,2\n"
+                                     "T1,25:10:00,25:10:00,L,3\n")
+
+        call_command(
+            "import_timetable",
+            f"--gtfs={self.directory.name}",
+            "--service-date=2030-01-01",
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Station.objects.count(), 3)
+        self.assertEqual(Route.objects.count(), 2)
+        last_leg = Journey.objects.select_related("train").latest("departure_time")
+        self.assertEqual(last_leg.train.name, "IC 743")
+        self.assertEqual(last_leg.arrival_time, datetime(2030, 1, 2, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertAlmostEqual(Route.objects.get(source__name="Kyiv").distance, 200, delta=2)
+
+    def test_malformed_gtfs_rows_name_file_and_line(self):
+        stops = "stop_id,stop_name,stop_lat,stop_lon\nK,Kyiv,50.45,30.52\nL,Lviv,49.84,24.03\n"
+        header = "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        cases = [
+            ("stop_times.txt", header + "T1,08:00:00,08:00:00,K,1\nT1,13:00:00,13:00:00,L,two\n",
+             "stop_times.txt:3: invalid value"),
+            ("stop_times.txt", header + "T1,08:00,08:00,K,1\nT1,13:00:00,13:00:00,L,2\n",
+             "stop_times.txt:2: invalid value"),
+            ("stop_times.txt", "trip_id,arrival_time,stop_id,stop_sequence\nT1,08:00:00,K,1\nT1,13:00:00,L,2\n",
+             "stop_times.txt:2: missing column 'departure_time'"),
+            ("trips.txt", "route_id,service_id\nR1,daily\n", "trips.txt:2: missing column 'trip_id'"),
+        ]
+        self.write("trips.txt", "route_id,service_id,trip_id\nR1,daily,T1\n")
+        for name, content, message in cases:
+            with self.subTest(message=message):
+                self.write("stops.txt", stops)
+                self.write(name, content)
+
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command(
+                        "import_timetable",
+                        f"--gtfs={self.directory.name}",
+                        "--service-date=2030-01-01",
+                        stdout=StringIO(),
+                    )
+
+
+class UniqueConstraintsMigrationTests(TransactionTestCase):
+    before = [("station", "0008_journey_search_indexes")]
+    after = [("station", "0009_timetable_unique_constraints")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        self.Station = apps.get_model("station", "Station")
+        self.Route = apps.get_model("station", "Route")
+        self.Journey = apps.get_model("station", "Journey")
+        self.Train = apps.get_model("station", "Train")
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        return executor.loader.project_state(self.after).apps
+
+    def journey(self, route, train, day):
+        return self.Journey.objects.create(
+            route=route,
+            train=train,
+            departure_time=datetime(2030, 1, day, 8, tzinfo=dt_timezone.utc),
+            arrival_time=datetime(2030, 1, day, 13, tzinfo=dt_timezone.utc),
+        )
+
+    def test_duplicate_stations_and_routes_are_merged(self):
+        kyiv = self.Station.objects.create(name="Kyiv", latitude=50.45, longitude=30.52)
+        kyiv_again = self.Station.objects.create(name="Kyiv", latitude=50.44, longitude=30.49)
+        lviv = self.Station.objects.create(name="Lviv", latitude=49.84, longitude=24.03)
+        route = self.Route.objects.create(source=kyiv, destination=lviv, distance=540)
+        route_again = self.Route.objects.create(source=kyiv_again, destination=lviv, distance=541)
+        train = self.Train.objects.create(name="Intercity", cargo_num=2, places_in_cargo=10)
+        journey = self.journey(route_again, train, 1)
+
+        apps = self.migrate()
+
+        Station = apps.get_model("station", "Station")
+        self.assertEqual(list(Station.objects.filter(name="Kyiv").values_list("pk", flat=True)), [kyiv.pk])
+        self.assertEqual(list(apps.get_model("station", "Route").objects.values_list("pk", flat=True)), [route.pk])
+        self.assertEqual(apps.get_model("station", "Journey").objects.get(pk=journey.pk).route_id, route.pk)
+
+    def test_duplicate_journeys_are_reported(self):
+        kyiv = self.Station.objects.create(name="Kyiv", latitude=50.45, longitude=30.52)
+        lviv = self.Station.objects.create(name="Lviv", latitude=49.84, longitude=24.03)
+        route = self.Route.objects.create(source=kyiv, destination=lviv, distance=540)
+        train = self.Train.objects.create(name="Intercity", cargo_num=2, places_in_cargo=10)
+        first, second = self.journey(route, train, 1), self.journey(route, train, 1)
+
+        with self.assertRaisesMessage(RuntimeError, f"{first.pk}, {second.pk}"):
+            self.migrate()
+        # tearDown migrates forward again
+        self.Journey.objects.all().delete()
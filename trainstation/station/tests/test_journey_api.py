@@ -0,0 +1,573 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Train, Station, Route, Journey, Order, Ticket, SeatHold
+from station.seat_map import SEAT_MAP_CACHE_KEY, CARGO_COUNTS_CACHE_KEY, get_seat_map
+
+JOURNEY_URL = reverse("trainstation:journey-list")
+ORDER_URL = reverse("trainstation:order-list")
+
+
+def sample_journey(**params) -> Journey:
+    source, _ = Station.objects.get_or_create(name="Kyiv", latitude=50.45, longitude=30.52)
+    destination, _ = Station.objects.get_or_create(name="Lviv", latitude=49.84, longitude=24.03)
+    route, _ = Route.objects.get_or_create(source=source, destination=destination, defaults={"distance": 540})
+    defaults = {
+        "route": route,
+        "train": Train.objects.create(name="Intercity", cargo_num=2, places_in_cargo=10),
+        "departure_time": datetime(2030, 1, 1, 8, 0, tzinfo=dt_timezone.utc),
+        "arrival_time": datetime(2030, 1, 1, 13, 0, tzinfo=dt_timezone.utc),
+    }
+    defaults.update(params)
+    return Journey.objects.create(**defaults)
+
+
+def forged_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps({"v": values}).encode()).decode()
+
+
+# cursors that decode but do not fit a (datetime, id) ordering
+TAMPERED_CURSORS = (["x", "y"], ["2030-01-01T08:00:00+00:00"], [None, 1], ["2030-01-01T08:00:00+00:00", "x"], "ab")
+
+
+class JourneyTicketsSoldTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def create_order(self, *seats):
+        payload = {
+            "tickets": [
+                {"cargo": cargo, "seat": seat, "journey": self.journey.id}
+                for cargo, seat in seats
+            ]
+        }
+        return self.client.post(ORDER_URL, payload, format="json")
+
+    def test_order_increments_tickets_sold(self):
+        res = self.create_order((1, 1), (1, 2), (2, 5))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, 3)
+
+    def test_journey_list_uses_counter(self):
+        self.create_order((1, 1), (1, 2))
+
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["tickets_available"], 18)
+
+    def test_order_delete_decrements_tickets_sold(self):
+        self.create_order((1, 1), (1, 2))
+        self.create_order((2, 1))
+
+        Order.objects.filter(tickets__seat=2).delete()
+
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, 1)
+
+    def test_ticket_moved_to_another_journey_moves_counter(self):
+        self.create_order((1, 1))
+        other = sample_journey()
+        ticket = Ticket.objects.get()
+
+        ticket.journey = other
+        ticket.save()
+
+        self.journey.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.journey.tickets_sold, other.tickets_sold), (0, 1))
+
+    def test_rebuild_journey_counters(self):
+        self.create_order((1, 1), (1, 2))
+        Journey.objects.filter(pk=self.journey.pk).update(tickets_sold=7)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_journey_counters", "--check", stdout=StringIO())
+
+        call_command("rebuild_journey_counters", stdout=StringIO())
+
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, Ticket.objects.count())
+        call_command("rebuild_journey_counters", "--check", stdout=StringIO())
+
+
+class JourneySeatMapTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.url = reverse("trainstation:journey-seat-map", args=(self.journey.id,))
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in ((1, 1), (1, 10), (2, 3)):
+            Ticket.objects.create(order=order, journey=self.journey, cargo=cargo, seat=seat)
+
+    def test_seat_map_base64(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["cargo_num"], 2)
+        self.assertEqual(
+            [base64.b64decode(row) for row in res.data["cargos"]],
+            [bytes([0b10000000, 0b01000000]), bytes([0b00100000, 0])],
+        )
+
+    def test_seat_map_octet_stream(self):
+        res = self.client.get(self.url, HTTP_ACCEPT="application/octet-stream")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/octet-stream")
+        self.assertEqual(res.content, bytes([0b10000000, 0b01000000, 0b00100000, 0]))
+
+    def test_seat_map_cached_until_ticket_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url, HTTP_ACCEPT="application/octet-stream")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(cargo=2).delete()
+
+        self.assertIsNone(cache.get(SEAT_MAP_CACHE_KEY.format(self.journey.id)))
+        self.assertEqual(get_seat_map(self.journey), bytes([0b10000000, 0b01000000, 0, 0]))
+
+    def test_seat_map_follows_moved_ticket(self):
+        get_seat_map(self.journey)
+        ticket = Ticket.objects.get(cargo=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.seat = 4
+            ticket.save()
+
+        self.assertIsNone(cache.get(SEAT_MAP_CACHE_KEY.format(self.journey.id)))
+        self.assertEqual(get_seat_map(self.journey), bytes([0b10000000, 0b01000000, 0b00010000, 0]))
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, 3)
+
+    def test_detail_counts_free_seats_per_cargo(self):
+        res = self.client.get(reverse("trainstation:journey-detail", args=(self.journey.id,)))
+
+        self.assertEqual(
+            res.data["cargos"],
+            [{"cargo": 1, "places": 10, "free": 8}, {"cargo": 2, "places": 10, "free": 9}],
+        )
+
+    def test_cargos_without_seats(self):
+        url = reverse("trainstation:journey-cargos", args=(self.journey.id,))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            "journey": self.journey.id,
+            "cargos": [{"cargo": 1, "places": 10, "free": 8}, {"cargo": 2, "places": 10, "free": 9}],
+        })
+        self.assertIn("ETag", res)
+
+    def test_cargo_counts_cached_until_ticket_write(self):
+        url = reverse("trainstation:journey-cargos", args=(self.journey.id,))
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(cargo=2).delete()
+
+        self.assertIsNone(cache.get(CARGO_COUNTS_CACHE_KEY.format(self.journey.id)))
+        self.assertEqual(self.client.get(url).data["cargos"][1]["free"], 10)
+
+    def test_active_holds_are_not_free(self):
+        expires_at = timezone.now() + timedelta(minutes=5)
+        SeatHold.objects.create(journey=self.journey, user=self.user, cargo=2, seat=5, expires_at=expires_at)
+        SeatHold.objects.create(
+            journey=self.journey, user=self.user, cargo=2, seat=6, expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        expected = [{"cargo": 1, "places": 10, "free": 8}, {"cargo": 2, "places": 10, "free": 8}]
+
+        detail = self.client.get(reverse("trainstation:journey-detail", args=(self.journey.id,)))
+        cargos = self.client.get(reverse("trainstation:journey-cargos", args=(self.journey.id,)))
+
+        self.assertEqual(detail.data["cargos"], expected)
+        self.assertEqual(cargos.data["cargos"], expected)
+
+    def test_cargo_counts_follow_holds(self):
+        url = reverse("trainstation:journey-cargos", args=(self.journey.id,))
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("trainstation:journey-holds", args=(self.journey.id,)),
+                {"seats": [{"cargo": 1, "seat": 5}]},
+                format="json",
+            )
+
+        held = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        # the hold runs out, which is no write the model versions would notice
+        later = SeatHold.objects.get().expires_at + timedelta(minutes=1)
+        with (
+            mock.patch("station.booking.timezone.now", return_value=later),
+            mock.patch("station.seat_map.timezone.now", return_value=later),
+        ):
+            expired = self.client.get(url, headers={"if-none-match": held["ETag"]})
+
+        self.assertEqual(held.status_code, status.HTTP_200_OK)
+        self.assertEqual(held.data["cargos"][0]["free"], 7)
+        self.assertEqual(expired.status_code, status.HTTP_200_OK)
+        self.assertEqual(expired.data["cargos"][0]["free"], 8)
+
+
+class SeatHoldTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword"
+        )
+        self.other_user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.url = reverse("trainstation:journey-holds", args=(self.journey.id,))
+
+    def test_hold_reduces_availability(self):
+        res = self.client.post(
+            self.url, {"seats": [{"cargo": 1, "seat": 1}, {"cargo": 1, "seat": 2}]}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn("expires_at", res.data)
+
+        res = self.client.get(JOURNEY_URL)
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 18)
+
+    def test_held_seat_cannot_be_held_or_booked_by_others(self):
+        self.client.post(self.url, {"seats": [{"cargo": 1, "seat": 1}]}, format="json")
+        self.client.force_authenticate(self.other_user)
+
+        res = self.client.post(self.url, {"seats": [{"cargo": 1, "seat": 1}]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        cache.clear()
+        payload = {"tickets": [{"cargo": 1, "seat": 1, "journey": self.journey.id}]}
+        res = self.client.post(ORDER_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_booking_consumes_own_hold(self):
+        SeatHold.objects.create(
+            journey=self.journey, user=self.other_user, cargo=1, seat=1,
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        self.client.force_authenticate(self.other_user)
+
+        payload = {"tickets": [{"cargo": 1, "seat": 1, "journey": self.journey.id}]}
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_expired_holds_ignored_and_swept(self):
+        SeatHold.objects.create(
+            journey=self.journey, user=self.other_user, cargo=1, seat=1,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        res = self.client.post(self.url, {"seats": [{"cargo": 1, "seat": 1}]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("sweep_seat_holds", "--batch-size", "1", stdout=StringIO())
+
+        self.assertFalse(SeatHold.objects.exists())
+
+
+class JourneySearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_filter_by_stations_and_departure_window(self):
+        morning = sample_journey()
+        evening = sample_journey(
+            route=morning.route,
+            departure_time=datetime(2030, 1, 1, 18, 0, tzinfo=dt_timezone.utc),
+            arrival_time=datetime(2030, 1, 1, 23, 0, tzinfo=dt_timezone.utc),
+        )
+        reverse_route = Route.objects.create(
+            source=morning.route.destination, destination=morning.route.source, distance=540
+        )
+        sample_journey(route=reverse_route)
+
+        res = self.client.get(JOURNEY_URL, {
+            "source": morning.route.source_id,
+            "destination": morning.route.destination_id,
+            "departure_after": "2030-01-01T12:00:00Z",
+            "departure_before": "2030-01-02T00:00:00Z",
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([journey["id"] for journey in res.data["results"]], [evening.id])
+
+
+class JourneyPaginationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        first = sample_journey()
+        self.journeys = [first] + [
+            sample_journey(route=first.route, departure_time=departure)
+            for departure in [
+                datetime(2030, 1, 1, 8, 0, tzinfo=dt_timezone.utc),
+                datetime(2030, 1, 1, 7, 0, tzinfo=dt_timezone.utc),
+                datetime(2030, 1, 2, 7, 0, tzinfo=dt_timezone.utc),
+                datetime(2030, 1, 1, 9, 0, tzinfo=dt_timezone.utc),
+            ]
+        ]
+        self.expected = [
+            journey.id for journey in sorted(self.journeys, key=lambda j: (j.departure_time, j.id))
+        ]
+
+    def test_keyset_pages_forward_and_back(self):
+        res = self.client.get(JOURNEY_URL, {"limit": 2})
+        self.assertNotIn("count", res.data)
+        self.assertIsNone(res.data["previous"])
+        seen = [journey["id"] for journey in res.data["results"]]
+
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            seen += [journey["id"] for journey in res.data["results"]]
+            cache.clear()
+
+        self.assertEqual(seen, self.expected)
+
+        res = self.client.get(res.data["previous"])
+        self.assertEqual([journey["id"] for journey in res.data["results"]], self.expected[2:4])
+
+    def test_count_only_on_request(self):
+        res = self.client.get(JOURNEY_URL, {"count": "exact"})
+
+        self.assertEqual(res.data["count"], 5)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(JOURNEY_URL, {"cursor": "garbage"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        for values in TAMPERED_CURSORS:
+            with self.subTest(values=values):
+                res = self.client.get(JOURNEY_URL, {"cursor": forged_cursor(values)})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class JourneyConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def get(self, url, **headers):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(url, headers=headers)
+
+    def test_list_has_validators(self):
+        res = self.get(JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", res)
+        self.assertIn("Last-Modified", res)
+
+    def test_matching_etag_returns_304_without_queries(self):
+        etag = self.get(JOURNEY_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.get(JOURNEY_URL, if_none_match=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_etag_depends_on_query(self):
+        etag = self.get(JOURNEY_URL)["ETag"]
+
+        res = self.get(JOURNEY_URL + "?train=Intercity", if_none_match=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_sold_ticket_changes_etag(self):
+        etag = self.get(JOURNEY_URL)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(ORDER_URL, {
+                "tickets": [{"cargo": 1, "seat": 1, "journey": self.journey.id}]
+            }, format="json")
+        res = self.get(JOURNEY_URL, if_none_match=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["tickets_available"], 19)
+
+    def test_expired_hold_changes_validators(self):
+        expires_at = timezone.now() + timedelta(minutes=5)
+        SeatHold.objects.create(journey=self.journey, user=self.user, cargo=1, seat=1, expires_at=expires_at)
+        first = self.get(JOURNEY_URL)
+
+        # the hold runs out, which is no write the model versions would notice
+        with mock.patch("station.booking.timezone.now", return_value=expires_at + timedelta(minutes=1)):
+            by_etag = self.get(JOURNEY_URL, if_none_match=first["ETag"])
+            res = self.get(JOURNEY_URL, if_modified_since=first["Last-Modified"])
+
+        self.assertEqual(by_etag.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(by_etag["ETag"], first["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(parse_http_date(res["Last-Modified"]), parse_http_date(first["Last-Modified"]))
+
+    def test_order_etag_is_per_user(self):
+        order_url = reverse("trainstation:order-list")
+        etag = self.get(order_url)["ETag"]
+        other = get_user_model().objects.create_user(email="user@test.com", password="password123")
+        self.client.force_authenticate(other)
+
+        res = self.client.get(order_url, headers={"if-none-match": etag})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class JourneyBulkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.url = reverse("trainstation:journey-bulk")
+
+    def payload(self, count, day=2):
+        return [
+            {
+                "route_write": self.journey.route_id,
+                "train": "Intercity",
+                "departure_time": f"2030-01-{day:02d}T{hour:02d}:00:00Z",
+                "arrival_time": f"2030-01-{day:02d}T{hour:02d}:30:00Z",
+            }
+            for hour in range(count)
+        ]
+
+    def test_bulk_create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(self.url, self.payload(3), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(res.data[0]["route"], "Kyiv - Lviv")
+        self.assertEqual(res.data[0]["tickets_available"], 20)
+        self.assertEqual(Journey.objects.count(), 4)
+
+    def test_queries_do_not_grow_with_items(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(self.url, self.payload(2), format="json")
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(self.url, self.payload(20, day=3), format="json")
+
+        self.assertEqual(len(few), len(many))
+
+    def test_errors_are_reported_per_item(self):
+        payload = self.payload(3)
+        payload[0]["train"] = "Unknown"
+        payload[2]["departure_time"] = payload[1]["departure_time"]
+
+        res = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("train", res.data[0])
+        self.assertEqual(res.data[1], {})
+        self.assertEqual(Journey.objects.count(), 1)
+
+    def test_clash_with_existing_journey(self):
+        payload = self.payload(1)
+        payload[0]["departure_time"] = self.journey.departure_time.isoformat()
+
+        res = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("non_field_errors", res.data[0])
+
+    def test_bulk_update(self):
+        other = sample_journey(departure_time=datetime(2030, 1, 5, 8, 0, tzinfo=dt_timezone.utc))
+
+        res = self.client.patch(self.url, [
+            {"id": self.journey.id, "arrival_time": "2030-01-01T14:00:00Z"},
+            {"id": other.id, "arrival_time": "2030-01-05T14:00:00Z"},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.arrival_time, datetime(2030, 1, 1, 14, 0, tzinfo=dt_timezone.utc))
+
+    def test_bulk_update_unknown_id(self):
+        res = self.client.patch(self.url, [{"id": 0, "arrival_time": "2030-01-01T14:00:00Z"}], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0])
+
+    def test_bulk_requires_admin(self):
+        user = get_user_model().objects.create_user(email="user@test.com", password="password123")
+        self.client.force_authenticate(user)
+
+        res = self.client.post(self.url, self.payload(1), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,228 @@
+from threading import Barrier, Thread
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.booking import reserve_seats, SeatConflict
+from station.models import Journey, Ticket
+from station.tests.test_journey_api import sample_journey, forged_cursor, TAMPERED_CURSORS
+
+ORDER_URL = reverse("trainstation:order-list")
+
+
+def tickets_payload(journey, seats):
+    return {
+        "tickets": [
+            {"cargo": cargo, "seat": seat, "journey": journey.id}
+            for cargo, seat in seats
+        ]
+    }
+
+
+class OrderBookingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_booking_query_count_is_flat(self):
+        with CaptureQueriesContext(connection) as single:
+            res = self.client.post(ORDER_URL, tickets_payload(self.journey, [(1, 1)]), format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        cache.clear()
+        group = [(2, seat) for seat in range(1, 11)] + [(1, seat) for seat in range(2, 11)]
+        with CaptureQueriesContext(connection) as batch:
+            res = self.client.post(ORDER_URL, tickets_payload(self.journey, group), format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(batch), len(single))
+        self.assertEqual(Ticket.objects.count(), 20)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, 20)
+
+    def test_seat_out_of_range_reported_per_ticket(self):
+        res = self.client.post(
+            ORDER_URL, tickets_payload(self.journey, [(1, 1), (1, 11)]), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertIn("seat", res.data["tickets"][1])
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_duplicate_seats_reported_per_ticket(self):
+        res = self.client.post(
+            ORDER_URL, tickets_payload(self.journey, [(1, 1), (1, 2), (1, 2)]), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][:2], [{}, {}])
+        self.assertIn("non_field_errors", res.data["tickets"][2])
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_taken_seats_return_conflict(self):
+        self.client.post(ORDER_URL, tickets_payload(self.journey, [(1, 1), (2, 4)]), format="json")
+        cache.clear()
+
+        res = self.client.post(
+            ORDER_URL, tickets_payload(self.journey, [(1, 1), (1, 2), (2, 4)]), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["conflicts"],
+            [
+                {"journey": self.journey.id, "cargo": 1, "seat": 1},
+                {"journey": self.journey.id, "cargo": 2, "seat": 4},
+            ],
+        )
+        self.assertEqual(Journey.objects.get().tickets_sold, 2)
+
+    def test_unknown_journey_reported(self):
+        payload = {"tickets": [{"cargo": 1, "seat": 1, "journey": self.journey.id + 100}]}
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("journey", res.data["tickets"][0])
+
+
+@skipUnless(connection.vendor == "postgresql", "Row locks need a server database")
+class ConcurrentBookingTests(TransactionTestCase):
+    threads = 8
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpassword"
+        )
+        self.journey = sample_journey()
+
+    def book(self, seats, barrier, results):
+        try:
+            barrier.wait()
+            tickets_data = [
+                {"journey": self.journey, "cargo": cargo, "seat": seat}
+                for cargo, seat in seats
+            ]
+            reserve_seats(tickets_data, user=self.user)
+            results.append(("ok", seats))
+        except SeatConflict as error:
+            results.append(("conflict", error.detail["conflicts"]))
+        except Exception as error:
+            results.append(("error", error))
+        finally:
+            connection.close()
+
+    def test_each_seat_is_sold_once(self):
+        barrier = Barrier(self.threads)
+        results = []
+        workers = [
+            Thread(target=self.book, args=([(1, 1), (1, 2 + index)], barrier, results))
+            for index in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        outcomes = [outcome for outcome, _ in results]
+        self.assertNotIn("error", outcomes)
+        self.assertEqual(outcomes.count("ok"), 1)
+        for outcome, conflicts in results:
+            if outcome == "conflict":
+                self.assertEqual(conflicts, [{"journey": self.journey.id, "cargo": 1, "seat": 1}])
+        self.assertEqual(Ticket.objects.filter(cargo=1, seat=1).count(), 1)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.tickets_sold, Ticket.objects.count())
+
+
+class OrderQueryCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def order_with_tickets(self, cargo, count):
+        tickets_data = [
+            {"journey": self.journey, "cargo": cargo, "seat": seat}
+            for seat in range(1, count + 1)
+        ]
+        return reserve_seats(tickets_data, user=self.user)
+
+    def test_list_queries_do_not_grow_with_tickets(self):
+        self.order_with_tickets(1, 1)
+        with self.assertNumQueries(2):
+            res = self.client.get(ORDER_URL)
+        self.assertEqual(len(res.data["results"]), 1)
+
+        cache.clear()
+        self.order_with_tickets(2, 10)
+        with self.assertNumQueries(2):
+            res = self.client.get(ORDER_URL)
+        self.assertEqual(len(res.data["results"][0]["tickets"]), 10)
+
+    def test_tampered_cursor(self):
+        self.order_with_tickets(1, 1)
+
+        for values in TAMPERED_CURSORS:
+            with self.subTest(values=values):
+                res = self.client.get(ORDER_URL, {"cursor": forged_cursor(values)})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_queries_do_not_grow_with_tickets(self):
+        order = self.order_with_tickets(1, 10)
+        url = reverse("trainstation:order-detail", args=(order.id,))
+
+        with self.assertNumQueries(2):
+            res = self.client.get(url)
+
+        self.assertEqual(len(res.data["tickets"]), 10)
+        self.assertEqual(res.data["tickets"][0]["journey"]["id"], self.journey.id)
+
+    def test_create_queries(self):
+        with self.assertNumQueries(11):
+            res = self.client.post(
+                ORDER_URL, tickets_payload(self.journey, [(1, 1), (1, 2), (2, 3)]), format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_destroy_queries(self):
+        order = self.order_with_tickets(1, 2)
+        url = reverse("trainstation:order-detail", args=(order.id,))
+
+        # order, ticket collection, two deletes and one counter update per ticket
+        with self.assertNumQueries(6):
+            res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_update_not_allowed(self):
+        order = self.order_with_tickets(1, 1)
+        url = reverse("trainstation:order-detail", args=(order.id,))
+
+        res = self.client.patch(url, {"tickets": []}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
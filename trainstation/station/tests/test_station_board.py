@@ -0,0 +1,112 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Station, Route, Train, Journey, Order, Ticket, BoardEntry
+
+
+def board_url(station_id):
+    return reverse("trainstation:station-board", args=(station_id,))
+
+
+class StationBoardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.kyiv = Station.objects.create(name="Kyiv", latitude=50.45, longitude=30.52)
+        self.lviv = Station.objects.create(name="Lviv", latitude=49.84, longitude=24.03)
+        self.route = Route.objects.create(source=self.kyiv, destination=self.lviv, distance=540)
+        self.train = Train.objects.create(name="Intercity", cargo_num=2, places_in_cargo=10)
+        now = timezone.now()
+        self.past = self.journey(now - timedelta(hours=2))
+        self.later = self.journey(now + timedelta(hours=3))
+        self.soon = self.journey(now + timedelta(hours=1))
+
+    def journey(self, departure):
+        return Journey.objects.create(
+            route=self.route,
+            train=self.train,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=5),
+        )
+
+    def get(self, url, params=None, **headers):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(url, params, headers=headers)
+
+    def test_departures_from_now_in_order(self):
+        res = self.get(board_url(self.kyiv.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry["journey"] for entry in res.data], [self.soon.id, self.later.id])
+        self.assertEqual(res.data[0]["other_station"], "Lviv")
+        self.assertEqual(res.data[0]["tickets_available"], 20)
+
+    def test_arrivals(self):
+        res = self.get(board_url(self.lviv.id), {"kind": "arrivals", "limit": 1})
+
+        self.assertEqual([entry["journey"] for entry in res.data], [self.past.id])
+        self.assertEqual(res.data[0]["other_station"], "Kyiv")
+
+    def test_board_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.get(board_url(self.kyiv.id))
+
+    def test_repeated_poll_is_cached(self):
+        etag = self.get(board_url(self.kyiv.id))["ETag"]
+
+        with self.assertNumQueries(0):
+            cached = self.get(board_url(self.kyiv.id))
+            not_modified = self.get(board_url(self.kyiv.id), if_none_match=etag)
+
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_journey_and_train_writes_refresh_board(self):
+        self.soon.departure_time = timezone.now() + timedelta(hours=4)
+        self.soon.save()
+        self.train.name = "Express"
+        self.train.save()
+
+        entries = BoardEntry.objects.filter(station=self.kyiv, time__gte=timezone.now())
+        self.assertEqual([entry.journey_id for entry in entries], [self.later.id, self.soon.id])
+        self.assertEqual({entry.train_name for entry in entries}, {"Express"})
+
+    def test_sold_tickets_update_availability(self):
+        order = Order.objects.create(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(order=order, journey=self.soon, cargo=1, seat=1)
+
+        entry = BoardEntry.objects.get(journey=self.soon, kind=BoardEntry.DEPARTURE)
+        self.assertEqual(entry.tickets_available, 19)
+
+    def test_deleted_journey_leaves_board(self):
+        self.soon.delete()
+
+        self.assertFalse(BoardEntry.objects.filter(journey_id=self.soon.id).exists())
+
+    def test_unknown_station(self):
+        res = self.get(board_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_command(self):
+        BoardEntry.objects.all().delete()
+
+        call_command("rebuild_station_board", stdout=StringIO())
+
+        self.assertEqual(BoardEntry.objects.count(), 6)
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Station
+from station.throttling import LocalBucketStore, parse_rate
+from station.tests.test_journey_api import sample_journey
+
+STATION_URL = reverse("trainstation:station-list")
+ORDER_URL = reverse("trainstation:order-list")
+ASYNC_JOURNEY_URL = reverse("trainstation:async-journey-list")
+REGISTER_URL = reverse("user:create")
+
+
+class LocalBucketStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.store = LocalBucketStore()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("300/minute"), 5)
+        self.assertEqual(parse_rate("2/second"), 2)
+        self.assertEqual(parse_rate("36/hour"), 0.01)
+
+    @mock.patch("station.throttling.time.time", return_value=1000.0)
+    def test_spends_and_refills(self, now):
+        self.assertEqual(self.store.take("bucket", rate=2, capacity=4, cost=3), (True, 1))
+        self.assertEqual(self.store.take("bucket", rate=2, capacity=4, cost=3), (False, 1))
+
+        now.return_value = 1001.0
+        self.assertEqual(self.store.take("bucket", rate=2, capacity=4, cost=3), (True, 0))
+
+        now.return_value = 1100.0
+        self.assertEqual(self.store.take("bucket", rate=2, capacity=4, cost=1), (True, 3))
+
+
+@override_settings(THROTTLE_BURST={"anon": 3, "user": 12})
+class TokenBucketThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        Station.objects.create(name="Kyiv", latitude=50.45, longitude=30.52)
+
+    @mock.patch("station.throttling.time.time", return_value=1000.0)
+    def test_reads_allowed_up_to_burst(self, now):
+        for remaining in range(11, -1, -1):
+            res = self.client.get(STATION_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res["RateLimit-Limit"], "12")
+            self.assertEqual(res["RateLimit-Remaining"], str(remaining))
+
+        res = self.client.get(STATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertEqual(res["RateLimit-Reset"], "3")
+
+        now.return_value = 1000.2
+        res = self.client.get(STATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @mock.patch("station.throttling.time.time", return_value=1000.0)
+    def test_actions_cost_differently(self, now):
+        journey = sample_journey()
+        payload = {"tickets": [{"cargo": 1, "seat": 1, "journey": journey.id}]}
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res["RateLimit-Remaining"], "2")
+
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "2")
+        self.assertEqual(self.client.get(STATION_URL).status_code, status.HTTP_200_OK)
+
+    @mock.patch("station.throttling.time.time", return_value=1000.0)
+    def test_anonymous_clients_share_an_ip_bucket(self, now):
+        res = APIClient().post(REGISTER_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res["RateLimit-Remaining"], "0")
+
+        res = APIClient().post(REGISTER_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(STATION_URL).status_code, status.HTTP_200_OK)
+
+    def test_async_views_are_throttled(self):
+        res = self.client.get(ASYNC_JOURNEY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["RateLimit-Limit"], "12")
+        self.assertIn("RateLimit-Remaining", res)
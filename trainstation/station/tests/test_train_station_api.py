@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
@@ -35,6 +36,7 @@ def sample_station(**params) -> Train:
 class UnauthenticatedTrainApiTests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_aut_required(self):
@@ -45,6 +47,7 @@ class UnauthenticatedTrainApiTests(TestCase):
 class AuthenticatedTrainApiTests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="test@test.test",
@@ -96,9 +99,48 @@ class AuthenticatedTrainApiTests(TestCase):
 
 
 
+class TrainBulkApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="adminpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.train_type = TrainType.objects.create(name="Intersity")
+
+    def test_bulk_create_trains(self):
+        payload = [
+            {"name": f"Train{index}", "cargo_num": 5, "places_in_cargo": 50, "train_type": self.train_type.id}
+            for index in range(3)
+        ]
+
+        res = self.client.post(reverse("trainstation:train-bulk"), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Train.objects.filter(train_type=self.train_type).count(), 3)
+        self.assertEqual(res.data[0]["train_type_detail"]["name"], "Intersity")
+
+    def test_bulk_update_trains(self):
+        train = sample_train(train_type=self.train_type)
+
+        res = self.client.patch(
+            reverse("trainstation:train-bulk"),
+            [{"id": train.id, "places_in_cargo": 60}],
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        train.refresh_from_db()
+        self.assertEqual(train.places_in_cargo, 60)
+
+
 class UnauthenticatedStationApiTests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_aut_required_station(self):
@@ -109,6 +151,7 @@ class UnauthenticatedStationApiTests(TestCase):
 class AuthenticatedStationApiTests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="test@test.com",
@@ -127,8 +170,107 @@ class AuthenticatedStationApiTests(TestCase):
         self.assertEqual(res.data["results"], serializer.data)
 
 
+class NearbyStationApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        sample_station(name="Kyiv", latitude=50.4501, longitude=30.5234)
+        sample_station(name="Brovary", latitude=50.5110, longitude=30.7909)
+        sample_station(name="Lviv", latitude=49.8397, longitude=24.0297)
+
+    def get(self, params):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(reverse("trainstation:station-nearby"), params)
+
+    def test_nearby_sorted_by_distance(self):
+        res = self.get({"lat": 50.46, "lon": 30.55, "radius": 30})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([station["name"] for station in res.data], ["Kyiv", "Brovary"])
+        self.assertLess(res.data[0]["distance"], 3)
+
+    def test_radius_and_limit(self):
+        self.assertEqual(len(self.get({"lat": 50.46, "lon": 30.55, "radius": 1000}).data), 3)
+        self.assertEqual(len(self.get({"lat": 50.46, "lon": 30.55, "radius": 1000, "limit": 1}).data), 1)
+        self.assertEqual(self.get({"lat": 0, "lon": 0, "radius": 100}).data, [])
+
+    def test_index_follows_station_changes(self):
+        self.get({"lat": 46.48, "lon": 30.72})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_station(name="Odesa", latitude=46.4825, longitude=30.7233)
+        res = self.get({"lat": 46.48, "lon": 30.72})
+
+        self.assertEqual([station["name"] for station in res.data], ["Odesa"])
+
+    def test_invalid_coordinates(self):
+        res = self.get({"lat": 120, "lon": 30})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        for name in ("Kyiv-Pasazhyrskyi", "Kyiv", "Kovel", "Lviv", "Kryvyi Rih"):
+            sample_station(name=name)
+
+    def complete(self, url_name, q, **params):
+        cache.delete(f"throttle_user_{self.user.pk}")
+        return self.client.get(reverse(url_name), {"q": q, **params})
+
+    def names(self, q, **params):
+        return [match["name"] for match in self.complete("trainstation:station-autocomplete", q, **params).data]
+
+    def test_prefix_matches_shortest_first(self):
+        self.assertEqual(self.names("ky"), ["Kyiv", "Kyiv-Pasazhyrskyi"])
+
+    def test_fuzzy_match_after_prefix(self):
+        self.assertEqual(self.names("Lvov"), [])
+        self.assertEqual(self.names("Kyivv")[:1], ["Kyiv"])
+        self.assertEqual(self.names("Kovell"), ["Kovel"])
+
+    def test_limit_caps_results(self):
+        self.assertEqual(len(self.names("k", limit=2)), 2)
+
+    def test_new_station_is_found(self):
+        self.assertEqual(self.names("Odesa"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_station(name="Odesa-Holovna")
+
+        self.assertEqual(self.names("Odesa"), ["Odesa-Holovna"])
+
+    def test_train_autocomplete(self):
+        sample_train(name="Intercity+ 743")
+        sample_train(name="Night Express")
+
+        res = self.complete("trainstation:train-autocomplete", "inter")
+
+        self.assertEqual([match["name"] for match in res.data], ["Intercity+ 743"])
+
+    def test_query_required(self):
+        res = self.client.get(reverse("trainstation:station-autocomplete"))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class StationPermissionTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="user@test.com",
@@ -167,6 +309,7 @@ class StationPermissionTests(TestCase):
 
 class OrderVisibilityTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user1 = get_user_model().objects.create_user(
             email="user1@test.com", password="pass123"
@@ -0,0 +1,166 @@
+"""
+Token-bucket rate limiting with per-action costs.
+
+Every client (user id, or IP for anonymous requests) has a bucket of
+THROTTLE_BURST[scope] tokens that refills at DEFAULT_THROTTLE_RATES[scope].
+A request spends the cost of its view action (`throttle_costs` on the view,
+else READ_COST/WRITE_COST by method), so a burst of cheap reads is fine
+while expensive writes drain the bucket quickly. A bucket is two numbers
+(tokens, last refill) instead of DRF's list of request timestamps.
+
+Buckets live in the default cache under DRF's throttle_<scope>_<ident> keys.
+With the Redis cache backend the refill-and-spend runs as one Lua script on
+the server, so all workers share exact limits; with any other backend it
+runs under a process-local lock, which is only shared within a process.
+
+Denied requests get 429 with Retry-After; rate_limit_headers_middleware adds
+RateLimit-Limit/-Remaining/-Reset to every throttled response.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+READ_COST = 1
+WRITE_COST = 5
+
+# limit and remaining in tokens, reset in seconds until the bucket is full again
+RateLimit = namedtuple("RateLimit", ["limit", "remaining", "reset"])
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """"300/minute" -> tokens per second."""
+    num, period = rate.split("/")
+    return int(num) / PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """Read-modify-write of (tokens, timestamp) in the cache under a process lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost):
+        """Refill the bucket, spend `cost` tokens if there are enough; return (allowed, tokens left)."""
+        with self._lock:
+            now = time.time()
+            tokens, timestamp = cache.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - timestamp) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, now), math.ceil(capacity / rate) + 1)
+        return allowed, tokens
+
+
+class RedisBucketStore:
+    """The same refill-and-spend as one Lua script, atomic across every worker using the Redis server."""
+    script = """
+        local capacity, rate, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or capacity
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        local allowed = 0
+        if tokens >= cost then
+            tokens = tokens - cost
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+        return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self):
+        self._scripts = {}
+
+    def take(self, key, rate, capacity, cost):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = self._scripts[id(client)] = client.register_script(self.script)
+        allowed, tokens = script(keys=[key], args=[capacity, rate, cost])
+        return bool(allowed), float(tokens)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = RedisBucketStore() if isinstance(caches["default"], RedisCache) else LocalBucketStore()
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    cache_format = "throttle_%(scope)s_%(ident)s"
+
+    def get_scope(self, request):
+        if request.user and request.user.is_authenticated:
+            return "user", request.user.pk
+        return "anon", self.get_ident(request)
+
+    def get_cost(self, request, view):
+        costs = getattr(view, "throttle_costs", {})
+        action = getattr(view, "action", None)
+        if action in costs:
+            return costs[action]
+        return READ_COST if request.method in SAFE_METHODS else WRITE_COST
+
+    def allow_request(self, request, view):
+        scope, ident = self.get_scope(request)
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES[scope])
+        capacity = settings.THROTTLE_BURST[scope]
+        # a request costing more than the bucket holds could never pass
+        cost = min(self.get_cost(request, view), capacity)
+
+        key = self.cache_format % {"scope": scope, "ident": ident}
+        allowed, tokens = get_store().take(key, rate, capacity, cost)
+        self.wait_seconds = 0 if allowed else (cost - tokens) / rate
+        # on the Django request, where rate_limit_headers_middleware finds it
+        request._request.rate_limit = RateLimit(
+            capacity, math.floor(tokens), math.ceil((capacity - tokens) / rate)
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+@sync_and_async_middleware
+def rate_limit_headers_middleware(get_response):
+    """Expose the bucket of the throttled request as RateLimit-* headers."""
+
+    def add_headers(request, response):
+        rate_limit = getattr(request, "rate_limit", None)
+        if rate_limit is not None:
+            response["RateLimit-Limit"] = str(rate_limit.limit)
+            response["RateLimit-Remaining"] = str(rate_limit.remaining)
+            response["RateLimit-Reset"] = str(rate_limit.reset)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return add_headers(request, await get_response(request))
+
+        markcoroutinefunction(middleware)
+    else:
+        def middleware(request):
+            return add_headers(request, get_response(request))
+
+    return middleware
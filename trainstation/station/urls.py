@@ -1,7 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from station.views import TrainViewSet, TrainTypeViewSet, StationViewSet, RouteViewSet, JourneyViewSet, OrderViewSet
+from station import async_views
+from station.views import TrainViewSet, TrainTypeViewSet, StationViewSet, RouteViewSet, JourneyViewSet, OrderViewSet, \
+    ConnectionViewSet, CacheStatsViewSet, ExportViewSet, AnalyticsViewSet
 
 router = DefaultRouter()
 router.register("train-types", TrainTypeViewSet)
@@ -10,8 +12,24 @@ router.register("stations", StationViewSet)
 router.register("routes", RouteViewSet)
 router.register("journeys", JourneyViewSet)
 router.register("orders", OrderViewSet)
+router.register("connections", ConnectionViewSet, basename="connection")
+router.register("cache-stats", CacheStatsViewSet, basename="cache-stats")
+router.register("exports", ExportViewSet, basename="export")
+router.register("analytics", AnalyticsViewSet, basename="analytics")
 
 urlpatterns = [
+     path("async/journeys/", async_views.journey_list, name="async-journey-list"),
+     path("async/journeys/<int:pk>/", async_views.journey_detail, name="async-journey-detail"),
+     path(
+         "async/journeys/<int:pk>/availability/",
+         async_views.journey_availability,
+         name="async-journey-availability",
+     ),
+     path(
+         "journeys/<int:pk>/availability/stream/",
+         async_views.availability_stream,
+         name="journey-availability-stream",
+     ),
      path("", include(router.urls))
 ]
 
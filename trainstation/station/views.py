@@ -1,22 +1,113 @@
+import base64
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import viewsets
+from rest_framework import viewsets, status, mixins
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
+from rest_framework.response import Response
 
+from station.analytics import occupancy_report, report_totals
+from station.autocomplete import complete_names
+from station.board import refresh_board, get_board
+from station.booking import hold_expiry_window
+from station.cache import CachedResponseMixin, ConditionalGetMixin, get_stats, bump_version
+from station.connections import timetable
+from station.exports import stream_export, FORMATS, JOURNEY_FIELDS, TICKET_FIELDS, ORDER_FIELDS
 from station.filters import TrainFilter, RouteFilter, JourneyFilter
-from station.models import Train, TrainType, Station, Route, Journey, Order
+from station.geo import station_index
+from station.models import Train, TrainType, Station, Route, Journey, Order, SeatHold, Ticket
+from station.renderers import OctetStreamRenderer
+from station.seat_map import get_seat_map, split_cargos, get_cargo_counts, summarize_cargos, active_holds_prefetch
 from station.serializers import TrainSerializer, TrainTypeSerializer, StationSerializer, RouteSerializer, \
     JourneySerializer, OrderSerializer, OrderListSerializer, JourneyRetrieveSerializer, JourneyListSerializer, \
-    OrderDetailSerializer
+    OrderDetailSerializer, JourneySeatMapSerializer, SeatHoldSerializer, ConnectionQuerySerializer, \
+    ConnectionSerializer, TrainBulkSerializer, JourneyBulkSerializer, BoardQuerySerializer, BoardEntrySerializer, \
+    NearbyQuerySerializer, NearbyStationSerializer, AutocompleteQuerySerializer, AutocompleteSerializer, \
+    OccupancyQuerySerializer, OccupancyReportSerializer, JourneyCargosSerializer
+
+
+class BulkWriteMixin:
+    """
+    POST a list to /bulk/ to create, or PATCH a list of items with their "id"
+    to update. Items are validated together (errors are listed per item) and
+    saved with one bulk query, as a single (more expensive) request for throttling.
+    """
+    throttle_costs = {"bulk": 20}
+
+    @extend_schema(description="Create (POST) or partially update (PATCH, items with id) many objects at once.")
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request):
+        instance = None
+        if request.method == "PATCH":
+            ids = [
+                item["id"] for item in request.data
+                if isinstance(item, dict) and isinstance(item.get("id"), int)
+            ] if isinstance(request.data, list) else []
+            instance = list(self.get_queryset().filter(pk__in=ids))
+
+        serializer = self.get_serializer(
+            instance,
+            data=request.data,
+            many=True,
+            partial=instance is not None,
+            max_length=settings.BULK_MAX_ITEMS,
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            objects = serializer.save()
+            transaction.on_commit(lambda: self.bulk_saved(objects))
+
+        return Response(
+            serializer.data,
+            status=status.HTTP_200_OK if instance is not None else status.HTTP_201_CREATED,
+        )
 
+    def bulk_saved(self, objects):
+        """Called after commit; bulk queries send no model signals."""
+        bump_version(self.get_queryset().model)
 
-class TrainTypeViewSet(viewsets.ModelViewSet):
+
+class AutocompleteMixin:
+    """Ranked name completion: prefix matches first, then fuzzy (trigram) matches."""
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="q", type=str, required=True, description="Typed part of the name"),
+            OpenApiParameter(name="limit", type=int, description="Number of matches, 10 by default (max 20)"),
+        ],
+        responses=AutocompleteSerializer(many=True),
+    )
+    @action(detail=False)
+    def autocomplete(self, request):
+        query = AutocompleteQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        matches = complete_names(
+            self.get_queryset().model, query.validated_data["q"], query.validated_data["limit"]
+        )
+        return Response(AutocompleteSerializer([{"id": pk, "name": name} for pk, name in matches], many=True).data)
+
+
+class TrainTypeViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
+    cache_models = (TrainType,)
 
 
-class TrainViewSet(viewsets.ModelViewSet):
+class TrainViewSet(ConditionalGetMixin, CachedResponseMixin, BulkWriteMixin, AutocompleteMixin, viewsets.ModelViewSet):
     queryset = Train.objects.select_related("train_type").all()
     serializer_class = TrainSerializer
+    cache_models = (Train, TrainType)
     filterset_class = TrainFilter
     filter_backends = [DjangoFilterBackend]
 
@@ -31,15 +122,101 @@ class TrainViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    def get_serializer_class(self):
+        if self.action == "bulk":
+            return TrainBulkSerializer
+        return super().get_serializer_class()
+
+    def bulk_saved(self, trains):
+        super().bulk_saved(trains)
+        refresh_board(Journey.objects.filter(train__in=[train.pk for train in trains]))
 
-class StationViewSet(viewsets.ModelViewSet):
+
+class StationViewSet(ConditionalGetMixin, CachedResponseMixin, AutocompleteMixin, viewsets.ModelViewSet):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
+    cache_models = (Station,)
+    board_cache_models = (Journey, Route, Station, Train, Ticket)
+
+    def get_cache_models(self):
+        if self.action == "board":
+            return self.board_cache_models
+        return super().get_cache_models()
+
+    def get_board_since(self):
+        return timezone.now().replace(second=0, microsecond=0)
 
+    def get_fingerprint_parts(self):
+        parts = super().get_fingerprint_parts()
+        if self.action == "board":
+            # boards move on with the clock even when nothing is written
+            parts = [*parts, self.get_board_since().isoformat()]
+        return parts
 
-class RouteViewSet(viewsets.ModelViewSet):
+    def get_last_modified(self):
+        last_modified = super().get_last_modified()
+        if self.action == "board":
+            last_modified = max(last_modified, int(self.get_board_since().timestamp()))
+        return last_modified
+
+    @extend_schema(
+        description="Next departures or arrivals of the station from the current minute on, "
+                    "read from the precomputed board. Availability ignores seat holds.",
+        parameters=[
+            OpenApiParameter(name="kind", type=str, enum=list(BoardQuerySerializer.KINDS),
+                             description="departures (default) or arrivals"),
+            OpenApiParameter(name="limit", type=int, description="Number of entries, 50 by default (max 100)"),
+        ],
+        responses=BoardEntrySerializer(many=True),
+    )
+    @action(detail=True)
+    def board(self, request, pk=None):
+        return self.conditional_response(request, self.cached_response, self.render_board, pk=pk)
+
+    def render_board(self, request, pk=None):
+        query = BoardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            station_id = int(pk)
+        except ValueError:
+            raise NotFound()
+
+        entries = get_board(
+            station_id,
+            BoardQuerySerializer.KINDS[query.validated_data["kind"]],
+            since=self.get_board_since(),
+            limit=query.validated_data["limit"],
+        )
+        if not entries and not Station.objects.filter(pk=station_id).exists():
+            raise NotFound()
+        return Response(BoardEntrySerializer(entries, many=True).data)
+
+    @extend_schema(
+        description="Stations within `radius` km of a point, closest first. "
+                    "Served from an in-memory grid index, without database queries.",
+        parameters=[
+            OpenApiParameter(name="lat", type=float, required=True, description="Latitude"),
+            OpenApiParameter(name="lon", type=float, required=True, description="Longitude"),
+            OpenApiParameter(name="radius", type=float, description="Radius in km, 10 by default (max 1000)"),
+            OpenApiParameter(name="limit", type=int, description="Number of stations, 20 by default (max 100)"),
+        ],
+        responses=NearbyStationSerializer(many=True),
+    )
+    @action(detail=False)
+    def nearby(self, request):
+        query = NearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        station_index.ensure_fresh()
+        stations = station_index.nearby(params["lat"], params["lon"], params["radius"], params["limit"])
+        return Response(NearbyStationSerializer([station._asdict() for station in stations], many=True).data)
+
+
+class RouteViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Route.objects.select_related("source", "destination").all()
     serializer_class = RouteSerializer
+    cache_models = (Route, Station)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RouteFilter
 
@@ -54,41 +231,349 @@ class RouteViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class JourneyViewSet(viewsets.ModelViewSet):
+class JourneyViewSet(ConditionalGetMixin, BulkWriteMixin, viewsets.ModelViewSet):
     queryset = Journey.objects.select_related(
         "route__source",
         "route__destination",
         "train__train_type"
-    ).prefetch_related("tickets")
+    )
     serializer_class = JourneySerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = JourneyFilter
+    keyset_ordering = ("departure_time", "id")
+    # Ticket covers sold counters and seats, SeatHold the held seats
+    cache_models = (Journey, Route, Station, Train, TrainType, Ticket, SeatHold)
+    # responses counting active holds, which change when a hold expires too
+    hold_counting_actions = ("list", "retrieve", "cargos")
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.action == "list":
+            active_holds = (
+                SeatHold.objects.filter(journey=OuterRef("pk"), expires_at__gt=Now())
+                .order_by()
+                .values("journey")
+                .annotate(total=Count("pk"))
+                .values("total")
+            )
+            queryset = queryset.annotate(seats_held=Coalesce(Subquery(active_holds), 0))
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related("tickets", active_holds_prefetch())
+        return queryset
+
+    def get_hold_state(self):
+        """SeatHold version and hold_expiry_window: active holds only change along with one of them."""
+        if not hasattr(self, "_hold_state"):
+            versions = dict(zip(self.get_cache_models(), self.get_cache_versions()))
+            self._hold_state = (versions[SeatHold], *hold_expiry_window(versions[SeatHold]))
+        return self._hold_state
+
+    def get_hold_expiry(self):
+        return self.get_hold_state()[1:]
+
+    def get_fingerprint_parts(self):
+        parts = super().get_fingerprint_parts()
+        if self.action in self.hold_counting_actions:
+            # held seats are freed when a hold expires, which is no write
+            parts = [*parts, *self.get_hold_expiry()]
+        return parts
+
+    def get_last_modified(self):
+        last_modified = super().get_last_modified()
+        if self.action in self.hold_counting_actions:
+            last_expired = self.get_hold_expiry()[0]
+            if last_expired is not None:
+                last_modified = max(last_modified, math.ceil(last_expired))
+        return last_modified
 
     def get_serializer_class(self):
         if self.action == 'list':
             return JourneyListSerializer
         if self.action == "retrieve":
             return JourneyRetrieveSerializer
+        if self.action == "seat_map":
+            return JourneySeatMapSerializer
+        if self.action == "cargos":
+            return JourneyCargosSerializer
+        if self.action == "holds":
+            return SeatHoldSerializer
+        if self.action == "bulk":
+            return JourneyBulkSerializer
 
         return JourneySerializer
 
+    def bulk_saved(self, journeys):
+        super().bulk_saved(journeys)
+        refresh_board(Journey.objects.filter(pk__in=[journey.pk for journey in journeys]))
+        for journey in journeys:
+            timetable.update(
+                journey.pk,
+                journey.departure_time,
+                journey.arrival_time,
+                journey.route.source_id,
+                journey.route.destination_id,
+            )
+
     @extend_schema(
         parameters=[
             OpenApiParameter(name="id", type=int, description="Filter by Journey ID (ex. ?id=1,2)"),
-            OpenApiParameter(name="route", type=str, description="Filter by Route Name"),
+            OpenApiParameter(name="route", type=int, description="Filter by Route ID"),
+            OpenApiParameter(name="source", type=int, description="Filter by Source Station ID"),
+            OpenApiParameter(name="destination", type=int, description="Filter by Destination Station ID"),
+            OpenApiParameter(name="departure_after", type=OpenApiTypes.DATETIME,
+                             description="Departing at or after (ISO 8601)"),
+            OpenApiParameter(name="departure_before", type=OpenApiTypes.DATETIME,
+                             description="Departing at or before (ISO 8601)"),
             OpenApiParameter(name="train", type=str, description="Filter by Train Name"),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        description="Seat occupancy as one packed bitset per cargo (seat 1 is the most significant bit). "
+                    "Request application/octet-stream (or ?format=bin) for the raw cargo-major bytes."
+    )
+    @action(
+        detail=True,
+        url_path="seat-map",
+        renderer_classes=[JSONRenderer, BrowsableAPIRenderer, OctetStreamRenderer],
+    )
+    def seat_map(self, request, pk=None):
+        journey = self.get_object()
+        train = journey.train
+        bitmap = get_seat_map(journey)
+
+        if request.accepted_renderer.format == OctetStreamRenderer.format:
+            return Response(
+                bitmap,
+                headers={
+                    "X-Cargo-Num": str(train.cargo_num),
+                    "X-Places-In-Cargo": str(train.places_in_cargo),
+                },
+            )
+
+        serializer = self.get_serializer({
+            "journey": journey.pk,
+            "cargo_num": train.cargo_num,
+            "places_in_cargo": train.places_in_cargo,
+            "cargos": [
+                base64.b64encode(row).decode()
+                for row in split_cargos(bitmap, train.cargo_num, train.places_in_cargo)
+            ],
+        })
+        return Response(serializer.data)
+
+    @extend_schema(description="Free seats per cargo, for choosing a car before loading the seat map.")
+    @action(detail=True)
+    def cargos(self, request, pk=None):
+        return self.conditional_response(request, self.cargo_summary)
+
+    def cargo_summary(self, request):
+        journey = self.get_object()
+        train = journey.train
+        serializer = self.get_serializer({
+            "journey": journey.pk,
+            "cargos": summarize_cargos(
+                get_cargo_counts(journey, self.get_hold_state()), train.cargo_num, train.places_in_cargo
+            ),
+        })
+        return Response(serializer.data)
+
+    @extend_schema(
+        description="Hold seats for checkout until SEAT_HOLD_TTL passes (POST) "
+                    "or release the current user's holds on this journey (DELETE)."
+    )
+    @action(detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated])
+    def holds(self, request, pk=None):
+        journey = self.get_object()
+
+        if request.method == "DELETE":
+            SeatHold.objects.filter(journey=journey, user=request.user).delete()
+            transaction.on_commit(lambda: bump_version(SeatHold))
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        context = self.get_serializer_context()
+        context["journey"] = journey
+        serializer = self.get_serializer(data=request.data, context=context)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ConnectionViewSet(viewsets.ViewSet):
+    """Earliest-arrival itineraries between two stations, with transfers."""
+    throttle_costs = {"list": 5}
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="from", type=int, required=True, description="Origin Station ID"),
+            OpenApiParameter(name="to", type=int, required=True, description="Destination Station ID"),
+            OpenApiParameter(name="depart_after", type=OpenApiTypes.DATETIME,
+                             description="Earliest departure (ISO 8601), now by default"),
+            OpenApiParameter(name="min_transfer", type=int, description="Minimum change time in minutes"),
+        ],
+        responses=ConnectionSerializer(many=True),
+    )
+    def list(self, request):
+        query = ConnectionQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        legs = timetable.search(
+            params["from"].pk,
+            params["to"].pk,
+            params.get("depart_after") or timezone.now(),
+            min_transfer=params["min_transfer"] * 60,
+        )
+        if not legs:
+            return Response([])
+
+        journeys = Journey.objects.select_related(
+            "route__source", "route__destination", "train"
+        ).in_bulk([leg.journey_id for leg in legs])
+        itinerary = {
+            "departure_time": journeys[legs[0].journey_id].departure_time,
+            "arrival_time": journeys[legs[-1].journey_id].arrival_time,
+            "transfers": len(legs) - 1,
+            "legs": [journeys[leg.journey_id] for leg in legs],
+        }
+        return Response(ConnectionSerializer([itinerary], many=True).data)
+
+
+class CacheStatsViewSet(viewsets.ViewSet):
+    """Hit/miss counters of the catalog response cache."""
+    permission_classes = [IsAdminUser]
+    cached_views = ("traintype", "train", "station", "route")
+
+    def list(self, request):
+        return Response(get_stats(self.cached_views))
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    Streamed dumps for analytics: ?output=ndjson (default) or csv, narrowed
+    with the journey filters (route, source, destination, departure range...).
+    """
+    permission_classes = [IsAdminUser]
+    throttle_costs = {"journeys": 30, "tickets": 30, "orders": 30}
+    export_parameters = [
+        OpenApiParameter(name="output", type=str, enum=list(FORMATS), description="ndjson (default) or csv"),
+        OpenApiParameter(name="route", type=int, description="Filter by Route ID"),
+        OpenApiParameter(name="source", type=int, description="Filter by Source Station ID"),
+        OpenApiParameter(name="destination", type=int, description="Filter by Destination Station ID"),
+        OpenApiParameter(name="departure_after", type=OpenApiTypes.DATETIME,
+                         description="Departing at or after (ISO 8601)"),
+        OpenApiParameter(name="departure_before", type=OpenApiTypes.DATETIME,
+                         description="Departing at or before (ISO 8601)"),
+    ]
+
+    def get_output(self):
+        output = self.request.query_params.get("output", "ndjson")
+        if output not in FORMATS:
+            raise ValidationError({"output": f"Choose one of: {', '.join(FORMATS)}."})
+        return output
+
+    def get_journeys(self):
+        filterset = JourneyFilter(self.request.query_params, queryset=Journey.objects.order_by())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset.qs
+
+    def filters_journeys(self):
+        return any(name in self.request.query_params for name in JourneyFilter.base_filters)
+
+    @extend_schema(parameters=export_parameters, responses={200: OpenApiTypes.BINARY})
+    @action(detail=False)
+    def journeys(self, request):
+        output = self.get_output()
+        queryset = self.get_journeys().order_by("departure_time", "id")
+        return stream_export(request, queryset, JOURNEY_FIELDS, output, "journeys")
+
+    @extend_schema(parameters=export_parameters, responses={200: OpenApiTypes.BINARY})
+    @action(detail=False)
+    def tickets(self, request):
+        output = self.get_output()
+        queryset = Ticket.objects.order_by("id")
+        if self.filters_journeys():
+            queryset = queryset.filter(journey__in=self.get_journeys().values("pk"))
+        return stream_export(request, queryset, TICKET_FIELDS, output, "tickets")
+
+    @extend_schema(parameters=export_parameters, responses={200: OpenApiTypes.BINARY})
+    @action(detail=False)
+    def orders(self, request):
+        output = self.get_output()
+        queryset = Order.objects.order_by("id")
+        if self.filters_journeys():
+            # counts only the tickets on the selected journeys
+            queryset = queryset.filter(tickets__journey__in=self.get_journeys().values("pk"))
+        queryset = queryset.annotate(ticket_count=Count("tickets"))
+        return stream_export(request, queryset, ORDER_FIELDS, output, "orders")
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """
+    Occupancy reports over the daily summary kept by the
+    refresh_occupancy_summary command, so figures are as fresh as its last run.
+    """
+    permission_classes = [IsAdminUser]
+    throttle_costs = {"occupancy": 5}
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="group_by", type=str, enum=["route", "train", "train_type", "day"],
+                             description="Grouping of the rows, route by default"),
+            OpenApiParameter(name="route", type=int, description="Filter by Route ID"),
+            OpenApiParameter(name="train", type=int, description="Filter by Train ID"),
+            OpenApiParameter(name="train_type", type=int, description="Filter by Train Type ID"),
+            OpenApiParameter(name="from", type=OpenApiTypes.DATE, description="First departure day"),
+            OpenApiParameter(name="to", type=OpenApiTypes.DATE, description="Last departure day"),
+        ],
+        responses=OccupancyReportSerializer,
+    )
+    @action(detail=False)
+    def occupancy(self, request):
+        query = OccupancyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        rows = list(occupancy_report(
+            params["group_by"],
+            route=params.get("route"),
+            train=params.get("train"),
+            train_type=params.get("train_type"),
+            date_from=params.get("from"),
+            date_to=params.get("to"),
+        ))
+        report = {"group_by": params["group_by"], "totals": report_totals(rows), "groups": rows}
+        return Response(OccupancyReportSerializer(report).data)
+
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.prefetch_related("tickets__journey__train", "tickets__journey__route")
+class OrderViewSet(
+    ConditionalGetMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    keyset_ordering = ("-created_at", "id")
+    cache_models = (Order, Ticket, Journey)
+    etag_per_user = True
+    # booking takes row locks and may retry
+    throttle_costs = {"create": 10}
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action in ("list", "retrieve"):
+            # TicketListSerializer nests JourneySerializer, which only reads
+            # journey columns (route and train as primary keys).
+            queryset = queryset.prefetch_related(
+                Prefetch("tickets", queryset=Ticket.objects.select_related("journey"))
+            )
+        return queryset
 
     def get_serializer_class(self):
         serializer = self.serializer_class
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'rest_framework',
     "drf_spectacular",
     'django_filters',
@@ -66,6 +67,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "station.throttling.rate_limit_headers_middleware",
+    "user.hashing.HashingBusyMiddleware",
 ]
 
 ROOT_URLCONF = "trainstation.urls"
@@ -101,6 +104,42 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://host:6379/0) when running more than one process.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+
+# Password hashers: the first one hashes new passwords, the rest still verify (and upgrade
+# on login) existing hashes.
+PASSWORD_HASHER_PROFILES = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}
+PASSWORD_HASHER_PROFILE = os.environ.get("PASSWORD_HASHER_PROFILE", "pbkdf2")
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE],
+    *(hasher for profile, hasher in PASSWORD_HASHER_PROFILES.items() if profile != PASSWORD_HASHER_PROFILE),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+
+# Threads that hash and verify passwords, and calls allowed to wait for one;
+# registrations and logins beyond that get 503 (see user.hashing)
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASHING_QUEUE = int(os.environ.get("PASSWORD_HASHING_QUEUE", 4 * PASSWORD_HASHING_WORKERS))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -146,7 +185,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.ClaimsJWTAuthentication",
     ),
 
     "DEFAULT_PERMISSION_CLASSES": [
@@ -155,23 +194,66 @@ REST_FRAMEWORK = {
 
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_PAGINATION_CLASS": "station.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'station.throttling.TokenBucketThrottle',
     ],
+    # token refill rates; a read costs 1 token, a write 5 unless the view says otherwise
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '2/second',
-        'user': '2/second'
+        'anon': '60/minute',
+        'user': '300/minute'
     }
 }
 
+# Bucket sizes: the most tokens a client can spend at once
+THROTTLE_BURST = {
+    "anon": 20,
+    "user": 60,
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
+    # tokens carry is_staff/is_superuser, so regular users' requests are authenticated without a user query
+    # (staff tokens still load the user, and are rejected once the password changes)
+    "CHECK_REVOKE_TOKEN": True,
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.ClaimsTokenRefreshSerializer",
 }
 
+# Seat booking: attempts and base backoff (seconds) for serialization failures
+BOOKING_MAX_ATTEMPTS = 5
+BOOKING_RETRY_BACKOFF = 0.02
+
+# How long a seat stays held for checkout before it becomes available again
+SEAT_HOLD_TTL = timedelta(minutes=10)
+
+# Seconds before the in-memory connection timetable is reloaded in the background
+# to pick up journeys written by other processes (0 keeps it until invalidated)
+CONNECTIONS_TIMETABLE_MAX_AGE = 300
+
+# Most items accepted by one bulk create/update request
+BULK_MAX_ITEMS = 1000
+
+# Rows fetched per round trip by the streaming exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Seconds a cached catalog response is kept; writes invalidate it earlier
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Fan-out of seat availability events to SSE streams: station.pubsub.LocalBroker
+# only reaches streams of the same process, station.pubsub.PostgresBroker
+# (LISTEN/NOTIFY) those of every process
+PUBSUB_BACKEND = os.environ.get("PUBSUB_BACKEND", "station.pubsub.LocalBroker")
+
+# Server worker processes (uvicorn and gunicorn read the same variable). With more
+# than one, startup fails unless CACHES and PUBSUB_BACKEND are shared between them.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+# Seconds of silence after which an SSE stream sends a keep-alive comment
+SSE_KEEPALIVE = 15
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Bus Station API",
     "DESCRIPTION": "Order tickets for your bus trips",
@@ -0,0 +1,87 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry is_staff/is_superuser claims (see
+ClaimsTokenObtainPairSerializer), so a request of a regular user gets a
+ClaimsUser built from the token instead of a User query; the row is only
+loaded when a view reads another field. Tokens claiming staff or superuser
+status, and tokens issued without the claims, load the user like
+JWTAuthentication does: privileges come from the row, so a demotion,
+deactivation or password change (CHECK_REVOKE_TOKEN) takes effect on the
+next request whatever cache the process uses.
+
+Revocation goes through a denylist in the default cache, checked with one
+get_many per request. With a per-process cache (LocMemCache) an entry only
+reaches the process that wrote it, so a regular user's tokens may stay
+usable elsewhere until they expire; use a shared cache in production:
+
+    jwt-denylist:jti:<jti>     a single token, until it expires
+    jwt-denylist:user:<id>     every token of the user issued up to the
+                               stored millisecond (password or permission
+                               change, deactivation, deletion)
+
+Tokens from ClaimsTokenObtainPairSerializer carry their issue time in
+milliseconds (ISSUED_MS_CLAIM), so a login right after a revocation is
+not caught by it; others count as issued at the end of their iat second.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from user.models import ClaimsUser
+
+ISSUED_MS_CLAIM = "iat_ms"
+JTI_KEY = "jwt-denylist:jti:{}"
+USER_KEY = "jwt-denylist:user:{}"
+
+
+def revoke_token(token):
+    """Deny a token (access or refresh) until it would expire anyway."""
+    remaining = token["exp"] - int(time.time())
+    if remaining > 0:
+        cache.set(JTI_KEY.format(token[api_settings.JTI_CLAIM]), 1, remaining)
+
+
+def now_ms():
+    return time.time_ns() // 1_000_000
+
+
+def issued_ms(token):
+    """When the token was issued, in milliseconds; the last one of its iat second without ISSUED_MS_CLAIM."""
+    if ISSUED_MS_CLAIM in token:
+        return token[ISSUED_MS_CLAIM]
+    return token.get("iat", 0) * 1000 + 999
+
+
+def revoke_user_tokens(user_id):
+    """Deny every token of the user issued until now."""
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    cache.set(USER_KEY.format(user_id), now_ms(), int(lifetime.total_seconds()))
+
+
+def is_revoked(token):
+    jti_key = JTI_KEY.format(token.get(api_settings.JTI_CLAIM))
+    user_key = USER_KEY.format(token.get(api_settings.USER_ID_CLAIM))
+    denied = cache.get_many([jti_key, user_key])
+    return jti_key in denied or issued_ms(token) <= denied.get(user_key, -1)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if "is_staff" not in validated_token:
+            return super().get_user(validated_token)
+        if validated_token["is_staff"] or validated_token.get("is_superuser", False):
+            # privileges must not outlive a demotion the denylist may not know about
+            return super().get_user(validated_token)
+        return ClaimsUser.from_claims(
+            validated_token[api_settings.USER_ID_CLAIM],
+            validated_token["is_staff"],
+            validated_token.get("is_superuser", False),
+        )
@@ -0,0 +1,81 @@
+"""
+Password hashing on a bounded thread pool.
+
+Hashing and verifying passwords is deliberately slow CPU work. Registration
+and login bursts run it on PASSWORD_HASHING_WORKERS threads (the hashers
+release the GIL, so threads use every core) instead of one per request
+worker, with at most PASSWORD_HASHING_QUEUE more calls waiting. Anything
+beyond that is refused at once with 503 and Retry-After, so a burst costs
+the surplus requests a retry instead of stalling every worker on CPU.
+
+This is a concurrency cap, not an offload: the calling request thread
+blocks until its hash is done, so a request worker is still held for the
+duration; what the pool bounds is how many of them burn CPU at once. DRF
+views turn HashingBusy into the 503 themselves, HashingBusyMiddleware
+does it for the rest (the admin login).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many logins and registrations at the moment, try again shortly.")
+    default_code = "hashing_busy"
+    # turned into Retry-After by the DRF exception handler
+    wait = 1
+
+
+class HashingPool:
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hashing")
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            self.slots.release()
+
+
+class HashingBusyMiddleware(MiddlewareMixin):
+    """503 with Retry-After for HashingBusy raised outside DRF, instead of a server error."""
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            response = HttpResponse(str(exception.detail), status=exception.status_code, content_type="text/plain")
+            response["Retry-After"] = str(exception.wait)
+            return response
+        return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE)
+    return _pool
+
+
+def hash_password(raw_password):
+    return get_pool().run(make_password, raw_password)
+
+
+def check_password_hash(raw_password, encoded):
+    """(is_correct, must_update) for a raw password against a stored hash."""
+    return get_pool().run(verify_password, raw_password, encoded)
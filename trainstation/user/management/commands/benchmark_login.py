@@ -0,0 +1,64 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from user.hashing import HashingBusy, HashingPool
+
+PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time password verification, the CPU cost of a login, per hasher profile: "
+        "inline on the request thread (as before) and on the bounded hashing pool "
+        "under concurrent logins. No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            default=",".join(settings.PASSWORD_HASHER_PROFILES),
+            help="Comma-separated PASSWORD_HASHER_PROFILES keys",
+        )
+        parser.add_argument("--logins", type=int, default=40, help="Logins per measurement")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing pool threads")
+        parser.add_argument("--clients", type=int, default=32, help="Concurrent logins against the pool")
+
+    def inline(self, encoded, logins):
+        started = time.perf_counter()
+        for _ in range(logins):
+            check_password(PASSWORD, encoded)
+        return logins / (time.perf_counter() - started)
+
+    def pooled(self, encoded, logins, workers, clients):
+        pool = HashingPool(workers, queue=clients)
+
+        def login(_):
+            try:
+                return pool.run(check_password, PASSWORD, encoded)
+            except HashingBusy:
+                return None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(clients) as client_threads:
+            results = list(client_threads.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+        pool.executor.shutdown()
+        return sum(result is not None for result in results) / elapsed, results.count(None)
+
+    def handle(self, *args, **options):
+        workers, clients, logins = options["workers"], options["clients"], options["logins"]
+        self.stdout.write(f"{'profile':<8}{'inline/s':>10}{'pool/s':>10}{'pool/s/core':>13}{'rejected':>10}")
+        for profile in options["profiles"].split(","):
+            with override_settings(PASSWORD_HASHERS=[settings.PASSWORD_HASHER_PROFILES[profile]]):
+                encoded = make_password(PASSWORD)
+                inline = self.inline(encoded, logins)
+                pooled, rejected = self.pooled(encoded, logins, workers, clients)
+            self.stdout.write(
+                f"{profile:<8}{inline:>10.1f}{pooled:>10.1f}{pooled / workers:>13.1f}{rejected:>10}"
+            )
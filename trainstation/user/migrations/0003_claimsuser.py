@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:28
+
+import user.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0002_alter_user_managers_remove_user_username_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClaimsUser",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("user.user",),
+            managers=[
+                ("objects", user.models.UserManager()),
+            ],
+        ),
+    ]
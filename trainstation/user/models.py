@@ -2,6 +2,8 @@ from django.db import models
 from django.utils.translation import gettext as _
 from django.contrib.auth.models import AbstractUser, BaseUserManager, UserManager as DjangoUserManager
 
+from user.hashing import hash_password, check_password_hash
+
 
 class UserManager(DjangoUserManager):
     """Define a model manager for User model with no username field."""
@@ -45,3 +47,49 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
 
     objects = UserManager()
+
+    def set_password(self, raw_password):
+        """Hash on the bounded pool of user.hashing instead of the request thread."""
+        self.password = hash_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Verify on the bounded pool; a hash from an older hasher is upgraded like Django does."""
+        is_correct, must_update = check_password_hash(raw_password, self.password)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes.
+            self._password = None
+            self._hash_upgrade = True
+            try:
+                self.save(update_fields=["password"])
+            finally:
+                del self._hash_upgrade
+        return is_correct
+
+
+class ClaimsUser(User):
+    """
+    User built from the claims of an access token (id, is_staff, is_superuser)
+    without a query. The first read of any other field loads the rest of the
+    row in one query. Claims may be stale, so it can't be saved: load the
+    User itself to write it.
+    """
+    CLAIM_FIELDS = ("id", "is_staff", "is_superuser", "is_active")
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, is_staff, is_superuser):
+        user_id = cls._meta.pk.to_python(user_id)
+        return cls.from_db(None, cls.CLAIM_FIELDS, (user_id, is_staff, is_superuser, True))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
+
+    def save(self, *args, **kwargs):
+        raise TypeError("ClaimsUser is read-only, save a User loaded from the database instead.")
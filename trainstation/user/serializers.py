@@ -1,6 +1,12 @@
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.authentication import ISSUED_MS_CLAIM, is_revoked, now_ms
 
 class UserSerializer(serializers.ModelSerializer):
 
@@ -65,4 +71,43 @@ class AuthTokenSerializer(serializers.Serializer):
             raise serializers.ValidationError(msg, code='authorization')
 
         attrs['user'] = user
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Put the claims ClaimsJWTAuthentication trusts into the tokens."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # copied into access tokens made from this refresh token, which is denied with them
+        token[ISSUED_MS_CLAIM] = now_ms()
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse revoked refresh tokens; claims stay current since changing them revokes the tokens."""
+
+    def validate(self, attrs):
+        if is_revoked(self.token_class(attrs["refresh"])):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        return super().validate(attrs)
+
+
+class RevokeTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(
+        required=False,
+        write_only=True,
+        help_text="Refresh token to revoke along with the access token of the request",
+    )
+
+    def validate_refresh(self, value):
+        try:
+            token = RefreshToken(value)
+        except TokenError as error:
+            raise serializers.ValidationError(str(error))
+        if str(token.get(api_settings.USER_ID_CLAIM)) != str(self.context["request"].user.pk):
+            raise serializers.ValidationError(_("Token belongs to another user."))
+        return token
\ No newline at end of file
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from user.authentication import revoke_user_tokens
+from user.models import User
+
+# Changes that must not wait for the user's tokens to expire
+CREDENTIAL_FIELDS = ("password", "is_staff", "is_superuser", "is_active")
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_credential_change(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    if getattr(instance, "_hash_upgrade", False):
+        # the same password under a newer hasher (User.check_password), e.g. on the login issuing tokens
+        return
+    if update_fields is not None and not set(update_fields) & set(CREDENTIAL_FIELDS):
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*CREDENTIAL_FIELDS).first()
+    if stored and any(stored[field] != getattr(instance, field) for field in CREDENTIAL_FIELDS):
+        user_id = instance.pk
+        transaction.on_commit(lambda: revoke_user_tokens(user_id))
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: revoke_user_tokens(user_id))
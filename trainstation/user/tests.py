@@ -1,3 +1,241 @@
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from user.authentication import ISSUED_MS_CLAIM, is_revoked
+from user.hashing import HashingBusy, HashingPool
+from user.models import ClaimsUser
+
+TOKEN_URL = reverse("user:token_obtain_pair")
+REFRESH_URL = reverse("user:token_refresh")
+REVOKE_URL = reverse("user:token_revoke")
+REGISTER_URL = reverse("user:create")
+ME_URL = reverse("user:manage_user")
+TRAIN_TYPE_URL = reverse("trainstation:traintype-list")
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpassword"
+        )
+
+    def obtain(self, email="user@test.com", password="testpassword"):
+        return self.client.post(TOKEN_URL, {"email": email, "password": password}).data
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_tokens_carry_permission_claims(self):
+        tokens = self.obtain()
+
+        access = AccessToken(tokens["access"])
+        self.assertEqual(access["user_id"], str(self.user.pk))
+        self.assertIs(access["is_staff"], False)
+        self.assertIs(access["is_superuser"], False)
+
+    def test_request_does_not_query_user(self):
+        self.authorize(self.obtain()["access"])
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TRAIN_TYPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if "user_user" in query["sql"]])
+
+    def test_staff_claim_allows_writes(self):
+        admin = get_user_model().objects.create_superuser(email="admin@test.com", password="testpassword")
+        self.authorize(self.obtain(admin.email)["access"])
+
+        res = self.client.post(TRAIN_TYPE_URL, {"name": "Express"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_staff_demotion_applies_without_denylist(self):
+        admin = get_user_model().objects.create_superuser(email="admin@test.com", password="testpassword")
+        self.authorize(self.obtain(admin.email)["access"])
+        # as seen by a process whose cache never got the denylist entry
+        with mock.patch("user.signals.revoke_user_tokens"):
+            get_user_model().objects.filter(pk=admin.pk).update(is_staff=False, is_superuser=False)
+
+        res = self.client.post(TRAIN_TYPE_URL, {"name": "Express"})
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_staff_password_change_applies_without_denylist(self):
+        admin = get_user_model().objects.create_superuser(email="admin@test.com", password="testpassword")
+        self.authorize(self.obtain(admin.email)["access"])
+        with mock.patch("user.signals.revoke_user_tokens"):
+            admin.set_password("newpassword")
+            admin.save()
+
+        res = self.client.get(TRAIN_TYPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_without_claims_load_the_user(self):
+        self.authorize(RefreshToken.for_user(self.user).access_token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_claims_user_loads_row_once_and_is_read_only(self):
+        user = ClaimsUser.from_claims(self.user.pk, False, False)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+            self.assertIsNotNone(user.date_joined)
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_revoke_access_and_refresh_tokens(self):
+        tokens = self.obtain()
+        self.authorize(tokens["access"])
+
+        res = self.client.post(REVOKE_URL, {"refresh": tokens["refresh"]})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(TRAIN_TYPE_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        res = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_rejects_refresh_token_of_another_user(self):
+        other = get_user_model().objects.create_user(email="other@test.com", password="testpassword")
+        self.authorize(self.obtain()["access"])
+
+        res = self.client.post(REVOKE_URL, {"refresh": str(RefreshToken.for_user(other))})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_credential_change_revokes_older_tokens(self):
+        tokens = self.obtain()
+        self.authorize(tokens["access"])
+        self.assertEqual(self.client.get(TRAIN_TYPE_URL).status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+
+        self.assertEqual(self.client.get(TRAIN_TYPE_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        res = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_hash_upgrade_on_login_keeps_new_tokens(self):
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password("testpassword", hasher="pbkdf2_sha1")
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens = self.obtain()
+
+        self.authorize(tokens["access"])
+        self.assertEqual(self.client.get(TRAIN_TYPE_URL).status_code, status.HTTP_200_OK)
+        self.client.credentials()
+        res = self.client.post(REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_in_the_second_of_a_revocation_is_kept(self):
+        old = self.obtain()
+        with mock.patch("user.authentication.time.time_ns", return_value=1_900_000_000_250_000_000):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.set_password("newpassword")
+                self.user.save()
+        access = AccessToken(old["access"])
+        access[ISSUED_MS_CLAIM] = 1_900_000_000_100
+        new = AccessToken(old["access"])
+        new[ISSUED_MS_CLAIM] = 1_900_000_000_400
+
+        self.assertTrue(is_revoked(access))
+        self.assertFalse(is_revoked(new))
+
+    def test_unrelated_save_keeps_tokens(self):
+        self.authorize(self.obtain()["access"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Taras"
+            self.user.save()
+
+        self.assertEqual(self.client.get(TRAIN_TYPE_URL).status_code, status.HTTP_200_OK)
+
+
+class PasswordHashingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_profile_hasher_hashes_new_passwords(self):
+        user = get_user_model().objects.create_user(email="user@test.com", password="testpassword")
+
+        self.assertTrue(user.password.startswith(settings.PASSWORD_HASHER_PROFILE))
+        self.assertTrue(user.check_password("testpassword"))
+        self.assertFalse(user.check_password("wrongpassword"))
+
+    def test_login_upgrades_older_hashes(self):
+        user = get_user_model().objects.create_user(email="user@test.com")
+        get_user_model().objects.filter(pk=user.pk).update(
+            password=make_password("testpassword", hasher="pbkdf2_sha1")
+        )
+
+        res = self.client.post(TOKEN_URL, {"email": "user@test.com", "password": "testpassword"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith(settings.PASSWORD_HASHER_PROFILE))
+
+    def test_pool_refuses_calls_beyond_workers_and_queue(self):
+        pool = HashingPool(workers=1, queue=1)
+        release = threading.Event()
+        blocked = [threading.Thread(target=pool.run, args=(release.wait,)) for _ in range(2)]
+        for thread in blocked:
+            thread.start()
+        while pool.slots._value:
+            release.wait(0.001)
+
+        try:
+            with self.assertRaises(HashingBusy):
+                pool.run(str, "late")
+        finally:
+            release.set()
+            for thread in blocked:
+                thread.join()
+        self.assertEqual(pool.run(str, "again"), "again")
+
+    def test_busy_pool_answers_503(self):
+        busy = mock.Mock(**{"run.side_effect": HashingBusy})
+        with mock.patch("user.hashing.get_pool", return_value=busy):
+            res = self.client.post(REGISTER_URL, {"email": "user@test.com", "password": "testpassword"})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_busy_pool_answers_503_on_admin_login(self):
+        get_user_model().objects.create_superuser(email="admin@test.com", password="testpassword")
+        busy = mock.Mock(**{"run.side_effect": HashingBusy})
+        with mock.patch("user.hashing.get_pool", return_value=busy):
+            res = self.client.post(
+                reverse("admin:login"), {"username": "admin@test.com", "password": "testpassword"}
+            )
 
-# Create your tests here.
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "1")
@@ -4,7 +4,7 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from user.views import (CreateUserView,
-                        LoginUserView, ManageUserView)
+                        LoginUserView, ManageUserView, RevokeTokenView)
 
 
 app_name = "user"
@@ -13,5 +13,6 @@ urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/revoke/", RevokeTokenView.as_view(), name="token_revoke"),
     path("me/", ManageUserView.as_view(), name="manage_user"),
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
-from rest_framework import generics
+from django.contrib.auth import get_user_model
+from rest_framework import generics, status
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer
+from user.authentication import revoke_token
+from user.models import ClaimsUser
+from user.serializers import UserSerializer, RevokeTokenSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -23,4 +27,23 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        user = self.request.user
+        # a read-only ClaimsUser built from the token is swapped for the row
+        if isinstance(user, ClaimsUser):
+            return get_user_model().objects.get(pk=user.pk)
+        return user
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """Log out: revoke the access token of the request and, if given, a refresh token."""
+    serializer_class = RevokeTokenSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.auth is not None:
+            revoke_token(request.auth)
+        if "refresh" in serializer.validated_data:
+            revoke_token(serializer.validated_data["refresh"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file